@@ -1,20 +1,262 @@
+"""
+Revisione delle cache delle pagine Streamlit.
+
+Analizza con ast Home.py, le pagine in pages/ e i moduli in report/ e segnala:
+  - l'uso dei decoratori deprecati (@st.cache, st.experimental_memo/singleton);
+  - @st.cache_data/@st.cache_resource usati senza cache_monitorata, che
+    quindi mancano dalle statistiche runtime;
+  - il lavoro costoso rifatto a ogni rerun senza st.cache_data/st.cache_resource:
+    grandi dizionari/liste letterali e catene di chiamate al livello del
+    modulo di una pagina, caricamenti (file, modelli, PDF, database) eseguiti
+    al livello del modulo o in funzioni senza cache.
+
+Con --runtime stampa invece le statistiche raccolte da numerologia/cache.py
+(NUMEROLOGIA_CACHE_STATS=1 e NUMEROLOGIA_CACHE_STATS_FILE=<file.json>).
+
+Uso:
+    python checkcache.py [percorsi ...] [--strict]
+    python checkcache.py --runtime statistiche_cache.json
+"""
+
+import argparse
+import ast
+import json
 import os
+import sys
+
+RADICE = os.path.dirname(os.path.abspath(__file__))
+
+DECORATORI_DEPRECATI = {"cache", "experimental_memo", "experimental_singleton"}
+DECORATORI_CACHE = {"cache_data", "cache_resource", "cache_monitorata", "memoizza", "lru_cache", "cache"}
+
+# Chiamate che caricano risorse: costose se ripetute a ogni rerun
+CARICAMENTI = {
+    "open", "read_csv", "read_excel", "read_parquet", "read_json", "load", "loads",
+    "loadtxt", "genfromtxt", "PdfReader", "SentenceTransformer", "PersistentClient",
+    "Client", "HttpClient", "GenerativeModel", "add_font", "imread", "connect",
+    "urlopen", "get", "post",
+}
+# Moduli da cui "get"/"post"/"load"/"connect" sono davvero caricamenti
+MODULI_CARICAMENTO = {"requests", "httpx", "json", "pickle", "np", "numpy", "sqlite3", "yaml", "chromadb", "genai"}
+
+SOGLIA_VOCI_LETTERALI = 20      # voci di un dict/list/set letterale
+SOGLIA_BYTE_LETTERALI = 1024    # testo contenuto nel letterale
+SOGLIA_CHIAMATE_LETTERALI = 3   # chiamate usate come chiavi/elementi di un letterale
+
+
+class Segnalazione:
+    """Un problema trovato in un file."""
+
+    def __init__(self, percorso, riga, codice, messaggio):
+        self.percorso = percorso
+        self.riga = riga
+        self.codice = codice
+        self.messaggio = messaggio
+
+    def __str__(self):
+        return f"⚠️  {self.percorso}:{self.riga} [{self.codice}] {self.messaggio}"
+
+
+# --- SUPPORTO AST ---
+
+def _nome_chiamata(nodo):
+    """Restituisce (modulo, funzione) di una chiamata: st.cache_data -> ("st", "cache_data")."""
+    funzione = nodo.func if isinstance(nodo, ast.Call) else nodo
+    if isinstance(funzione, ast.Attribute):
+        base = funzione.value
+        while isinstance(base, ast.Attribute):
+            base = base.value
+        return (base.id if isinstance(base, ast.Name) else None), funzione.attr
+    if isinstance(funzione, ast.Name):
+        return None, funzione.id
+    return None, None
+
+
+def _nomi_decoratori(funzione):
+    return [_nome_chiamata(d) for d in funzione.decorator_list]
+
+
+def _e_caricamento(chiamata):
+    modulo, nome = _nome_chiamata(chiamata)
+    if nome not in CARICAMENTI:
+        return False
+    if nome in {"get", "post", "load", "loads", "connect", "Client"}:
+        return modulo in MODULI_CARICAMENTO
+    return True
+
+
+def _byte_letterali(nodo):
+    return sum(
+        len(n.value.encode("utf-8"))
+        for n in ast.walk(nodo)
+        if isinstance(n, ast.Constant) and isinstance(n.value, str)
+    )
+
 
-def cerca_cache(directory):
-    print("\n🔍 INIZIO SCANSIONE per @st.cache...\n")
+def _voci_letterale(nodo):
+    if isinstance(nodo, ast.Dict):
+        return len(nodo.keys)
+    if isinstance(nodo, (ast.List, ast.Set, ast.Tuple)):
+        return len(nodo.elts)
+    return 0
+
+
+def _chiamate_nei_letterali(nodo):
+    """Chiamate usate direttamente come chiavi, valori o elementi di dict/list/set/tuple letterali."""
+    chiamate = []
+    for letterale in ast.walk(nodo):
+        if isinstance(letterale, ast.Dict):
+            elementi = [k for k in letterale.keys if k is not None] + letterale.values
+        elif isinstance(letterale, (ast.List, ast.Set, ast.Tuple)):
+            elementi = letterale.elts
+        else:
+            continue
+        chiamate.extend(e for e in elementi if isinstance(e, ast.Call))
+    return chiamate
+
+
+def _istruzioni_modulo(albero):
+    """Istruzioni eseguite a ogni rerun: livello del modulo, anche dentro if/with/try/for."""
+    da_visitare = list(albero.body)
+    while da_visitare:
+        nodo = da_visitare.pop(0)
+        if isinstance(nodo, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            continue
+        yield nodo
+        for campo in ("body", "orelse", "finalbody", "handlers"):
+            da_visitare.extend(getattr(nodo, campo, []) or [])
+
+
+# --- CONTROLLI ---
+
+def _controlla_decoratori(percorso, albero):
+    for nodo in ast.walk(albero):
+        if not isinstance(nodo, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            continue
+        for modulo, nome in _nomi_decoratori(nodo):
+            if modulo == "st" and nome in DECORATORI_DEPRECATI:
+                sostituto = "st.cache_resource" if nome == "experimental_singleton" else "st.cache_data o st.cache_resource"
+                yield Segnalazione(percorso, nodo.lineno, "deprecato",
+                                   f"@st.{nome} su '{nodo.name}': usa {sostituto}")
+            elif modulo == "st" and nome in {"cache_data", "cache_resource"}:
+                # Senza cache_monitorata la cache non compare nelle statistiche runtime
+                yield Segnalazione(percorso, nodo.lineno, "cache-non-monitorata",
+                                   f"@st.{nome} su '{nodo.name}': usa @cache_monitorata(st.{nome}, ...) "
+                                   "di numerologia/cache.py")
+
+
+def _controlla_pagina(percorso, albero):
+    """Lavoro costoso nelle istruzioni di livello modulo di una pagina (rieseguite a ogni rerun)."""
+    for nodo in _istruzioni_modulo(albero):
+        if isinstance(nodo, (ast.Assign, ast.AnnAssign)) and nodo.value is not None:
+            destinazione = nodo.targets[0] if isinstance(nodo, ast.Assign) else nodo.target
+            nome = ast.unparse(destinazione)
+            voci = _voci_letterale(nodo.value)
+            byte = _byte_letterali(nodo.value)
+            if voci >= SOGLIA_VOCI_LETTERALI or byte >= SOGLIA_BYTE_LETTERALI:
+                yield Segnalazione(percorso, nodo.lineno, "letterale-rerun",
+                                   f"'{nome}' ({voci} voci, {byte / 1024:.1f} KiB di testo) viene ricostruito "
+                                   "a ogni rerun: spostalo in un modulo importato o in una funzione con @st.cache_resource")
+            chiamate = _chiamate_nei_letterali(nodo.value)
+            if len(chiamate) >= SOGLIA_CHIAMATE_LETTERALI:
+                funzioni = sorted({_nome_chiamata(c)[1] or "?" for c in chiamate})
+                yield Segnalazione(percorso, nodo.lineno, "chiamate-rerun",
+                                   f"'{nome}' esegue {len(chiamate)} chiamate ({', '.join(funzioni)}) "
+                                   "per costruire il letterale a ogni rerun")
+        # Solo le espressioni proprie dell'istruzione: i blocchi annidati sono visitati a parte
+        for figlio in ast.iter_child_nodes(nodo):
+            if isinstance(figlio, (ast.stmt, ast.excepthandler)):
+                continue
+            for chiamata in ast.walk(figlio):
+                if isinstance(chiamata, ast.Call) and _e_caricamento(chiamata):
+                    yield Segnalazione(percorso, chiamata.lineno, "caricamento-rerun",
+                                       f"'{ast.unparse(chiamata.func)}(...)' al livello del modulo viene rieseguito "
+                                       "a ogni rerun: mettilo in una funzione con st.cache_data/st.cache_resource")
+
+
+def _controlla_funzioni(percorso, albero):
+    """Funzioni che caricano risorse senza decoratore di cache."""
+    for nodo in ast.walk(albero):
+        if not isinstance(nodo, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            continue
+        if any(nome in DECORATORI_CACHE for _, nome in _nomi_decoratori(nodo)):
+            continue
+        for figlio in ast.walk(nodo):
+            if isinstance(figlio, ast.Call) and _e_caricamento(figlio):
+                yield Segnalazione(percorso, figlio.lineno, "funzione-senza-cache",
+                                   f"'{nodo.name}' esegue '{ast.unparse(figlio.func)}(...)' senza "
+                                   "st.cache_data/st.cache_resource")
+                break
+
+
+def analizza_file(percorso):
+    """Restituisce le segnalazioni per un file Python."""
+    with open(percorso, "r", encoding="utf-8") as f:
+        sorgente = f.read()
+    relativo = os.path.relpath(percorso, RADICE)
+    try:
+        albero = ast.parse(sorgente, filename=percorso)
+    except SyntaxError as e:
+        return [Segnalazione(relativo, e.lineno or 0, "sintassi", f"file non analizzabile: {e.msg}")]
+    # Le pagine (Home.py e pages/) vengono rieseguite dall'inizio a ogni interazione
+    e_pagina = os.path.basename(os.path.dirname(percorso)) == "pages" or os.path.basename(percorso) == "Home.py"
+    segnalazioni = list(_controlla_decoratori(relativo, albero))
+    if e_pagina:
+        segnalazioni.extend(_controlla_pagina(relativo, albero))
+    segnalazioni.extend(_controlla_funzioni(relativo, albero))
+    return sorted(segnalazioni, key=lambda s: s.riga)
+
+
+def file_da_analizzare(percorsi=None):
+    """Home.py, pages/*.py e report/*.py (o i file/cartelle indicati)."""
+    if not percorsi:
+        percorsi = [os.path.join(RADICE, "Home.py"), os.path.join(RADICE, "pages"), os.path.join(RADICE, "report")]
+    for percorso in percorsi:
+        if os.path.isdir(percorso):
+            for root, _, files in os.walk(percorso):
+                for file in sorted(files):
+                    if file.endswith(".py"):
+                        yield os.path.join(root, file)
+        elif os.path.exists(percorso):
+            yield percorso
+
+
+def cerca_cache(percorsi=None):
+    print("\n🔍 INIZIO SCANSIONE delle cache...\n")
     trovati = 0
-    for root, _, files in os.walk(directory):
-        for file in files:
-            if file.endswith(".py"):
-                path = os.path.join(root, file)
-                with open(path, "r", encoding="utf-8") as f:
-                    for i, line in enumerate(f, 1):
-                        if "@st.cache" in line:
-                            trovati += 1
-                            print(f"⚠️  @st.cache trovato in: {path} (riga {i})")
+    for percorso in file_da_analizzare(percorsi):
+        for segnalazione in analizza_file(percorso):
+            trovati += 1
+            print(segnalazione)
     if trovati == 0:
-        print("✅ Nessun uso di @st.cache trovato.")
-    print("\n✅ Scansione completata.")
+        print("✅ Nessun problema di cache trovato.")
+    print(f"\n✅ Scansione completata: {trovati} segnalazioni.")
+    return trovati
+
+
+def stampa_runtime(percorso):
+    """Stampa le statistiche runtime salvate da numerologia/cache.py."""
+    with open(percorso, encoding="utf-8") as f:
+        statistiche = json.load(f)
+    print(f"\n📊 Statistiche runtime delle cache ({percorso})\n")
+    print(f"{'cache':<55} {'hit':>8} {'miss':>8} {'hit%':>6} {'espulse':>8} {'voci':>6} {'byte medi':>10}")
+    for s in statistiche:
+        print(f"{s['nome']:<55} {s['hit']:>8} {s['miss']:>8} {s['tasso_hit'] * 100:>5.1f}% "
+              f"{s['espulsioni'] + s['scadenze']:>8} {s['voci']:>6} {s['byte_medi_voce']:>10}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Revisione delle cache delle pagine Streamlit.")
+    parser.add_argument("percorsi", nargs="*", help="File o cartelle (predefinito: Home.py, pages/, report/).")
+    parser.add_argument("--strict", action="store_true", help="Esce con codice 1 se ci sono segnalazioni.")
+    parser.add_argument("--runtime", metavar="FILE_JSON", help="Stampa le statistiche runtime salvate.")
+    args = parser.parse_args(argv)
+    if args.runtime:
+        stampa_runtime(args.runtime)
+        return 0
+    trovati = cerca_cache(args.percorsi)
+    return 1 if trovati and args.strict else 0
+
 
-# Scansiona la tua cartella 'numerologia-web'
-cerca_cache("numerologia-web")
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,13 @@
+"""
+Libreria di calcolo numerologico usata dalle pagine Streamlit.
+
+numerologia.calcolo contiene le funzioni scalari (una persona alla volta),
+numerologia.motore il calcolo batch vettoriale su colonne NumPy.
+"""
+
+from .calcolo import (
+    analizza_nome_base,
+    calcola_numeri_compatibilita_persona,
+    riduci_fino_1_singolo,
+    valore_lettera,
+)
@@ -0,0 +1,196 @@
+"""
+Ricerca dei partner più compatibili su grandi archivi di profili.
+
+Il punteggio di una coppia è la media pesata, sulle sei categorie core, di
+1 (la coppia di numeri ha un'interpretazione dedicata nelle mappe di
+numerologia/compatibilita.py) o 0 (si ricade sul testo "default").
+Il punteggio è binario per categoria e segue la copertura dei testi: con
+poche coppie dedicate (oggi quasi solo nel Sentiero di Vita) la classifica
+dipende soprattutto da quella categoria e molti profili hanno lo stesso
+punteggio. A parità di punteggio l'ordine è sempre per indice di riga
+crescente, quindi lo stesso archivio dà sempre lo stesso risultato; per dare
+più peso ad altre categorie si passa 'pesi' (es. {"anima": 2.0, ...}).
+
+Ogni numero core vale da 0 a 9, quindi i profili vengono raggruppati per
+vettore core (al massimo 10^6 gruppi, in pratica molti meno): il punteggio
+si calcola una volta per gruppo invece che per ogni riga.
+
+Esempio:
+    archivio = ArchivioAffinita(calcola_profili(nomi, cognomi, date))
+    righe, punteggi = archivio.migliori(profilo, k=10)
+"""
+
+import numpy as np
+
+from .compatibilita import MAPPE_COMPATIBILITA, MappaCompatibilita, get_symmetric_key
+from .interpretazioni import ARCHIVIO
+from .motore import COLONNE_CORE, calcola_profili_da_file
+
+PESI_PREDEFINITI = {nome: 1.0 for nome in COLONNE_CORE}
+
+_VALORI = 10  # numeri 0..9 (0 per nomi senza lettere)
+_BASI = _VALORI ** np.arange(len(COLONNE_CORE), dtype=np.int64)
+_MATRICI = {}  # categoria -> (versione dell'archivio, matrice non pesata)
+
+
+# --- PUNTEGGI PER CATEGORIA ---
+
+def matrice_punteggi(mappa):
+    """Matrice 10x10: 1.0 se la coppia ha un'interpretazione dedicata, 0.0 se usa il "default"."""
+    matrice = np.zeros((_VALORI, _VALORI), dtype=np.float32)
+    for a in range(_VALORI):
+        for b in range(_VALORI):
+            if get_symmetric_key(a, b) in mappa:
+                matrice[a, b] = 1.0
+    return matrice
+
+
+def _matrice_categoria(nome):
+    """Matrice non pesata della categoria, ricostruita solo quando l'archivio dei testi viene ricaricato."""
+    mappa = MAPPE_COMPATIBILITA[nome]
+    if not isinstance(mappa, MappaCompatibilita):
+        return matrice_punteggi(mappa)
+    ARCHIVIO.tabella(mappa.categoria)  # ricarica il JSON se è cambiato
+    versione = ARCHIVIO.versione
+    voce = _MATRICI.get(nome)
+    if voce is None or voce[0] != versione:
+        matrice = matrice_punteggi(mappa)
+        matrice.setflags(write=False)
+        voce = _MATRICI[nome] = (versione, matrice)
+    return voce[1]
+
+
+def _tabelle_pesate(pesi):
+    """Restituisce [(indice colonna core, matrice pesata)] con pesi normalizzati a somma 1."""
+    pesi = PESI_PREDEFINITI if pesi is None else pesi
+    sconosciute = set(pesi) - set(COLONNE_CORE)
+    if sconosciute:
+        raise ValueError(f"Categorie non valide: {', '.join(sorted(sconosciute))}")
+    totale = float(sum(pesi.values()))
+    if totale <= 0:
+        raise ValueError("La somma dei pesi deve essere positiva.")
+    return [
+        (COLONNE_CORE.index(nome), _matrice_categoria(nome) * np.float32(peso / totale))
+        for nome, peso in pesi.items() if peso
+    ]
+
+
+def vettore_core(profilo):
+    """
+    Vettore dei sei numeri core nell'ordine di COLONNE_CORE.
+    Accetta il dict di calcola_numeri_compatibilita_persona, il solo dict "core"
+    o una sequenza di sei numeri.
+    """
+    if isinstance(profilo, dict):
+        core = profilo.get("core", profilo)
+        return np.array([core[nome] for nome in COLONNE_CORE], dtype=np.int64)
+    vettore = np.asarray(profilo, dtype=np.int64).reshape(-1)
+    if vettore.shape[0] != len(COLONNE_CORE):
+        raise ValueError(f"Il vettore core deve avere {len(COLONNE_CORE)} numeri.")
+    return vettore
+
+
+def _matrice_core(colonne):
+    """Matrice (righe, 6) dei numeri core da un dict di colonne del motore."""
+    return np.stack([np.asarray(colonne[nome], dtype=np.int64) for nome in COLONNE_CORE], axis=1)
+
+
+def _raggruppa(core):
+    """Restituisce (vettori distinti, indice del gruppo per riga, righe per gruppo)."""
+    codici, inverso, conteggi = np.unique(core @ _BASI, return_inverse=True, return_counts=True)
+    vettori = (codici[:, None] // _BASI) % _VALORI
+    return vettori, inverso.reshape(-1), conteggi
+
+
+def _punteggi_gruppi(vettori_a, vettori_b, pesi):
+    """Punteggi (gruppi_a, gruppi_b) sommando le matrici pesate di ogni categoria."""
+    punteggi = np.zeros((vettori_a.shape[0], vettori_b.shape[0]), dtype=np.float32)
+    for indice, matrice in _tabelle_pesate(pesi):
+        punteggi += matrice[vettori_a[:, indice][:, None], vettori_b[:, indice][None, :]]
+    return punteggi
+
+
+# --- ARCHIVIO PER LE RICERCHE TOP-K ---
+
+class ArchivioAffinita:
+    """Archivio di profili raggruppati per vettore core, per ricerche top-k ripetute."""
+
+    def __init__(self, colonne, pesi=None):
+        self.pesi = pesi
+        self.vettori, gruppo_riga, self.conteggi = _raggruppa(_matrice_core(colonne))
+        self.gruppo_riga = gruppo_riga.astype(np.int32)
+        # Righe ordinate per gruppo: le righe del gruppo g sono righe[inizi[g]:inizi[g + 1]]
+        self.righe = np.argsort(self.gruppo_riga, kind="stable")
+        self.inizi = np.concatenate(([0], np.cumsum(self.conteggi)))
+
+    @classmethod
+    def da_file(cls, percorso, pesi=None, **opzioni):
+        """Costruisce l'archivio da un file CSV o Parquet (vedi calcola_profili_da_file)."""
+        return cls(calcola_profili_da_file(percorso, **opzioni), pesi)
+
+    def __len__(self):
+        return int(self.inizi[-1])
+
+    @property
+    def numero_gruppi(self):
+        return self.vettori.shape[0]
+
+    def punteggi_gruppi(self, profilo, pesi=None):
+        """Punteggio del profilo contro ogni gruppo dell'archivio."""
+        pesi = self.pesi if pesi is None else pesi
+        return _punteggi_gruppi(vettore_core(profilo)[None, :], self.vettori, pesi)[0]
+
+    def migliori(self, profilo, k=10, pesi=None, escludi=()):
+        """
+        Restituisce (righe, punteggi) dei k profili più compatibili, in ordine decrescente.
+        A parità di punteggio vince la riga con indice minore; 'escludi' toglie righe
+        dal risultato (es. la riga del profilo stesso).
+        """
+        escludi = np.asarray(list(escludi), dtype=np.int64)
+        if k <= 0 or not len(self):
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        punteggi = self.punteggi_gruppi(profilo, pesi)
+
+        # Punteggio soglia: quello del gruppo in cui si raggiungono le righe richieste
+        richieste = k + escludi.size
+        ordine = np.argsort(-punteggi, kind="stable")
+        cumulati = np.cumsum(self.conteggi[ordine])
+        soglia = punteggi[ordine[min(int(np.searchsorted(cumulati, richieste)), ordine.shape[0] - 1)]]
+
+        # Sopra la soglia entrano tutte le righe, alla soglia quelle con indice minore
+        sopra = np.flatnonzero(punteggi > soglia)
+        righe = [self.righe[self.inizi[g]:self.inizi[g + 1]] for g in sopra]
+        righe.append(self._prime_righe(punteggi == soglia, richieste - int(self.conteggi[sopra].sum())))
+        righe = np.concatenate(righe)
+        if escludi.size:
+            righe = righe[~np.isin(righe, escludi)]
+        punteggi_righe = punteggi[self.gruppo_riga[righe]]
+        # Ordina per punteggio decrescente e, a parità, per riga crescente
+        posizioni = np.lexsort((righe, -punteggi_righe))[:k]
+        return righe[posizioni], punteggi_righe[posizioni]
+
+    def _prime_righe(self, gruppi_scelti, quante, blocco=1 << 20):
+        """Le prime 'quante' righe (per indice) che appartengono ai gruppi scelti."""
+        trovate = []
+        for inizio in range(0, len(self), blocco):
+            if quante <= 0:
+                break
+            righe = np.flatnonzero(gruppi_scelti[self.gruppo_riga[inizio:inizio + blocco]])[:quante] + inizio
+            trovate.append(righe)
+            quante -= righe.size
+        return np.concatenate(trovate) if trovate else np.zeros(0, dtype=np.int64)
+
+
+# --- MODALITÀ MATRICE N x M ---
+
+def matrice_compatibilita(colonne_a, colonne_b, pesi=None):
+    """
+    Matrice (N, M) dei punteggi tra due gruppi di profili (es. per assegnare i posti
+    a un evento). Il calcolo avviene sui gruppi distinti e poi viene espanso.
+    I punteggi sono gli stessi di migliori(): a parità, chi li ordina deve
+    usare l'indice di riga per avere risultati stabili.
+    """
+    vettori_a, gruppo_a, _ = _raggruppa(_matrice_core(colonne_a))
+    vettori_b, gruppo_b, _ = _raggruppa(_matrice_core(colonne_b))
+    punteggi = _punteggi_gruppi(vettori_a, vettori_b, pesi)
+    return punteggi[gruppo_a][:, gruppo_b]
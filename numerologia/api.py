@@ -0,0 +1,356 @@
+"""
+API HTTP JSON per profili e compatibilità, senza Streamlit.
+
+Server asyncio HTTP/1.1 della sola libreria standard, con connessioni
+keep-alive. Endpoint:
+
+    GET  /salute
+    POST /profilo  {"nome", "cognome", "data_nascita": "GG/MM/AAAA" o "AAAA-MM-GG"}
+    POST /coppia   {"persona1": {...}, "persona2": {...}}
+    POST /lotto    {"tipo": "profilo" | "coppia", "elementi": [...]}  (max MAX_ELEMENTI_LOTTO)
+    GET  /metrics  metriche in formato Prometheus (numerologia/metriche.py)
+
+/profilo accetta anche GET con gli stessi campi nella query string.
+I lotti vengono calcolati con il motore vettoriale fuori dal loop; con
+"Accept: application/x-ndjson" (o ?stream=1) la risposta è NDJSON in
+chunked encoding, una riga per elemento nell'ordine di invio.
+
+Uso:
+    python -m numerologia.api --host 0.0.0.0 --porta 8080
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import sys
+from datetime import date
+from urllib.parse import parse_qsl, urlsplit
+
+from .calcolo import calcola_numeri_compatibilita_persona
+from .compatibilita import analisi_coppia
+from .metriche import misura, testo_prometheus
+
+MAX_ELEMENTI_LOTTO = 10_000
+MAX_CORPO = 16 * 1024 * 1024
+MAX_INTESTAZIONI = 16 * 1024
+TIMEOUT_INATTIVITA = 15.0  # secondi di keep-alive senza richieste
+BLOCCO_STREAMING = 1000    # elementi calcolati per ogni passo dello streaming
+
+_log = logging.getLogger(__name__)
+
+STATI = {
+    200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+    408: "Request Timeout", 411: "Length Required", 413: "Payload Too Large",
+    422: "Unprocessable Entity", 500: "Internal Server Error",
+}
+
+
+class ErroreRichiesta(Exception):
+    """Errore del client: diventa una risposta JSON {"errore": ...} con lo stato indicato."""
+
+    def __init__(self, stato, messaggio):
+        super().__init__(messaggio)
+        self.stato = stato
+
+
+def _json(dati):
+    return json.dumps(dati, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+# --- CALCOLO ---
+
+def leggi_data(valore):
+    """Data di nascita da "GG/MM/AAAA" o "AAAA-MM-GG"."""
+    if not isinstance(valore, str):
+        raise ValueError("data_nascita deve essere una stringa GG/MM/AAAA o AAAA-MM-GG")
+    valore = valore.strip()
+    try:
+        if "/" in valore:
+            # Più veloce di strptime: i lotti ne leggono migliaia per richiesta
+            giorno, mese, anno = valore.split("/")
+            if len(anno) != 4:
+                raise ValueError
+            data = date(int(anno), int(mese), int(giorno))
+        else:
+            data = date.fromisoformat(valore)
+    except ValueError:
+        raise ValueError(f"data_nascita non valida: {valore!r}") from None
+    if data > date.today():
+        raise ValueError("data_nascita nel futuro")
+    return data
+
+
+def _persona(dati):
+    if not isinstance(dati, dict):
+        raise ValueError("ogni persona deve essere un oggetto JSON")
+    nome, cognome = dati.get("nome"), dati.get("cognome")
+    if not isinstance(nome, str) or not nome.strip() or not isinstance(cognome, str) or not cognome.strip():
+        raise ValueError("nome e cognome sono obbligatori")
+    return nome.strip(), cognome.strip(), leggi_data(dati.get("data_nascita"))
+
+
+def profilo(dati):
+    nome, cognome, data = _persona(dati)
+    return calcola_numeri_compatibilita_persona(nome, cognome, data.day, data.month, data.year)
+
+
+def coppia(dati):
+    if not isinstance(dati, dict):
+        raise ValueError("la coppia deve essere un oggetto JSON con persona1 e persona2")
+    profilo1, profilo2 = profilo(dati.get("persona1")), profilo(dati.get("persona2"))
+    return {"persona1": profilo1, "persona2": profilo2, "analisi": analisi_coppia(profilo1, profilo2)}
+
+
+def _profili_vettoriali(elementi):
+    """Profili di un blocco con il motore NumPy; None se qualche elemento non è valido."""
+    try:
+        from .motore import calcola_profili_componenti, profili_da_colonne
+    except ImportError:
+        return None
+    try:
+        persone = [_persona(e) for e in elementi]
+    except ValueError:
+        return None
+    colonne = calcola_profili_componenti(
+        [p[0] for p in persone], [p[1] for p in persone],
+        [p[2].day for p in persone], [p[2].month for p in persone], [p[2].year for p in persone],
+    )
+    return profili_da_colonne(colonne)
+
+
+def calcola_blocco(tipo, elementi, inizio=0):
+    """Risultati di un blocco del lotto: {"indice", "risultato"} o {"indice", "errore"} per elemento."""
+    if tipo == "profilo":
+        profili = _profili_vettoriali(elementi)
+        if profili is not None:
+            return [{"indice": inizio + i, "risultato": p} for i, p in enumerate(profili)]
+    funzione = profilo if tipo == "profilo" else coppia
+    risultati = []
+    for i, elemento in enumerate(elementi, start=inizio):
+        try:
+            risultati.append({"indice": i, "risultato": funzione(elemento)})
+        except ValueError as e:
+            risultati.append({"indice": i, "errore": str(e)})
+    return risultati
+
+
+def _ndjson(risultati):
+    return b"".join(_json(r) + b"\n" for r in risultati)
+
+
+# --- HTTP ---
+
+class Richiesta:
+    def __init__(self, metodo, percorso, query, intestazioni, corpo, versione):
+        self.metodo = metodo
+        self.percorso = percorso
+        self.query = query
+        self.intestazioni = intestazioni
+        self.corpo = corpo
+        self.versione = versione
+        self.risposta_iniziata = False  # stato e intestazioni già inviati (streaming)
+
+    @property
+    def keep_alive(self):
+        connessione = self.intestazioni.get("connection", "").lower()
+        if self.versione == "HTTP/1.0":
+            return connessione == "keep-alive"
+        return connessione != "close"
+
+    def json(self):
+        if not self.corpo:
+            raise ErroreRichiesta(400, "corpo JSON mancante")
+        try:
+            return json.loads(self.corpo)
+        except ValueError as e:
+            raise ErroreRichiesta(400, f"JSON non valido: {e}") from None
+
+
+async def leggi_richiesta(reader):
+    """Legge una richiesta; None se il client ha chiuso la connessione."""
+    try:
+        testa = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), TIMEOUT_INATTIVITA)
+    except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+        return None
+    except asyncio.LimitOverrunError:
+        raise ErroreRichiesta(413, "intestazioni troppo grandi") from None
+    righe = testa.decode("latin-1").split("\r\n")
+    try:
+        metodo, destinazione, versione = righe[0].split(" ")
+    except ValueError:
+        raise ErroreRichiesta(400, "riga di richiesta non valida") from None
+    intestazioni = {}
+    for riga in righe[1:]:
+        if riga:
+            nome, _, valore = riga.partition(":")
+            intestazioni[nome.strip().lower()] = valore.strip()
+
+    if "chunked" in intestazioni.get("transfer-encoding", "").lower():
+        raise ErroreRichiesta(411, "usa Content-Length invece di Transfer-Encoding: chunked")
+    try:
+        lunghezza = int(intestazioni.get("content-length", "0"))
+    except ValueError:
+        raise ErroreRichiesta(400, "Content-Length non valido") from None
+    if lunghezza < 0:
+        raise ErroreRichiesta(400, "Content-Length non valido")
+    if lunghezza > MAX_CORPO:
+        raise ErroreRichiesta(413, f"corpo oltre {MAX_CORPO} byte")
+    corpo = b""
+    if lunghezza:
+        # Stesso limite delle intestazioni: un client lento non tiene aperta la connessione
+        try:
+            corpo = await asyncio.wait_for(reader.readexactly(lunghezza), TIMEOUT_INATTIVITA)
+        except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+            return None
+    url = urlsplit(destinazione)
+    return Richiesta(metodo.upper(), url.path, dict(parse_qsl(url.query)), intestazioni, corpo, versione)
+
+
+def _testa(stato, keep_alive, extra):
+    righe = [f"HTTP/1.1 {stato} {STATI.get(stato, '')}", "Server: numerologia"]
+    righe += [f"{nome}: {valore}" for nome, valore in extra]
+    righe.append("Connection: keep-alive" if keep_alive else "Connection: close")
+    if keep_alive:
+        righe.append(f"Keep-Alive: timeout={int(TIMEOUT_INATTIVITA)}")
+    return ("\r\n".join(righe) + "\r\n\r\n").encode("latin-1")
+
+
+async def rispondi(writer, stato, corpo, keep_alive, tipo="application/json; charset=utf-8"):
+    writer.write(_testa(stato, keep_alive, [("Content-Type", tipo), ("Content-Length", len(corpo))]) + corpo)
+    await writer.drain()
+
+
+class ServerNumerologia:
+    """Server HTTP con instradamento minimo e calcolo dei lotti in thread."""
+
+    def __init__(self):
+        self.percorsi = {
+            ("GET", "/salute"): self.salute,
+            ("GET", "/profilo"): self.profilo,
+            ("POST", "/profilo"): self.profilo,
+            ("POST", "/coppia"): self.coppia,
+            ("POST", "/lotto"): self.lotto,
+            ("GET", "/metrics"): self.metriche,
+        }
+
+    async def salute(self, richiesta, writer):
+        return {"stato": "ok"}
+
+    async def metriche(self, richiesta, writer):
+        corpo = testo_prometheus().encode("utf-8")
+        await rispondi(writer, 200, corpo, richiesta.keep_alive, "text/plain; version=0.0.4; charset=utf-8")
+        return None
+
+    async def profilo(self, richiesta, writer):
+        dati = richiesta.query if richiesta.metodo == "GET" else richiesta.json()
+        return self._valida(profilo, dati)
+
+    async def coppia(self, richiesta, writer):
+        return self._valida(coppia, richiesta.json())
+
+    @staticmethod
+    def _valida(funzione, dati):
+        try:
+            return funzione(dati)
+        except ValueError as e:
+            raise ErroreRichiesta(422, str(e)) from None
+
+    async def lotto(self, richiesta, writer):
+        dati = richiesta.json()
+        if not isinstance(dati, dict) or dati.get("tipo") not in ("profilo", "coppia"):
+            raise ErroreRichiesta(400, 'serve {"tipo": "profilo" | "coppia", "elementi": [...]}')
+        elementi = dati.get("elementi")
+        if not isinstance(elementi, list):
+            raise ErroreRichiesta(400, '"elementi" deve essere una lista')
+        if len(elementi) > MAX_ELEMENTI_LOTTO:
+            raise ErroreRichiesta(413, f"al massimo {MAX_ELEMENTI_LOTTO} elementi per lotto")
+        loop = asyncio.get_running_loop()
+        streaming = ("application/x-ndjson" in richiesta.intestazioni.get("accept", "")
+                     or richiesta.query.get("stream") == "1")
+        if not streaming:
+            risultati = await loop.run_in_executor(None, calcola_blocco, dati["tipo"], elementi)
+            return {"risultati": risultati}
+
+        # NDJSON a blocchi: ogni blocco viene calcolato in un thread e scritto appena pronto
+        writer.write(_testa(200, richiesta.keep_alive, [
+            ("Content-Type", "application/x-ndjson; charset=utf-8"), ("Transfer-Encoding", "chunked"),
+        ]))
+        richiesta.risposta_iniziata = True
+        for inizio in range(0, len(elementi), BLOCCO_STREAMING):
+            blocco = elementi[inizio:inizio + BLOCCO_STREAMING]
+            corpo = await loop.run_in_executor(
+                None, lambda b=blocco, i=inizio: _ndjson(calcola_blocco(dati["tipo"], b, i)))
+            writer.write(b"%x\r\n%s\r\n" % (len(corpo), corpo))
+            await writer.drain()  # contropressione se il client legge lentamente
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+        return None
+
+    async def gestisci(self, reader, writer):
+        """Serve le richieste di una connessione finché resta aperta."""
+        try:
+            while True:
+                try:
+                    richiesta = await leggi_richiesta(reader)
+                except ErroreRichiesta as e:
+                    await rispondi(writer, e.stato, _json({"errore": str(e)}), keep_alive=False)
+                    break
+                if richiesta is None:
+                    break
+                keep_alive = richiesta.keep_alive
+                gestore = self.percorsi.get((richiesta.metodo, richiesta.percorso))
+                try:
+                    if gestore is None:
+                        metodi = [m for m, p in self.percorsi if p == richiesta.percorso]
+                        raise ErroreRichiesta(405 if metodi else 404, "metodo non consentito" if metodi else "percorso non trovato")
+                    with misura(f"api.{richiesta.percorso.strip('/')}"):
+                        risultato = await gestore(richiesta, writer)
+                    if risultato is not None:
+                        await rispondi(writer, 200, _json(risultato), keep_alive)
+                except Exception as e:
+                    if richiesta.risposta_iniziata:
+                        # Risposta già a metà: un nuovo stato corromperebbe il flusso. Si chiude
+                        # la connessione senza il chunk finale, così il client vede il troncamento
+                        _log.exception("Errore durante lo streaming di %s", richiesta.percorso)
+                        break
+                    if isinstance(e, ErroreRichiesta):
+                        await rispondi(writer, e.stato, _json({"errore": str(e)}), keep_alive)
+                    else:
+                        await rispondi(writer, 500, _json({"errore": f"errore interno: {e}"}), keep_alive=False)
+                        break
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+async def avvia(host="127.0.0.1", porta=8080):
+    server = ServerNumerologia()
+    return await asyncio.start_server(server.gestisci, host, porta, limit=MAX_INTESTAZIONI, backlog=1024)
+
+
+async def _servi(host, porta):
+    server = await avvia(host, porta)
+    indirizzi = ", ".join(f"{s.getsockname()[0]}:{s.getsockname()[1]}" for s in server.sockets)
+    print(f"🚀 API numerologia in ascolto su {indirizzi}")
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="API HTTP JSON per profili e compatibilità.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--porta", type=int, default=8080)
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(_servi(args.host, args.porta))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
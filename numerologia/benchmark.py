@@ -0,0 +1,244 @@
+"""
+Micro-benchmark dei percorsi critici di calcolo e compatibilità.
+
+Corpus sintetici deterministici (1, 1k, 1M profili), casi a chiamata singola
+e batch, lookup di compatibilità su tutte le 81 coppie di numeri. Per ogni
+caso riporta la distribuzione dei tempi per chiamata e il picco di memoria,
+salva i risultati in JSON e li confronta con una baseline.
+
+Uso:
+    python -m numerologia.benchmark --output bench.json
+    python -m numerologia.benchmark --dimensioni 1 1k --confronta bench.json --soglia 0.10
+"""
+
+import argparse
+import fnmatch
+import json
+import platform
+import random
+import statistics
+import sys
+import timeit
+import tracemalloc
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+
+from .calcolo import analizza_nome_base, calcola_numeri_compatibilita_persona
+from .compatibilita import MAPPE_COMPATIBILITA, get_compatibilita_analysis
+from .verifica import NOMI_ITALIANI
+
+DIMENSIONI = {"1": 1, "1k": 1_000, "1M": 1_000_000}
+SEME = 20250714
+
+
+# --- CORPUS SINTETICI ---
+
+@lru_cache(maxsize=None)
+def corpus_sintetico(quantita, seme=SEME):
+    """Restituisce (nomi, cognomi, date GG/MM/AAAA) deterministici per la dimensione data."""
+    rnd = random.Random(seme)
+    inizio = date(1920, 1, 1)
+    giorni = (date(2010, 12, 31) - inizio).days
+    nomi = [rnd.choice(NOMI_ITALIANI) for _ in range(quantita)]
+    cognomi = [rnd.choice(NOMI_ITALIANI) for _ in range(quantita)]
+    date_nascita = [
+        (inizio + timedelta(days=rnd.randrange(giorni))).strftime("%d/%m/%Y") for _ in range(quantita)
+    ]
+    return nomi, cognomi, date_nascita
+
+
+# --- CASI ---
+
+def _caso_singolo(nomi, cognomi, date_nascita):
+    giorno, mese, anno = (int(p) for p in date_nascita[0].split("/"))
+    return lambda: calcola_numeri_compatibilita_persona(nomi[0], cognomi[0], giorno, mese, anno)
+
+
+def _caso_ciclo_scalare(nomi, cognomi, date_nascita):
+    righe = [
+        (nome, cognome, *(int(p) for p in data.split("/")))
+        for nome, cognome, data in zip(nomi, cognomi, date_nascita)
+    ]
+
+    def esegui():
+        for nome, cognome, giorno, mese, anno in righe:
+            calcola_numeri_compatibilita_persona(nome, cognome, giorno, mese, anno)
+    return esegui
+
+
+def _caso_batch(nomi, cognomi, date_nascita):
+    import numpy as np
+    from .motore import calcola_profili
+
+    nomi, cognomi, date_nascita = np.array(nomi), np.array(cognomi), np.array(date_nascita)
+    return lambda: calcola_profili(nomi, cognomi, date_nascita)
+
+
+def _caso_affinita(nomi, cognomi, date_nascita):
+    from .affinita import ArchivioAffinita
+    from .motore import calcola_profili
+
+    archivio = ArchivioAffinita(calcola_profili(nomi, cognomi, date_nascita))
+    return lambda: archivio.migliori([1, 2, 3, 4, 5, 6], k=10)
+
+
+def _caso_compatibilita_81():
+    coppie = [(a, b) for a in range(1, 10) for b in range(1, 10)]
+    mappe = list(MAPPE_COMPATIBILITA.values())
+
+    def esegui():
+        for mappa in mappe:
+            for a, b in coppie:
+                get_compatibilita_analysis(a, b, mappa)
+    return esegui
+
+
+def casi(dimensioni):
+    """
+    Restituisce {nome caso: (preparazione, chiamate logiche per esecuzione)}.
+    La preparazione costruisce la funzione da misurare solo se il caso è selezionato.
+    """
+    risultato = {
+        "analizza_nome_base": (lambda: (lambda: analizza_nome_base("Maria Grazia")), 1),
+        "get_compatibilita_analysis[81x9]": (_caso_compatibilita_81, 81 * len(MAPPE_COMPATIBILITA)),
+    }
+    for etichetta in dimensioni:
+        quantita = DIMENSIONI[etichetta]
+
+        def prepara(caso, quantita=quantita):
+            return lambda: caso(*corpus_sintetico(quantita))
+
+        if quantita == 1:
+            risultato["calcola_numeri_compatibilita_persona[1]"] = (prepara(_caso_singolo), 1)
+        elif quantita <= 10_000:
+            risultato[f"calcola_numeri_compatibilita_persona[{etichetta}]"] = (prepara(_caso_ciclo_scalare), quantita)
+        risultato[f"calcola_profili[{etichetta}]"] = (prepara(_caso_batch), quantita)
+        if quantita > 1:
+            risultato[f"affinita_top10[{etichetta}]"] = (prepara(_caso_affinita), 1)
+    return risultato
+
+
+# --- MISURA ---
+
+def misura(funzione, ripetizioni=7):
+    """Tempi per esecuzione (secondi) e picco di memoria (byte) di una funzione."""
+    timer = timeit.Timer(funzione)
+    numero, _ = timer.autorange()  # esecuzioni per campione, per campioni di almeno 0.2 s
+    campioni = [t / numero for t in timer.repeat(repeat=ripetizioni, number=numero)]
+
+    # Il picco di memoria si misura a parte: tracemalloc rallenta l'esecuzione
+    tracemalloc.start()
+    try:
+        funzione()
+        picco = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return campioni, picco
+
+
+def statistiche(campioni, chiamate=1):
+    """Distribuzione dei tempi per chiamata logica, in microsecondi."""
+    per_chiamata = sorted(t / chiamate * 1e6 for t in campioni)
+    p95 = statistics.quantiles(per_chiamata, n=20)[-1] if len(per_chiamata) > 1 else per_chiamata[0]
+    return {
+        "min_us": per_chiamata[0],
+        "mediana_us": statistics.median(per_chiamata),
+        "media_us": statistics.fmean(per_chiamata),
+        "p95_us": p95,
+        "max_us": per_chiamata[-1],
+        "dev_std_us": statistics.stdev(per_chiamata) if len(per_chiamata) > 1 else 0.0,
+    }
+
+
+def esegui_benchmark(dimensioni=("1", "1k", "1M"), filtro="*", ripetizioni=7):
+    """Esegue i casi selezionati e restituisce il documento JSON dei risultati."""
+    risultati = {}
+    for nome, (preparazione, chiamate) in casi(dimensioni).items():
+        if not fnmatch.fnmatch(nome, filtro):
+            continue
+        try:
+            funzione = preparazione()
+        except ImportError as e:
+            print(f"  {nome:<45} saltato: {e}")
+            continue
+        campioni, picco = misura(funzione, ripetizioni)
+        risultati[nome] = {
+            **statistiche(campioni, chiamate),
+            "chiamate": chiamate,
+            "ripetizioni": len(campioni),
+            "picco_memoria_byte": picco,
+        }
+        print(f"  {nome:<45} mediana {risultati[nome]['mediana_us']:>12.3f} µs/chiamata"
+              f"  picco {picco / 1024:>10.1f} KiB")
+    try:
+        import numpy
+        versione_numpy = numpy.__version__
+    except ImportError:
+        versione_numpy = None
+    return {
+        "meta": {
+            "data": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "numpy": versione_numpy,
+            "piattaforma": platform.platform(),
+            "seme": SEME,
+        },
+        "risultati": risultati,
+    }
+
+
+# --- CONFRONTO CON LA BASELINE ---
+
+def confronta(attuale, baseline, soglia=0.10):
+    """Restituisce le righe di confronto e la lista dei casi in regressione (mediana oltre soglia)."""
+    righe, regressioni = [], []
+    for nome, risultato in attuale["risultati"].items():
+        riferimento = baseline.get("risultati", {}).get(nome)
+        if riferimento is None:
+            righe.append(f"  {nome:<45} (nuovo caso)")
+            continue
+        rapporto = risultato["mediana_us"] / riferimento["mediana_us"]
+        stato = "✅"
+        if rapporto > 1 + soglia:
+            stato = "⚠️ "
+            regressioni.append(nome)
+        righe.append(f"{stato} {nome:<45} {rapporto:>6.2f}x rispetto alla baseline")
+    return righe, regressioni
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark dei calcoli numerologici.")
+    parser.add_argument("--dimensioni", nargs="+", default=["1", "1k", "1M"], choices=list(DIMENSIONI))
+    parser.add_argument("--casi", default="*", help="Filtro glob sui nomi dei casi (es. 'calcola_profili*').")
+    parser.add_argument("--ripetizioni", type=int, default=7)
+    parser.add_argument("--output", help="File JSON in cui salvare i risultati.")
+    parser.add_argument("--confronta", help="File JSON di baseline con cui confrontare.")
+    parser.add_argument("--soglia", type=float, default=0.10, help="Rallentamento massimo ammesso (0.10 = 10%%).")
+    args = parser.parse_args(argv)
+
+    # La baseline si legge prima di eseguire: --output può sovrascrivere lo stesso file
+    baseline = None
+    if args.confronta:
+        with open(args.confronta, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    print("\n⏱️  Benchmark numerologia...\n")
+    attuale = esegui_benchmark(args.dimensioni, args.casi, args.ripetizioni)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(attuale, f, indent=2, ensure_ascii=False)
+        print(f"\n💾 Risultati salvati in {args.output}")
+
+    if baseline is not None:
+        righe, regressioni = confronta(attuale, baseline, args.soglia)
+        print("\n📊 Confronto con la baseline:\n")
+        print("\n".join(righe))
+        if regressioni:
+            print(f"\n⚠️  {len(regressioni)} regressioni oltre il {args.soglia:.0%}.")
+            return 1
+        print("\n✅ Nessuna regressione.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
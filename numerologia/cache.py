@@ -0,0 +1,276 @@
+"""
+Cache in memoria con statistiche e monitoraggio delle cache di Streamlit.
+
+CacheLRU è una cache LRU thread-safe con scadenza (TTL) che conta hit, miss,
+espulsioni e dimensione delle voci. cache_monitorata avvolge invece le
+funzioni decorate con st.cache_data / st.cache_resource: con il monitoraggio
+attivo (variabile d'ambiente NUMEROLOGIA_CACHE_STATS=1) conta chiamate,
+ricalcoli e dimensione dei risultati; altrimenti non aggiunge nulla.
+
+Esempio:
+    @cache_monitorata(st.cache_data, ttl=3600, max_entries=1000)
+    def carica_testi(categoria):
+        ...
+
+    report_cache()  # -> [{"nome": ..., "hit": ..., "miss": ..., ...}]
+"""
+
+import atexit
+import functools
+import hashlib
+import json
+import os
+import pickle
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+_MANCANTE = object()
+_REGISTRO = {}
+_LOCK_REGISTRO = threading.Lock()
+
+
+def monitoraggio_attivo():
+    """True se il monitoraggio runtime delle cache è attivo."""
+    return os.environ.get("NUMEROLOGIA_CACHE_STATS", "") not in ("", "0")
+
+
+def dimensione_voce(valore):
+    """Stima in byte di un valore in cache (serializzazione pickle, o sys.getsizeof)."""
+    try:
+        return len(pickle.dumps(valore, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return sys.getsizeof(valore)
+
+
+# --- STATISTICHE ---
+
+class StatisticheCache:
+    """Contatori di una cache: hit, miss, espulsioni, scadenze e byte delle voci."""
+
+    def __init__(self, nome):
+        self.nome = nome
+        self.voci = 0
+        self.byte = 0
+        self.azzera()
+
+    def azzera(self):
+        """Azzera i contatori (voci e byte presenti restano quelli reali)."""
+        self.hit = 0
+        self.miss = 0
+        self.espulsioni = 0
+        self.scadenze = 0
+        self.byte_max_voce = 0
+
+    @property
+    def tasso_hit(self):
+        totale = self.hit + self.miss
+        return self.hit / totale if totale else 0.0
+
+    def registra_voce(self, byte):
+        self.byte_max_voce = max(self.byte_max_voce, byte)
+
+    def come_dict(self):
+        return {
+            "nome": self.nome,
+            "hit": self.hit,
+            "miss": self.miss,
+            "tasso_hit": round(self.tasso_hit, 4),
+            "espulsioni": self.espulsioni,
+            "scadenze": self.scadenze,
+            "voci": self.voci,
+            "byte": self.byte,
+            "byte_medi_voce": self.byte // self.voci if self.voci else 0,
+            "byte_max_voce": self.byte_max_voce,
+        }
+
+
+def _registra(nome):
+    """Restituisce le statistiche registrate con questo nome, creandole se serve."""
+    with _LOCK_REGISTRO:
+        statistiche = _REGISTRO.get(nome)
+        if statistiche is None:
+            statistiche = _REGISTRO[nome] = StatisticheCache(nome)
+        return statistiche
+
+
+def statistiche_cache(nome):
+    """Statistiche registrate con questo nome, per le cache gestite fuori da questo modulo."""
+    return _registra(nome)
+
+
+def report_cache():
+    """Statistiche di tutte le cache registrate, ordinate per nome."""
+    with _LOCK_REGISTRO:
+        return [_REGISTRO[nome].come_dict() for nome in sorted(_REGISTRO)]
+
+
+def azzera_statistiche():
+    """Azzera tutte le statistiche registrate."""
+    with _LOCK_REGISTRO:
+        for statistiche in _REGISTRO.values():
+            statistiche.azzera()
+
+
+# --- CACHE LRU CON TTL ---
+
+class CacheLRU:
+    """
+    Cache LRU thread-safe con scadenza opzionale delle voci (ttl in secondi).
+    Se misura_byte è True stima anche la dimensione delle voci (più lento).
+    """
+
+    def __init__(self, nome, max_voci=128, ttl=None, misura_byte=False):
+        if max_voci <= 0:
+            raise ValueError("max_voci deve essere positivo.")
+        self.nome = nome
+        self.max_voci = max_voci
+        self.ttl = ttl
+        self.misura_byte = misura_byte
+        self.statistiche = _registra(nome)
+        self._voci = OrderedDict()  # chiave -> (scadenza, valore, byte)
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._voci)
+
+    def __contains__(self, chiave):
+        return self.get(chiave, _MANCANTE, conta=False) is not _MANCANTE
+
+    def _rimuovi(self, chiave):
+        _, _, byte = self._voci.pop(chiave)
+        self.statistiche.voci -= 1
+        self.statistiche.byte -= byte
+
+    def get(self, chiave, predefinito=None, conta=True):
+        """Valore in cache per la chiave (o predefinito), aggiornando l'ordine LRU."""
+        with self._lock:
+            voce = self._voci.get(chiave)
+            if voce is not None and voce[0] is not None and voce[0] < time.monotonic():
+                self._rimuovi(chiave)
+                if conta:
+                    self.statistiche.scadenze += 1
+                voce = None
+            if voce is None:
+                if conta:
+                    self.statistiche.miss += 1
+                return predefinito
+            self._voci.move_to_end(chiave)
+            if conta:
+                self.statistiche.hit += 1
+            return voce[1]
+
+    def set(self, chiave, valore):
+        """Inserisce o sostituisce una voce, espellendo la meno usata se la cache è piena."""
+        byte = dimensione_voce(valore) if self.misura_byte else 0
+        scadenza = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            if chiave in self._voci:
+                self._rimuovi(chiave)
+            self._voci[chiave] = (scadenza, valore, byte)
+            self.statistiche.voci += 1
+            self.statistiche.byte += byte
+            self.statistiche.registra_voce(byte)
+            while len(self._voci) > self.max_voci:
+                self._rimuovi(next(iter(self._voci)))
+                self.statistiche.espulsioni += 1
+
+    def ottieni_o_calcola(self, chiave, funzione):
+        """Restituisce la voce in cache o la calcola con funzione() e la memorizza."""
+        valore = self.get(chiave, _MANCANTE)
+        if valore is _MANCANTE:
+            valore = funzione()
+            self.set(chiave, valore)
+        return valore
+
+    def svuota(self):
+        with self._lock:
+            for chiave in list(self._voci):
+                self._rimuovi(chiave)
+
+
+def memoizza(max_voci=128, ttl=None, nome=None):
+    """Decoratore: memoizza una funzione (argomenti hashable) in una CacheLRU."""
+    def decoratore(funzione):
+        cache = CacheLRU(nome or f"{funzione.__module__}.{funzione.__qualname__}", max_voci, ttl)
+
+        @functools.wraps(funzione)
+        def avvolta(*args, **kwargs):
+            chiave = (args, tuple(sorted(kwargs.items()))) if kwargs else args
+            return cache.ottieni_o_calcola(chiave, lambda: funzione(*args, **kwargs))
+
+        avvolta.cache = cache
+        return avvolta
+    return decoratore
+
+
+# --- MONITORAGGIO DELLE CACHE DI STREAMLIT ---
+
+def _impronta_argomenti(args, kwargs):
+    """Impronta compatta degli argomenti, anche non hashable."""
+    return hashlib.blake2b(repr((args, sorted(kwargs.items()))).encode(), digest_size=16).digest()
+
+
+def cache_monitorata(decoratore, nome=None, **opzioni):
+    """
+    Applica decoratore(**opzioni) (es. st.cache_data, st.cache_resource) a una funzione.
+    Con il monitoraggio attivo conta chiamate, ricalcoli e byte dei risultati: un
+    ricalcolo per argomenti già visti significa che la voce è stata espulsa o è scaduta.
+    """
+    def applica(funzione):
+        if not monitoraggio_attivo():
+            return decoratore(**opzioni)(funzione)
+
+        # Le pagine di Streamlit girano come __main__: si usa il nome dello script
+        modulo = funzione.__module__
+        if modulo == "__main__":
+            modulo = os.path.splitext(os.path.basename(funzione.__code__.co_filename))[0]
+        statistiche = _registra(nome or f"{modulo}.{funzione.__qualname__}")
+        byte_per_chiave = {}
+        lock = threading.Lock()
+
+        @functools.wraps(funzione)
+        def calcola(*args, **kwargs):
+            risultato = funzione(*args, **kwargs)
+            impronta = _impronta_argomenti(args, kwargs)
+            byte = dimensione_voce(risultato)
+            with lock:
+                statistiche.miss += 1
+                statistiche.hit -= 1  # la chiamata era stata contata come hit
+                precedente = byte_per_chiave.get(impronta)
+                if precedente is None:
+                    statistiche.voci += 1
+                else:
+                    statistiche.espulsioni += 1
+                    statistiche.byte -= precedente
+                byte_per_chiave[impronta] = byte
+                statistiche.byte += byte
+                statistiche.registra_voce(byte)
+            return risultato
+
+        in_cache = decoratore(**opzioni)(calcola)
+
+        @functools.wraps(funzione)
+        def chiamata(*args, **kwargs):
+            with lock:
+                statistiche.hit += 1
+            return in_cache(*args, **kwargs)
+
+        # Mantiene i metodi del decoratore (es. .clear() di st.cache_data)
+        for attributo in ("clear",):
+            if hasattr(in_cache, attributo):
+                setattr(chiamata, attributo, getattr(in_cache, attributo))
+        return chiamata
+    return applica
+
+
+def _salva_report_all_uscita():
+    percorso = os.environ.get("NUMEROLOGIA_CACHE_STATS_FILE")
+    if percorso and _REGISTRO:
+        with open(percorso, "w", encoding="utf-8") as f:
+            json.dump(report_cache(), f, indent=2)
+
+
+if monitoraggio_attivo():
+    atexit.register(_salva_report_all_uscita)
@@ -0,0 +1,205 @@
+"""
+Funzioni di calcolo numerologico condivise dalle pagine.
+
+Versione scalare (una persona alla volta): per il calcolo su colonne
+intere vedi numerologia/motore.py.
+"""
+
+import unicodedata
+
+from .metriche import tracciato
+
+# --- TABELLE DI LOOKUP ---
+
+_TABELLA_PITAGORICA = {
+    "A": 1, "J": 1, "S": 1,
+    "B": 2, "K": 2, "T": 2,
+    "C": 3, "L": 3, "U": 3,
+    "D": 4, "M": 4, "V": 4,
+    "E": 5, "N": 5, "W": 5,
+    "F": 6, "O": 6, "X": 6,
+    "G": 7, "P": 7, "Y": 7,
+    "H": 8, "Q": 8, "Z": 8,
+    "I": 9, "R": 9
+}
+_VOCALI = "AEIOU"
+
+
+def _piega_accenti(char):
+    """Toglie i segni diacritici (es. "À" -> "A") tramite la decomposizione NFD."""
+    return "".join(c for c in unicodedata.normalize("NFD", char) if not unicodedata.combining(c))
+
+
+def _lettere_carattere(char):
+    """Lettere della tabella Pitagorica in cui si trasforma un carattere ("ß" -> "SS", "è" -> "E")."""
+    return "".join(
+        lettera
+        for maiuscola in char.upper()
+        for lettera in _piega_accenti(maiuscola)
+        if lettera in _TABELLA_PITAGORICA
+    )
+
+
+def valori_carattere(char):
+    """
+    Restituisce (totale, vocali) di un singolo carattere del nome.
+    Come in analizza_nome_base il carattere passa da .upper() (che può
+    espanderlo) e le lettere accentate valgono come la lettera base.
+    """
+    lettere = _lettere_carattere(char)
+    totale = sum(_TABELLA_PITAGORICA[lettera] for lettera in lettere)
+    vocali = sum(_TABELLA_PITAGORICA[lettera] for lettera in lettere if lettera in _VOCALI)
+    return totale, vocali
+
+
+# Valore di ogni carattere Latin-1 (usate con bytes.translate + sum)
+_BYTE_TOTALE = bytes(valori_carattere(chr(cp))[0] for cp in range(256))
+_BYTE_VOCALI = bytes(valori_carattere(chr(cp))[1] for cp in range(256))
+
+
+class _TabellaUnicode(dict):
+    """Tabella per str.translate che riporta ogni carattere fuori da Latin-1 alle sue lettere."""
+
+    def __missing__(self, cp):
+        lettere = self[cp] = _lettere_carattere(chr(cp))
+        return lettere
+
+
+# I caratteri Latin-1 restano invariati, gli altri vengono calcolati al primo uso
+_TABELLA_UNICODE = _TabellaUnicode((cp, cp) for cp in range(256))
+
+
+# --- FUNZIONI DI CALCOLO NUMEROLOGICO (ADATTATE DA 1_mappa_numerologica.py) ---
+
+def valore_lettera(c):
+    """Restituisce il valore numerico di una lettera secondo la tabella Pitagorica."""
+    maiuscola = c.upper()
+    val = _TABELLA_PITAGORICA.get(maiuscola)
+    if val is None:
+        val = _TABELLA_PITAGORICA.get(_piega_accenti(maiuscola), 0)
+    return val
+
+def riduci_fino_1_singolo(n):
+    """Riduce un numero fino a una singola cifra (senza mantenere maestri/karmici intermedi)."""
+    if n is None:
+        return 0
+    if n <= 9:
+        return n
+    return 1 + (n - 1) % 9 # Radice numerica: stessa cifra delle somme ripetute
+
+def analizza_nome_base(nome_input):
+    """Analizza il nome per ottenere somma vocali, consonanti e totale."""
+    # Spazi e caratteri senza valore pesano 0 nelle tabelle: nessun filtro necessario
+    try:
+        codici = nome_input.encode("latin-1")
+    except UnicodeEncodeError:
+        codici = nome_input.translate(_TABELLA_UNICODE).encode("latin-1")
+    total_val = sum(codici.translate(_BYTE_TOTALE))
+    vowels_sum = sum(codici.translate(_BYTE_VOCALI))
+
+    return {
+        "total": total_val,
+        "vowels_sum": vowels_sum,
+        "consonants_sum": total_val - vowels_sum
+    }
+
+@tracciato("calcolo.profilo")
+def calcola_numeri_compatibilita_persona(nome, cognome, giorno, mese, anno):
+    """
+    Calcola tutti i numeri chiave (core e dinamici) per una persona.
+    """
+    
+    # Sentiero di Vita (Metodo semplificato, coerente con 'riduci_fino_1_singolo')
+    giorno_ridotto = riduci_fino_1_singolo(giorno)
+    mese_ridotto = riduci_fino_1_singolo(mese)
+    anno_somma_cifre = sum(int(d) for d in str(anno))
+    anno_ridotto_sv = riduci_fino_1_singolo(anno_somma_cifre)
+    
+    sentiero_di_vita_base = giorno_ridotto + mese_ridotto + anno_somma_cifre
+    sentiero_di_vita = riduci_fino_1_singolo(sentiero_di_vita_base)
+
+    # Analisi Nome e Cognome
+    analisi_nome = analizza_nome_base(nome)
+    analisi_cognome = analizza_nome_base(cognome)
+
+    full_total = analisi_nome["total"] + analisi_cognome["total"]
+    
+    # Numeri Core
+    espressione = riduci_fino_1_singolo(full_total)
+    anima = riduci_fino_1_singolo(analisi_nome["vowels_sum"] + analisi_cognome["vowels_sum"])
+    persona = riduci_fino_1_singolo(analisi_nome["consonants_sum"] + analisi_cognome["consonants_sum"])
+    forza = riduci_fino_1_singolo(giorno + mese) # Nota: qui uso il giorno e mese non ridotti per la base, come in mappa_numerologica (forza_intero)
+    quintessenza = riduci_fino_1_singolo(full_total + sentiero_di_vita_base) # Quintessenza base come in mappa_numerologica
+
+    # === CICLI DI VITA ===
+    fine_exp = 36 - sentiero_di_vita # Usiamo il Sentiero di Vita ridotto a singola cifra
+    fine_pot = fine_exp + 27
+    esperienza_val = mese_ridotto
+    potere_val = giorno_ridotto
+    saggezza_val = anno_ridotto_sv # anno_rid2_sv in mappa_numerologica
+
+    # === PINNACOLI ===
+    p1_val_r2 = riduci_fino_1_singolo(giorno_ridotto + mese_ridotto)
+    p2_val_r2 = riduci_fino_1_singolo(giorno_ridotto + anno_ridotto_sv)
+    p3_val_r2 = riduci_fino_1_singolo(p1_val_r2 + p2_val_r2) # Somma dei pinnacoli ridotti
+    p4_val_r2 = riduci_fino_1_singolo(mese_ridotto + anno_ridotto_sv)
+
+    # === SFIDE ===
+    s1_val_r2 = riduci_fino_1_singolo(abs(giorno_ridotto - mese_ridotto))
+    s2_val_r2 = riduci_fino_1_singolo(abs(anno_ridotto_sv - giorno_ridotto))
+    s3_val_r2 = riduci_fino_1_singolo(abs(s1_val_r2 - s2_val_r2)) # Differenza delle sfide ridotte
+    s4_val_r2 = riduci_fino_1_singolo(abs(anno_ridotto_sv - mese_ridotto))
+
+    return {
+        "core": {
+            "sentiero_di_vita": sentiero_di_vita,
+            "espressione": espressione,
+            "anima": anima,
+            "personalita": persona,
+            "forza": forza,
+            "quintessenza": quintessenza
+        },
+        "dinamici": {
+            "cicli": {
+                "esperienza": esperienza_val,
+                "potere": potere_val,
+                "saggezza": saggezza_val
+            },
+            "pinnacoli": {
+                "p1": p1_val_r2,
+                "p2": p2_val_r2,
+                "p3": p3_val_r2,
+                "p4": p4_val_r2
+            },
+            "sfide": {
+                "s1": s1_val_r2,
+                "s2": s2_val_r2,
+                "s3": s3_val_r2,
+                "s4": s4_val_r2
+            },
+            # Aggiungiamo anche le età di transizione per Pinnacoli/Sfide per riferimento
+            "eta_pinnacoli": {
+                "fine_p1": fine_exp,
+                "fine_p2": fine_exp + 9, # fine P2
+                "fine_p3": fine_exp + 18 # fine P3
+            }
+        }
+    }
+
+
+# --- NUMERI PERSONALI DEL CALENDARIO ---
+
+def anno_personale(giorno_nascita, mese_nascita, anno):
+    """Anno personale: giorno e mese di nascita più l'anno di calendario, ridotti."""
+    anno_ridotto = riduci_fino_1_singolo(sum(int(d) for d in str(anno)))
+    return riduci_fino_1_singolo(riduci_fino_1_singolo(giorno_nascita) + riduci_fino_1_singolo(mese_nascita) + anno_ridotto)
+
+def mese_personale(giorno_nascita, mese_nascita, anno, mese):
+    """Mese personale: anno personale più il mese di calendario, ridotti."""
+    return riduci_fino_1_singolo(anno_personale(giorno_nascita, mese_nascita, anno) + riduci_fino_1_singolo(mese))
+
+def giorno_personale(giorno_nascita, mese_nascita, data):
+    """Giorno personale di una data: mese personale più il giorno del mese, ridotti."""
+    return riduci_fino_1_singolo(
+        mese_personale(giorno_nascita, mese_nascita, data.year, data.month) + riduci_fino_1_singolo(data.day)
+    )
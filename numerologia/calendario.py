@@ -0,0 +1,112 @@
+"""
+Calendario numerologico vettoriale: anno, mese e giorno personali.
+
+Anno, mese e giorno personali sono radici numeriche di somme, quindi
+dipendono dalla data di nascita solo tramite (giorno + mese) modulo 9 e
+dalla data di calendario solo tramite (anno + mese + giorno) modulo 9:
+
+    giorno personale = 1 + (giorno_n + mese_n + anno + mese + giorno - 1) % 9
+
+Il calendario di qualunque gruppo di persone su qualunque intervallo è
+quindi un'unica tabella 9 x 9 indicizzata con i residui delle persone e
+delle date. I calendari annuali vengono tenuti in cache come array uint8 di
+sola lettura per (data di nascita, anno); le date di nascita con lo stesso
+residuo condividono lo stesso array. Coincidono con anno_personale,
+mese_personale e giorno_personale di numerologia/calcolo.py.
+
+Esempio:
+    calendario(["01/02/1990", "15/08/1985"], date(2025, 1, 1), date(2025, 12, 31))["giorno"]
+    giorni_favorevoli(["01/02/1990", "15/08/1985"], date(2025, 1, 1), date(2025, 12, 31), {1, 3, 5})
+"""
+
+from datetime import date
+from functools import lru_cache
+
+import numpy as np
+
+from .motore import _scomponi_datetime64, scomponi_date
+
+# _RIDOTTO[r, s] = 1 + (r + s - 1) % 9: radice numerica della somma dei due residui
+_RIDOTTO = ((np.arange(9)[:, None] + np.arange(9)[None, :] + 8) % 9 + 1).astype(np.uint8)
+
+
+def _giorno_numpy(valore):
+    return np.datetime64(valore.isoformat() if isinstance(valore, date) else valore, "D")
+
+
+def intervallo_date(inizio, fine):
+    """Date da inizio a fine incluse, come datetime64[D]."""
+    inizio, fine = _giorno_numpy(inizio), _giorno_numpy(fine)
+    if fine < inizio:
+        raise ValueError("La data di fine precede quella di inizio.")
+    return np.arange(inizio, fine + np.timedelta64(1, "D"), dtype="datetime64[D]")
+
+
+def residui_nascita(date_nascita):
+    """(giorno + mese) % 9 di ogni data di nascita, come uint8."""
+    giorni, mesi, _ = scomponi_date(date_nascita)
+    return ((giorni + mesi) % 9).astype(np.uint8)
+
+
+def residui_date(date_calendario):
+    """Residui (anno, anno + mese, anno + mese + giorno) % 9 di ogni data di calendario."""
+    giorni, mesi, anni = _scomponi_datetime64(np.asarray(date_calendario, dtype="datetime64[D]"))
+    anno = anni % 9
+    mese = (anno + mesi) % 9
+    return anno.astype(np.uint8), mese.astype(np.uint8), ((mese + giorni) % 9).astype(np.uint8)
+
+
+# --- CALENDARI ---
+
+def calendario(date_nascita, inizio, fine):
+    """
+    Numeri personali di ogni persona per ogni data dell'intervallo.
+    Restituisce {"date": (D,), "anno", "mese", "giorno": array uint8 (persone, D)}.
+    """
+    date_calendario = intervallo_date(inizio, fine)
+    persone = residui_nascita(date_nascita)[:, None]
+    anno, mese, giorno = residui_date(date_calendario)
+    return {
+        "date": date_calendario,
+        "anno": _RIDOTTO[persone, anno[None, :]],
+        "mese": _RIDOTTO[persone, mese[None, :]],
+        "giorno": _RIDOTTO[persone, giorno[None, :]],
+    }
+
+
+@lru_cache(maxsize=9 * 16)
+def _calendario_residuo(residuo, anno):
+    residuo_anno, _, residuo_giorni = residui_date(intervallo_date(date(anno, 1, 1), date(anno, 12, 31)))
+    mesi = _RIDOTTO[residuo, (int(residuo_anno[0]) + np.arange(1, 13)) % 9]
+    giorni = _RIDOTTO[residuo, residuo_giorni]
+    mesi.flags.writeable = giorni.flags.writeable = False
+    return int(_RIDOTTO[residuo, residuo_anno[0]]), mesi, giorni
+
+
+def calendario_anno(data_nascita, anno):
+    """
+    Calendario di un anno per una persona: (anno personale, mesi uint8 (12,),
+    giorni uint8 (365 o 366,)). Gli array sono in cache e di sola lettura.
+    """
+    return _calendario_residuo(int(residui_nascita([data_nascita])[0]), anno)
+
+
+def calendari_anno(date_nascita, anno):
+    """Giorni personali dell'anno per molte persone: array uint8 (persone, giorni dell'anno)."""
+    tabella = np.stack([_calendario_residuo(residuo, anno)[2] for residuo in range(9)])
+    return tabella[residui_nascita(date_nascita)]
+
+
+def giorni_favorevoli(date_nascita, inizio, fine, numeri):
+    """
+    Date dell'intervallo in cui il giorno personale di tutte le persone è in 'numeri'
+    (es. una coppia o un gruppo). Il costo non dipende dal numero di persone:
+    bastano i residui distinti, al più 9.
+    """
+    date_calendario = intervallo_date(inizio, fine)
+    residui = np.unique(residui_nascita(date_nascita))
+    if residui.size == 0:
+        return date_calendario[:0]
+    giorni = _RIDOTTO[residui[:, None], residui_date(date_calendario)[2][None, :]]
+    validi = np.isin(giorni, np.fromiter(numeri, dtype=np.uint8)).all(axis=0)
+    return date_calendario[validi]
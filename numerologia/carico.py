@@ -0,0 +1,356 @@
+"""
+Test di carico delle pagine Streamlit con sessioni concorrenti.
+
+Ogni sessione ripete un percorso utente scritto sulle pagine vere, eseguite
+con il runner in-process di Streamlit (streamlit.testing AppTest), senza
+server né servizi esterni:
+
+    compatibilita  apre la pagina 4, compila le due persone, preme
+                   "Calcola Compatibilità Approfondita" e apre una sezione;
+    report         apre la pagina 3 e sceglie ogni report del menu
+                   (compilando il modulo dove serve).
+
+Le sessioni girano in parallelo su un pool di processi, uno script per
+processo alla volta, come le sessioni che si contendono i core di
+un'istanza. Ogni processo viene prima riscaldato con una sessione per
+percorso, così import e cache di processo non finiscono nelle misure.
+Il report contiene throughput, latenze p50/p95/p99 per passo e per pagina,
+crescita della memoria (RSS) del processo per sessione e byte dello stato di
+sessione. Il JSON salvato si confronta con quello di un rilascio precedente.
+
+Uso:
+    python -m numerologia.carico --sessioni 200 --processi 4 --output carico.json
+    python -m numerologia.carico --percorsi compatibilita --confronta carico.json --soglia 0.20
+"""
+
+import argparse
+import gc
+import importlib
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+from .benchmark import corpus_sintetico
+from .cache import dimensione_voce
+
+CARTELLA_APP = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TIMEOUT_SCRIPT = 60  # secondi per singolo rerun
+SEME = 20251018
+CORPUS = 1000
+
+
+# --- PERCORSI UTENTE ---
+
+def _app(pagina):
+    from streamlit.testing.v1 import AppTest
+
+    return AppTest.from_file(os.path.join(CARTELLA_APP, "pages", pagina), default_timeout=TIMEOUT_SCRIPT)
+
+
+def _persona(rnd):
+    nomi, cognomi, date_nascita = corpus_sintetico(CORPUS)
+    indice = rnd.randrange(CORPUS)
+    return nomi[indice], cognomi[indice], date_nascita[indice]
+
+
+def percorso_compatibilita(passo, rnd):
+    at = _app("4_compatibilita_coppia.py")
+    passo("apertura", at.run)
+    for indice in (1, 2):
+        nome, cognome, data = _persona(rnd)
+        at.text_input(key=f"nome{indice}").input(nome)
+        at.text_input(key=f"cognome{indice}").input(cognome)
+        at.text_input(key=f"data{indice}").input(data)
+    at.button[0].click()
+    passo("calcolo", at.run)
+    at.session_state[f"sezione_{rnd.choice(('sentiero_di_vita', 'anima', 'pinnacoli', 'sfide'))}"] = True
+    passo("sezione", at.run)
+    return at
+
+
+def percorso_report(passo, rnd):
+    from .registro import REPORT
+
+    at = _app("3_report.py")
+    passo("apertura", at.run)
+    for titolo in REPORT:
+        at.selectbox[0].select(titolo)
+        passo(titolo, at.run)
+        if at.text_input:
+            # Report con modulo di inserimento (es. Schema Energetico)
+            nome, cognome, data = _persona(rnd)
+            for campo, valore in zip(at.text_input, (nome, cognome, data)):
+                campo.input(valore)
+            at.button[0].click()
+            passo(f"{titolo} (invio)", at.run)
+    return at
+
+
+PERCORSI = {
+    "compatibilita": percorso_compatibilita,
+    "report": percorso_report,
+}
+
+
+# --- SESSIONI (nei processi del pool) ---
+
+def _rss():
+    """Memoria residente del processo in byte (Linux; altrove il picco da resource)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        import resource
+
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def esegui_sessione(percorso, seme):
+    """
+    Esegue una sessione del percorso e restituisce i tempi dei passi
+    [(passo, secondi, errore)], la crescita di RSS e i byte dello stato di sessione.
+    """
+    passi = []
+
+    def passo(nome, esegui):
+        inizio = time.perf_counter()
+        at = esegui()
+        durata = time.perf_counter() - inizio
+        errore = "; ".join(e.value.message for e in at.exception) if at.exception else ""
+        passi.append((f"{percorso}.{nome}", durata, errore))
+
+    gc.collect()
+    rss_prima = _rss()
+    inizio = time.perf_counter()
+    try:
+        at = PERCORSI[percorso](passo, random.Random(seme))
+        stato_byte = dimensione_voce(at.session_state.to_dict())
+        del at
+    except Exception as e:
+        passi.append((f"{percorso}.interrotto", 0.0, repr(e)))
+        stato_byte = 0
+    durata = time.perf_counter() - inizio
+    gc.collect()
+    return {
+        "percorso": percorso, "passi": passi, "durata": durata, "pid": os.getpid(),
+        "crescita_rss": _rss() - rss_prima, "stato_byte": stato_byte,
+    }
+
+
+def _riscalda(percorsi):
+    for percorso in percorsi:
+        esegui_sessione(percorso, SEME)
+
+
+def _pid_dopo_pausa(_):
+    time.sleep(0.05)  # lascia i compiti successivi agli altri processi
+    return os.getpid()
+
+
+# --- STATISTICHE ---
+
+def _centili(valori):
+    """(p50, p95, p99) di una lista non vuota."""
+    if len(valori) == 1:
+        return valori[0], valori[0], valori[0]
+    centili = statistics.quantiles(valori, n=100, method="inclusive")
+    return centili[49], centili[94], centili[98]
+
+
+def statistiche_latenza(durate):
+    """Distribuzione delle durate in millisecondi: n, media, p50, p95, p99, max."""
+    ms = sorted(d * 1000 for d in durate)
+    p50, p95, p99 = _centili(ms)
+    return {"n": len(ms), "media_ms": statistics.fmean(ms), "p50_ms": p50, "p95_ms": p95,
+            "p99_ms": p99, "max_ms": ms[-1]}
+
+
+def riassumi(sessioni, durata):
+    """Documento dei risultati a partire dalle sessioni eseguite in 'durata' secondi."""
+    per_passo, errori_passo, per_pagina = {}, {}, {}
+    for sessione in sessioni:
+        per_pagina.setdefault(sessione["percorso"], []).append(sessione["durata"])
+        for nome, secondi, errore in sessione["passi"]:
+            per_passo.setdefault(nome, []).append(secondi)
+            errori_passo[nome] = errori_passo.get(nome, 0) + bool(errore)
+    crescita = [s["crescita_rss"] / 1024 for s in sessioni]
+    totale_passi = sum(len(s["passi"]) for s in sessioni)
+    return {
+        "throughput": {
+            "sessioni": len(sessioni),
+            "durata_s": durata,
+            "sessioni_al_s": len(sessioni) / durata if durata else 0.0,
+            "rerun_al_s": totale_passi / durata if durata else 0.0,
+        },
+        "pagine": {nome: statistiche_latenza(durate) for nome, durate in sorted(per_pagina.items())},
+        "passi": {
+            nome: {**statistiche_latenza(durate), "errori": errori_passo[nome]}
+            for nome, durate in sorted(per_passo.items())
+        },
+        "memoria": {
+            "crescita_rss_media_kib": statistics.fmean(crescita) if crescita else 0.0,
+            "crescita_rss_p95_kib": _centili(sorted(crescita))[1] if crescita else 0.0,
+            "crescita_rss_totale_kib": sum(crescita),
+            "stato_sessione_medio_byte": statistics.fmean(s["stato_byte"] for s in sessioni) if sessioni else 0.0,
+        },
+        "errori": [
+            {"passo": nome, "errore": errore}
+            for sessione in sessioni for nome, _, errore in sessione["passi"] if errore
+        ][:20],
+    }
+
+
+# --- ESECUZIONE ---
+
+def esegui_carico(percorsi=tuple(PERCORSI), sessioni=100, processi=None, riscaldamento=True, avanzamento=None):
+    """
+    Esegue 'sessioni' sessioni distribuite a turno fra i percorsi su un pool di
+    'processi' processi e restituisce il documento JSON dei risultati.
+    """
+    percorsi = tuple(percorsi)
+    processi = processi or os.cpu_count() or 1
+    # Con "python -m" questo modulo è __main__, che AppTest sostituisce con la
+    # pagina eseguita: i compiti del pool devono riferirsi al modulo importabile
+    modulo = importlib.import_module(__spec__.name if __name__ == "__main__" else __name__)
+    inizializzatore = (modulo._riscalda, (percorsi,)) if riscaldamento else (None, ())
+    eseguite = []
+    with ProcessPoolExecutor(processi, initializer=inizializzatore[0], initargs=inizializzatore[1]) as pool:
+        # Il riscaldamento (inizializzatore) resta fuori dalla misura: si parte
+        # solo quando ogni processo ha risposto almeno una volta
+        pronti = set()
+        while len(pronti) < processi:
+            pronti.update(pool.map(modulo._pid_dopo_pausa, range(processi)))
+        inizio = time.perf_counter()
+        futuri = [
+            pool.submit(modulo.esegui_sessione, percorsi[indice % len(percorsi)], SEME + indice)
+            for indice in range(sessioni)
+        ]
+        for futuro in as_completed(futuri):
+            eseguite.append(futuro.result())
+            if avanzamento:
+                avanzamento(len(eseguite), sessioni, time.perf_counter() - inizio)
+        durata = time.perf_counter() - inizio
+
+    import streamlit
+
+    return {
+        "meta": {
+            "data": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "streamlit": streamlit.__version__,
+            "piattaforma": platform.platform(),
+            "cpu": os.cpu_count(),
+            "processi": processi,
+            "percorsi": list(percorsi),
+            "riscaldamento": riscaldamento,
+            "seme": SEME,
+        },
+        **riassumi(eseguite, durata),
+    }
+
+
+# --- CONFRONTO CON UN RILASCIO PRECEDENTE ---
+
+def confronta(attuale, baseline, soglia=0.20):
+    """Righe di confronto e regressioni: p95 di un passo o throughput peggiori oltre la soglia."""
+    righe, regressioni = [], []
+    for nome, risultato in attuale["passi"].items():
+        riferimento = baseline.get("passi", {}).get(nome)
+        if riferimento is None:
+            righe.append(f"  {nome:<45} (nuovo passo)")
+            continue
+        rapporto = risultato["p95_ms"] / riferimento["p95_ms"] if riferimento["p95_ms"] else 1.0
+        stato = "✅"
+        if rapporto > 1 + soglia:
+            stato = "⚠️ "
+            regressioni.append(nome)
+        righe.append(f"{stato} {nome:<45} p95 {rapporto:>6.2f}x rispetto alla baseline")
+    riferimento = baseline.get("throughput", {}).get("sessioni_al_s")
+    if riferimento:
+        rapporto = attuale["throughput"]["sessioni_al_s"] / riferimento
+        stato = "✅"
+        if rapporto < 1 - soglia:
+            stato = "⚠️ "
+            regressioni.append("throughput")
+        righe.append(f"{stato} {'throughput (sessioni/s)':<45} {rapporto:>6.2f}x rispetto alla baseline")
+    return righe, regressioni
+
+
+def stampa_risultati(risultati):
+    throughput = risultati["throughput"]
+    print(f"\n🚀 {throughput['sessioni']} sessioni in {throughput['durata_s']:.1f} s su "
+          f"{risultati['meta']['processi']} processi: {throughput['sessioni_al_s']:.2f} sessioni/s, "
+          f"{throughput['rerun_al_s']:.1f} rerun/s\n")
+    print(f"  {'passo':<45} {'n':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errori':>7}")
+    for nome, voce in risultati["passi"].items():
+        print(f"  {nome:<45} {voce['n']:>6} {voce['p50_ms']:>9.1f} {voce['p95_ms']:>9.1f} "
+              f"{voce['p99_ms']:>9.1f} {voce['errori']:>7}")
+    print()
+    for nome, voce in risultati["pagine"].items():
+        print(f"📄 {nome:<20} sessione p50 {voce['p50_ms']:.0f} ms, p95 {voce['p95_ms']:.0f} ms, "
+              f"p99 {voce['p99_ms']:.0f} ms")
+    memoria = risultati["memoria"]
+    print(f"\n🧠 Crescita RSS per sessione: media {memoria['crescita_rss_media_kib']:.1f} KiB, "
+          f"p95 {memoria['crescita_rss_p95_kib']:.1f} KiB; stato di sessione medio "
+          f"{memoria['stato_sessione_medio_byte'] / 1024:.1f} KiB")
+    for errore in risultati["errori"]:
+        print(f"❌ {errore['passo']}: {errore['errore']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Test di carico delle pagine Streamlit con sessioni concorrenti.")
+    parser.add_argument("--percorsi", nargs="+", default=list(PERCORSI), choices=list(PERCORSI))
+    parser.add_argument("--sessioni", type=int, default=100, help="Sessioni totali da eseguire.")
+    parser.add_argument("--processi", type=int, default=os.cpu_count(), help="Sessioni concorrenti (processi).")
+    parser.add_argument("--a-freddo", action="store_true", help="Non riscalda i processi prima delle misure.")
+    parser.add_argument("--output", help="File JSON in cui salvare i risultati.")
+    parser.add_argument("--confronta", help="File JSON di un rilascio precedente con cui confrontare.")
+    parser.add_argument("--soglia", type=float, default=0.20, help="Peggioramento massimo ammesso (0.20 = 20%%).")
+    args = parser.parse_args(argv)
+
+    def stampa(fatte, totali, trascorsi):
+        print(f"\r⏳ {fatte}/{totali} sessioni  {fatte / trascorsi:.2f} sessioni/s   ",
+              end="", file=sys.stderr, flush=True)
+
+    # La baseline si legge prima di eseguire: --output può sovrascrivere lo stesso file
+    baseline = None
+    if args.confronta:
+        with open(args.confronta, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    print(f"\n🧪 Test di carico: {args.sessioni} sessioni ({', '.join(args.percorsi)}) "
+          f"su {args.processi} processi...")
+    risultati = esegui_carico(args.percorsi, args.sessioni, args.processi, not args.a_freddo, stampa)
+    print(file=sys.stderr)
+    stampa_risultati(risultati)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(risultati, f, indent=2, ensure_ascii=False)
+        print(f"\n💾 Risultati salvati in {args.output}")
+
+    esito = 0
+    if baseline is not None:
+        righe, regressioni = confronta(risultati, baseline, args.soglia)
+        print("\n📊 Confronto con la baseline:\n")
+        print("\n".join(righe))
+        if regressioni:
+            print(f"\n⚠️  {len(regressioni)} regressioni oltre il {args.soglia:.0%}.")
+            esito = 1
+        else:
+            print("\n✅ Nessuna regressione.")
+    # Una pagina che fallisce non supera il test, qualunque siano i tempi
+    passi_falliti = sum(voce["errori"] for voce in risultati["passi"].values())
+    if passi_falliti:
+        print(f"\n❌ {passi_falliti} passi falliti nelle sessioni.")
+        esito = 1
+    return esito
+
+
+if __name__ == "__main__":
+    sys.exit(main())
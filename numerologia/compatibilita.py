@@ -0,0 +1,145 @@
+"""
+Interpretazioni di compatibilità di coppia per categoria numerologica.
+
+I testi stanno in numerologia/dati/interpretazioni.json e vengono letti
+dall'archivio compilato di numerologia/interpretazioni.py. Ogni mappa è
+indicizzata dalla chiave simmetrica (min, max) della coppia di numeri, con
+il testo "default" come ripiego per le combinazioni mancanti.
+"""
+
+import operator
+from collections.abc import Mapping
+
+from .cache import memoizza
+from .interpretazioni import (
+    ARCHIVIO, INTERVALLO_CONTROLLO, POSIZIONE_DEFAULT, POSIZIONI, TESTO_MANCANTE, indice_coppia,
+)
+
+
+# Funzione helper per ottenere la chiave simmetrica
+def get_symmetric_key(n1, n2):
+    return tuple(sorted((n1, n2)))
+
+
+class MappaCompatibilita(Mapping):
+    """
+    Vista di sola lettura su una categoria dell'archivio, con le stesse chiavi
+    dei vecchi dizionari: (min, max) e "default". Riflette le ricariche del JSON.
+    """
+
+    def __init__(self, categoria):
+        self.categoria = categoria
+
+    def _posizione(self, chiave):
+        if isinstance(chiave, str):
+            return POSIZIONE_DEFAULT if chiave == "default" else None
+        if not isinstance(chiave, tuple) or len(chiave) != 2:
+            return None
+        try:
+            # Accetta anche gli interi NumPy prodotti dal motore batch
+            a, b = operator.index(chiave[0]), operator.index(chiave[1])
+        except TypeError:
+            return None
+        if 0 <= a <= b <= 9:
+            return indice_coppia(a, b)
+        return None
+
+    def __getitem__(self, chiave):
+        posizione = self._posizione(chiave)
+        testo = None if posizione is None else ARCHIVIO.tabella(self.categoria).testo(posizione)
+        if testo is None:
+            raise KeyError(chiave)
+        return testo
+
+    def __contains__(self, chiave):
+        posizione = self._posizione(chiave)
+        return posizione is not None and ARCHIVIO.tabella(self.categoria).presente(posizione)
+
+    def __iter__(self):
+        tabella = ARCHIVIO.tabella(self.categoria)
+        for posizione in range(POSIZIONI):
+            if tabella.presente(posizione):
+                yield divmod(posizione, 10)
+        if tabella.presente(POSIZIONE_DEFAULT):
+            yield "default"
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return f"MappaCompatibilita({self.categoria!r})"
+
+
+# --- MAPPE PER LE INTERPRETAZIONI DI COMPATIBILITÀ DETTAGLIATE ---
+
+sentiero_di_vita_compatibilita = MappaCompatibilita("sentiero_di_vita")
+espressione_compatibilita = MappaCompatibilita("espressione")
+anima_compatibilita = MappaCompatibilita("anima")
+personalita_compatibilita = MappaCompatibilita("personalita")
+forza_compatibilita = MappaCompatibilita("forza")
+quintessenza_compatibilita = MappaCompatibilita("quintessenza")
+cicli_di_vita_compatibilita = MappaCompatibilita("cicli")
+pinnacoli_compatibilita = MappaCompatibilita("pinnacoli")
+sfide_compatibilita = MappaCompatibilita("sfide")
+
+
+def get_compatibilita_analysis(p1_num, p2_num, compatibility_map, context_description=""):
+    """
+    Recupera l'analisi di compatibilità da una mappa predefinita.
+    Gestisce la simmetria (es. (1,2) è uguale a (2,1)).
+    Aggiunge una descrizione di contesto opzionale.
+    """
+    if isinstance(compatibility_map, MappaCompatibilita):
+        # Accesso diretto alla tabella compilata, senza costruire la chiave
+        analysis_text = ARCHIVIO.testo(compatibility_map.categoria, p1_num, p2_num)
+    else:
+        key_ordered = get_symmetric_key(p1_num, p2_num)
+        analysis_text = compatibility_map.get(key_ordered, compatibility_map.get("default", TESTO_MANCANTE))
+    return f"{context_description} {analysis_text}"
+
+
+@memoizza(max_voci=1024, ttl=INTERVALLO_CONTROLLO)
+def _testo_sezione(categoria, minimo, massimo):
+    return ARCHIVIO.testo(categoria, minimo, massimo)
+
+
+def testo_sezione(categoria, n1, n2):
+    """
+    Testo di compatibilità della coppia nella categoria, in cache sulla chiave
+    simmetrica: (1, 2) e (2, 1) condividono la voce. La scadenza coincide con
+    l'intervallo di controllo del JSON, quindi le modifiche ai testi arrivano
+    come per ARCHIVIO.testo.
+    """
+    return _testo_sezione(categoria, *get_symmetric_key(n1, n2))
+
+
+# --- MAPPE PER CATEGORIA ---
+# Le chiavi core coincidono con i nomi di colonna di numerologia/motore.py
+MAPPE_COMPATIBILITA = {
+    "sentiero_di_vita": sentiero_di_vita_compatibilita,
+    "espressione": espressione_compatibilita,
+    "anima": anima_compatibilita,
+    "personalita": personalita_compatibilita,
+    "forza": forza_compatibilita,
+    "quintessenza": quintessenza_compatibilita,
+    "cicli": cicli_di_vita_compatibilita,
+    "pinnacoli": pinnacoli_compatibilita,
+    "sfide": sfide_compatibilita,
+}
+
+
+def analisi_coppia(profilo1, profilo2):
+    """
+    Testi di compatibilità di tutte le categorie per due profili di
+    calcola_numeri_compatibilita_persona: i sei numeri core e, per cicli,
+    pinnacoli e sfide, un testo per ogni periodo.
+    """
+    core1, core2 = profilo1["core"], profilo2["core"]
+    dinamici1, dinamici2 = profilo1["dinamici"], profilo2["dinamici"]
+    risultato = {categoria: ARCHIVIO.testo(categoria, core1[categoria], core2[categoria]) for categoria in core1}
+    for gruppo in ("cicli", "pinnacoli", "sfide"):
+        risultato[gruppo] = {
+            periodo: ARCHIVIO.testo(gruppo, numero, dinamici2[gruppo][periodo])
+            for periodo, numero in dinamici1[gruppo].items()
+        }
+    return risultato
@@ -0,0 +1,346 @@
+"""
+Ingestione dei PDF della base di conoscenza del chatbot.
+
+Legge una cartella di libri e appunti in PDF e li spezza in frammenti di
+testo per pages/2_chatbot_numerologia.py. I file vengono elaborati in
+parallelo su un pool di processi; ogni processo estrae le pagine una alla
+volta e scrive i frammenti su disco man mano, quindi la memoria resta
+limitata anche per libri di 1000 pagine.
+
+L'archivio di output contiene:
+
+    indice.json               file sorgente -> impronta, pagine, frammenti
+    frammenti/<chiave>.jsonl  un frammento per riga
+
+Ogni frammento ha un id stabile (chiave del file + numero progressivo) e
+l'hash SHA-256 del testo, così l'indicizzazione può saltare i frammenti
+già noti. Rilanciando il comando i file invariati (stessa data e
+dimensione, o stesso contenuto) non vengono riletti; quelli spariti dalla
+cartella vengono tolti dall'archivio.
+
+Uso:
+    python -m numerologia.conoscenza libri/ --archivio archivio_kb --processi 4
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+VERSIONE = 1                  # cambia quando cambiano estrazione o frammentazione
+DIMENSIONE_FRAMMENTO = 1200   # caratteri per frammento
+SOVRAPPOSIZIONE = 200         # caratteri ripetuti tra frammenti consecutivi
+FILE_INDICE = "indice.json"
+SALVA_OGNI = 50               # file registrati tra due scritture dell'indice
+CARTELLA_FRAMMENTI = "frammenti"
+
+_SPAZI = re.compile(r"\s+")
+
+
+def chiave_file(percorso_relativo):
+    """Chiave stabile di un file sorgente, usata negli id dei frammenti."""
+    return hashlib.sha1(percorso_relativo.replace(os.sep, "/").encode("utf-8")).hexdigest()[:16]
+
+
+def hash_testo(testo):
+    return hashlib.sha256(testo.encode("utf-8")).hexdigest()
+
+
+def hash_file(percorso, blocco=1024 * 1024):
+    h = hashlib.sha256()
+    with open(percorso, "rb") as f:
+        for dati in iter(lambda: f.read(blocco), b""):
+            h.update(dati)
+    return h.hexdigest()
+
+
+def trova_pdf(cartella):
+    """Percorsi relativi dei PDF della cartella (ricorsivo), in ordine stabile."""
+    trovati = []
+    for radice, cartelle, file in os.walk(cartella):
+        cartelle[:] = sorted(c for c in cartelle if not c.startswith("."))
+        for nome in sorted(file):
+            if nome.lower().endswith(".pdf"):
+                trovati.append(os.path.relpath(os.path.join(radice, nome), cartella))
+    return trovati
+
+
+# --- ESTRAZIONE E FRAMMENTAZIONE ---
+
+def estrai_pagine(percorso):
+    """
+    Genera (numero pagina da 1, testo) estraendo una pagina alla volta.
+    Il PDF viene letto dal file aperto, senza caricarlo tutto in memoria.
+    """
+    from pypdf import PdfReader
+
+    with open(percorso, "rb") as f:
+        lettore = PdfReader(f)
+        for numero, pagina in enumerate(lettore.pages, start=1):
+            try:
+                testo = pagina.extract_text() or ""
+            except Exception:
+                testo = ""  # pagina danneggiata o solo immagini
+            yield numero, _SPAZI.sub(" ", testo).strip()
+
+
+def frammenta(pagine, dimensione=DIMENSIONE_FRAMMENTO, sovrapposizione=SOVRAPPOSIZIONE):
+    """
+    Spezza il testo delle pagine in frammenti di circa 'dimensione' caratteri,
+    tagliando sugli spazi. Genera (testo, pagina iniziale, pagina finale).
+    """
+    buffer = ""
+    pagine_buffer = []  # (posizione nel buffer, numero pagina)
+    for numero, testo in pagine:
+        if not testo:
+            continue
+        if buffer:
+            buffer += " "
+        pagine_buffer.append((len(buffer), numero))
+        buffer += testo
+        while len(buffer) >= dimensione + sovrapposizione:
+            taglio = buffer.rfind(" ", dimensione // 2, dimensione)
+            taglio = dimensione if taglio < 0 else taglio
+            yield _frammento(buffer, pagine_buffer, taglio)
+            ripresa = buffer.find(" ", max(taglio - sovrapposizione, 0), taglio)
+            ripresa = taglio if ripresa < 0 else ripresa + 1
+            buffer = buffer[ripresa:]
+            pagine_buffer = _sposta(pagine_buffer, ripresa)
+    if buffer.strip():
+        yield _frammento(buffer, pagine_buffer, len(buffer))
+
+
+def _pagina_a(pagine_buffer, posizione):
+    numero = pagine_buffer[0][1]
+    for inizio, pagina in pagine_buffer:
+        if inizio > posizione:
+            break
+        numero = pagina
+    return numero
+
+
+def _frammento(buffer, pagine_buffer, taglio):
+    return buffer[:taglio].strip(), pagine_buffer[0][1], _pagina_a(pagine_buffer, max(taglio - 1, 0))
+
+
+def _sposta(pagine_buffer, ripresa):
+    # La prima pagina è quella in cui cade la ripresa; le precedenti escono dal buffer
+    spostate = [(max(inizio - ripresa, 0), pagina) for inizio, pagina in pagine_buffer]
+    while len(spostate) > 1 and spostate[1][0] == 0:
+        spostate.pop(0)
+    return spostate
+
+
+# --- LAVORO NEI PROCESSI ---
+
+def elabora_file(cartella, percorso_relativo, cartella_frammenti, impronta):
+    """
+    Estrae e frammenta un PDF scrivendo i frammenti in <chiave>.jsonl (atomico).
+    Restituisce la voce dell'indice, con "errore" se il file non è leggibile.
+    """
+    chiave = chiave_file(percorso_relativo)
+    destinazione = os.path.join(cartella_frammenti, chiave + ".jsonl")
+    temporaneo = f"{destinazione}.{os.getpid()}.tmp"
+    voce = dict(impronta, chiave=chiave, versione=VERSIONE)
+    inizio = time.monotonic()
+    try:
+        pagine = frammenti = 0
+        with open(temporaneo, "w", encoding="utf-8") as f:
+            def conta(sorgente):
+                nonlocal pagine
+                for pagina in sorgente:
+                    pagine = pagina[0]
+                    yield pagina
+            for indice, (testo, pagina_inizio, pagina_fine) in enumerate(
+                    frammenta(conta(estrai_pagine(os.path.join(cartella, percorso_relativo))))):
+                f.write(json.dumps({
+                    "id": f"{chiave}-{indice:05d}",
+                    "hash": hash_testo(testo),
+                    "file": percorso_relativo.replace(os.sep, "/"),
+                    "pagine": [pagina_inizio, pagina_fine],
+                    "testo": testo,
+                }, ensure_ascii=False) + "\n")
+                frammenti += 1
+        os.replace(temporaneo, destinazione)
+    except Exception as e:
+        if os.path.exists(temporaneo):
+            os.remove(temporaneo)
+        return dict(voce, errore=f"{type(e).__name__}: {e}")
+    return dict(voce, pagine=pagine, frammenti=frammenti, secondi=round(time.monotonic() - inizio, 2))
+
+
+# --- ARCHIVIO ---
+
+class ArchivioConoscenza:
+    """Indice dei file elaborati e frammenti su disco."""
+
+    def __init__(self, percorso):
+        self.percorso = percorso
+        self.cartella_frammenti = os.path.join(percorso, CARTELLA_FRAMMENTI)
+        os.makedirs(self.cartella_frammenti, exist_ok=True)
+        self.indice = {}
+        self._non_salvati = 0
+        try:
+            with open(os.path.join(percorso, FILE_INDICE), encoding="utf-8") as f:
+                self.indice = json.load(f).get("file", {})
+        except (OSError, ValueError):
+            pass
+
+    def salva(self):
+        destinazione = os.path.join(self.percorso, FILE_INDICE)
+        temporaneo = destinazione + ".tmp"
+        with open(temporaneo, "w", encoding="utf-8") as f:
+            json.dump({"versione": VERSIONE, "file": self.indice}, f, ensure_ascii=False, indent=1, sort_keys=True)
+        os.replace(temporaneo, destinazione)
+        self._non_salvati = 0
+
+    def aggiornato(self, percorso_relativo, impronta):
+        """
+        True se il file è già elaborato con questa impronta (data e dimensione, o contenuto).
+        Un file illeggibile resta in errore finché non cambia.
+        """
+        voce = self.indice.get(percorso_relativo)
+        if not voce or voce.get("versione") != VERSIONE:
+            return False
+        if "errore" not in voce and not os.path.exists(os.path.join(self.cartella_frammenti, voce["chiave"] + ".jsonl")):
+            return False
+        return all(voce.get(k) == impronta[k] for k in impronta)
+
+    def registra(self, percorso_relativo, voce):
+        """
+        Registra un file elaborato. L'indice viene riscritto ogni SALVA_OGNI file e
+        da ingerisci() alla fine: un'interruzione fa rielaborare al più quei file.
+        """
+        self.indice[percorso_relativo] = voce
+        self._non_salvati += 1
+        if self._non_salvati >= SALVA_OGNI:
+            self.salva()
+
+    def salva_se_modificato(self):
+        if self._non_salvati:
+            self.salva()
+
+    def rimuovi(self, percorso_relativo):
+        voce = self.indice.pop(percorso_relativo)
+        try:
+            os.remove(os.path.join(self.cartella_frammenti, voce["chiave"] + ".jsonl"))
+        except OSError:
+            pass
+
+    def frammenti(self):
+        """Genera i frammenti di tutti i file dell'archivio, leggendo un file alla volta."""
+        for percorso_relativo in sorted(self.indice):
+            voce = self.indice[percorso_relativo]
+            if "errore" in voce:
+                continue
+            with open(os.path.join(self.cartella_frammenti, voce["chiave"] + ".jsonl"), encoding="utf-8") as f:
+                for linea in f:
+                    yield json.loads(linea)
+
+
+# --- ESECUZIONE ---
+
+def _impronta_rapida(percorso):
+    stato = os.stat(percorso)
+    return {"mtime_ns": stato.st_mtime_ns, "dimensione": stato.st_size}
+
+
+def ingerisci(cartella, archivio, processi=None, in_volo=None, avanzamento=None):
+    """
+    Elabora i PDF nuovi o modificati della cartella nell'archivio (ArchivioConoscenza).
+    avanzamento(percorso, voce) viene chiamata a ogni file completato.
+    Restituisce {"elaborati", "saltati", "rimossi", "errori", "frammenti"}.
+    """
+    processi = processi or os.cpu_count() or 1
+    in_volo = in_volo or processi * 2
+    presenti = trova_pdf(cartella)
+    stato = {"elaborati": 0, "saltati": 0, "rimossi": 0, "errori": [], "frammenti": 0}
+
+    for percorso_relativo in set(archivio.indice) - set(presenti):
+        archivio.rimuovi(percorso_relativo)
+        stato["rimossi"] += 1
+    if stato["rimossi"]:
+        archivio.salva()
+
+    def _salta(percorso_relativo):
+        stato["saltati"] += 1
+        errore = archivio.indice[percorso_relativo].get("errore")
+        if errore:
+            stato["errori"].append({"file": percorso_relativo, "errore": errore})
+
+    da_fare = []
+    for percorso_relativo in presenti:
+        impronta = _impronta_rapida(os.path.join(cartella, percorso_relativo))
+        if archivio.aggiornato(percorso_relativo, impronta):
+            _salta(percorso_relativo)
+            continue
+        # Data cambiata ma stesso contenuto (copia, checkout): basta aggiornare l'impronta
+        impronta["sha256"] = hash_file(os.path.join(cartella, percorso_relativo))
+        voce = archivio.indice.get(percorso_relativo)
+        if voce and archivio.aggiornato(percorso_relativo, {"sha256": impronta["sha256"]}):
+            archivio.registra(percorso_relativo, dict(voce, **impronta))
+            _salta(percorso_relativo)
+            continue
+        da_fare.append((percorso_relativo, impronta))
+
+    def raccogli(completati):
+        for futuro in completati:
+            percorso_relativo = in_corso_file.pop(futuro)
+            voce = futuro.result()
+            archivio.registra(percorso_relativo, voce)
+            if "errore" in voce:
+                stato["errori"].append({"file": percorso_relativo, "errore": voce["errore"]})
+            else:
+                stato["elaborati"] += 1
+                stato["frammenti"] += voce["frammenti"]
+            if avanzamento:
+                avanzamento(percorso_relativo, voce)
+
+    if da_fare:
+        # I file più grandi per primi, così il pool non resta con un solo libro enorme alla fine
+        da_fare.sort(key=lambda x: -x[1]["dimensione"])
+        in_corso_file = {}
+        with ProcessPoolExecutor(max_workers=min(processi, len(da_fare))) as pool:
+            for percorso_relativo, impronta in da_fare:
+                if len(in_corso_file) >= in_volo:
+                    completati, _ = wait(in_corso_file, return_when=FIRST_COMPLETED)
+                    raccogli(completati)
+                futuro = pool.submit(elabora_file, cartella, percorso_relativo, archivio.cartella_frammenti, impronta)
+                in_corso_file[futuro] = percorso_relativo
+            while in_corso_file:
+                completati, _ = wait(in_corso_file, return_when=FIRST_COMPLETED)
+                raccogli(completati)
+    archivio.salva_se_modificato()
+    return stato
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Estrae e frammenta i PDF della base di conoscenza del chatbot.")
+    parser.add_argument("cartella", help="Cartella con i PDF (letta ricorsivamente).")
+    parser.add_argument("--archivio", default="archivio_kb", help="Cartella dell'archivio dei frammenti.")
+    parser.add_argument("--processi", type=int, default=None, help="Processi del pool (predefinito: CPU).")
+    args = parser.parse_args(argv)
+
+    archivio = ArchivioConoscenza(args.archivio)
+    inizio = time.monotonic()
+
+    def stampa(percorso, voce):
+        if "errore" not in voce:
+            print(f"📖 {percorso}: {voce['pagine']} pagine, {voce['frammenti']} frammenti ({voce['secondi']} s)")
+
+    print(f"\n📚 Ingestione di {args.cartella} in {args.archivio}...\n")
+    stato = ingerisci(args.cartella, archivio, args.processi, avanzamento=stampa)
+    for errore in stato["errori"]:
+        print(f"⚠️  {errore['file']}: {errore['errore']}")
+    print(f"\n✅ {stato['elaborati']} file elaborati ({stato['frammenti']} frammenti), "
+          f"{stato['saltati']} invariati, {stato['rimossi']} rimossi, {len(stato['errori'])} errori "
+          f"in {time.monotonic() - inizio:.1f} s.")
+    return 1 if stato["errori"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,263 @@
+"""
+Esportazione in Excel (XLSX) di profili e analisi di coppia.
+
+Le righe arrivano da generatori sul motore vettoriale (numerologia/motore.py)
+e vengono scritte con XlsxWriter in modalità constant_memory: ogni riga va
+su disco appena scritta, quindi la memoria resta costante anche oltre il
+milione di righe e non serve nessun DataFrame. Un foglio che supera il
+limite di righe di Excel prosegue in un nuovo foglio ("Profili (2)", ...).
+
+Ogni foglio è un Foglio(nome, colonne, righe, formati): 'formati' associa
+facoltativamente a una colonna le proprietà di formato di XlsxWriter e
+una larghezza (es. {"anima": {"align": "center", "larghezza": 8}}).
+
+Uso:
+    python -m numerologia.esportazione persone.csv --xlsx profili.xlsx
+    python -m numerologia.esportazione persone.csv coppie.csv --xlsx base.xlsx --testi
+"""
+
+import argparse
+import csv
+import io
+import os
+import re
+import sys
+import time
+from collections import namedtuple
+
+from .metriche import tracciato
+from .motore import COLONNE, calcola_profili, itera_blocchi_file
+
+MAX_RIGHE_EXCEL = 1_048_576
+MAX_NOME_FOGLIO = 31  # limite di Excel; i nomi base si fermano a 25 per lasciare posto a " (2)"
+_NON_VALIDI_FOGLIO = re.compile(r"[\[\]:*?/\\]")
+DIMENSIONE_BLOCCO = 65536
+
+Foglio = namedtuple("Foglio", ["nome", "colonne", "righe", "formati"], defaults=(None,))
+
+COLONNE_PERSONA = ("nome", "cognome", "data_nascita")
+COLONNE_COPPIA = ("nome1", "cognome1", "data_nascita1", "nome2", "cognome2", "data_nascita2")
+# Categorie con un testo di compatibilità per coppia: i numeri core e i periodi dinamici
+CATEGORIE_COPPIA = (
+    ("sentiero_di_vita", "sentiero_di_vita"), ("espressione", "espressione"), ("anima", "anima"),
+    ("personalita", "personalita"), ("forza", "forza"), ("quintessenza", "quintessenza"),
+    ("ciclo_esperienza", "cicli"), ("ciclo_potere", "cicli"), ("ciclo_saggezza", "cicli"),
+    ("p1", "pinnacoli"), ("p2", "pinnacoli"), ("p3", "pinnacoli"), ("p4", "pinnacoli"),
+    ("s1", "sfide"), ("s2", "sfide"), ("s3", "sfide"), ("s4", "sfide"),
+)
+
+FORMATI_NUMERI = {colonna: {"align": "center", "larghezza": 6} for colonna in COLONNE}
+FORMATI_TESTI = {"larghezza": 60, "text_wrap": True}
+
+
+# --- RIGHE DAL MOTORE ---
+
+def _profili_riga_per_riga(nomi, cognomi, date):
+    """Ripiego per un blocco con date non valide: profili validi e messaggio d'errore per gli altri."""
+    for nome, cognome, data in zip(nomi, cognomi, date):
+        try:
+            colonne = calcola_profili([nome], [cognome], [data])
+        except ValueError:
+            yield None, f"data di nascita non valida: {data!r}"
+        else:
+            yield [int(colonne[c][0]) for c in COLONNE], ""
+
+
+def profili_blocco(nomi, cognomi, date):
+    """(numeri in ordine di COLONNE o None, errore) per ogni persona del blocco."""
+    try:
+        colonne = calcola_profili(nomi, cognomi, date)
+    except ValueError:
+        yield from _profili_riga_per_riga(nomi, cognomi, date)
+        return
+    for numeri in zip(*(colonne[c].tolist() for c in COLONNE)):
+        yield list(numeri), ""
+
+
+def righe_profili(percorso, dimensione_blocco=DIMENSIONE_BLOCCO):
+    """Righe (nome, cognome, data, numeri..., errore) di un CSV o Parquet di persone, a blocchi."""
+    for nomi, cognomi, date in itera_blocchi_file(percorso, dimensione_blocco=dimensione_blocco):
+        nomi, cognomi, date = nomi.tolist(), cognomi.tolist(), date.tolist()
+        for nome, cognome, data, (numeri, errore) in zip(nomi, cognomi, date, profili_blocco(nomi, cognomi, date)):
+            yield [nome, cognome, str(data), *(numeri or [None] * len(COLONNE)), errore]
+
+
+def foglio_profili(percorso, nome="Profili"):
+    return Foglio(nome, [*COLONNE_PERSONA, *COLONNE, "errore"], righe_profili(percorso), FORMATI_NUMERI)
+
+
+def _blocchi_csv(percorso, colonne, dimensione):
+    with open(percorso, newline="", encoding="utf-8-sig") as f:
+        reader = csv.DictReader(f)
+        mancanti = set(colonne) - set(reader.fieldnames or ())
+        if mancanti:
+            raise ValueError(f"Colonne mancanti nel file {percorso}: {', '.join(sorted(mancanti))}")
+        blocco = []
+        for riga in reader:
+            blocco.append([(riga[c] or "").strip() for c in colonne])
+            if len(blocco) == dimensione:
+                yield blocco
+                blocco = []
+        if blocco:
+            yield blocco
+
+
+def righe_coppie(percorso, testi=False, dimensione_blocco=DIMENSIONE_BLOCCO):
+    """
+    Righe di un CSV di coppie: dati delle due persone, numeri di entrambe per
+    categoria e, con testi=True, il testo di compatibilità di ogni categoria.
+    """
+    from .interpretazioni import ARCHIVIO
+
+    indici = [COLONNE.index(colonna) for colonna, _ in CATEGORIE_COPPIA]
+    for blocco in _blocchi_csv(percorso, COLONNE_COPPIA, dimensione_blocco):
+        colonne = list(zip(*blocco))
+        profili1 = profili_blocco(colonne[0], colonne[1], colonne[2])
+        profili2 = profili_blocco(colonne[3], colonne[4], colonne[5])
+        for riga, (numeri1, errore1), (numeri2, errore2) in zip(blocco, profili1, profili2):
+            if numeri1 is None or numeri2 is None:
+                errore = "; ".join(f"persona {n}: {e}" for n, e in ((1, errore1), (2, errore2)) if e)
+                yield [*riga, *[None] * (len(CATEGORIE_COPPIA) * (3 if testi else 2)), errore]
+                continue
+            valori = []
+            for indice, (_, categoria) in zip(indici, CATEGORIE_COPPIA):
+                a, b = numeri1[indice], numeri2[indice]
+                valori += [a, b, ARCHIVIO.testo(categoria, a, b)] if testi else [a, b]
+            yield [*riga, *valori, ""]
+
+
+def foglio_coppie(percorso, testi=False, nome="Coppie"):
+    colonne = list(COLONNE_COPPIA)
+    formati = {}
+    for colonna, _ in CATEGORIE_COPPIA:
+        colonne += [f"{colonna}_1", f"{colonna}_2"]
+        formati[f"{colonna}_1"] = formati[f"{colonna}_2"] = {"align": "center", "larghezza": 6}
+        if testi:
+            colonne.append(f"{colonna}_testo")
+            formati[f"{colonna}_testo"] = FORMATI_TESTI
+    return Foglio(nome, colonne + ["errore"], righe_coppie(percorso, testi), formati)
+
+
+def foglio_da_file(percorso, testi=False):
+    """Foglio di profili o di coppie in base alle colonne del file (CSV o Parquet)."""
+    nome = os.path.splitext(os.path.basename(percorso))[0][:25]
+    if percorso.lower().endswith(".csv"):
+        with open(percorso, newline="", encoding="utf-8-sig") as f:
+            intestazioni = set(next(csv.reader(f), []))
+        if set(COLONNE_COPPIA) <= intestazioni:
+            return foglio_coppie(percorso, testi, nome)
+    return foglio_profili(percorso, nome)
+
+
+# --- SCRITTURA ---
+
+def nome_foglio(nome, usati, lunghezza=25):
+    """
+    Nome valido e non ancora usato (Excel non distingue maiuscole e minuscole):
+    caratteri []:*?/\\ sostituiti da "_" e suffisso "_2", "_3", ... per i doppioni.
+    Il nome scelto viene aggiunto a 'usati'.
+    """
+    base = _NON_VALIDI_FOGLIO.sub("_", nome).strip("'") or "Foglio"
+    candidato = base[:lunghezza]
+    numero = 2
+    while candidato.lower() in usati:
+        suffisso = f"_{numero}"
+        candidato = base[:lunghezza - len(suffisso)] + suffisso
+        numero += 1
+    usati.add(candidato.lower())
+    return candidato
+
+
+def _prepara_foglio(libro, nome, foglio, formati_libro, grassetto):
+    scheda = libro.add_worksheet(nome)
+    for indice, colonna in enumerate(foglio.colonne):
+        opzioni = dict((foglio.formati or {}).get(colonna) or {})
+        larghezza = opzioni.pop("larghezza", None)
+        formato = None
+        if opzioni:
+            chiave = tuple(sorted(opzioni.items()))
+            formato = formati_libro.get(chiave)
+            if formato is None:
+                formato = formati_libro[chiave] = libro.add_format(opzioni)
+        if larghezza is not None or formato is not None:
+            scheda.set_column(indice, indice, larghezza, formato)
+    scheda.write_row(0, 0, foglio.colonne, grassetto)
+    scheda.freeze_panes(1, 0)
+    return scheda
+
+
+@tracciato("esportazione.xlsx")
+def esporta_xlsx(percorso, fogli, max_righe=MAX_RIGHE_EXCEL, avanzamento=None):
+    """
+    Scrive i fogli nell'XLSX in modalità constant_memory (una riga alla volta).
+    I nomi dei fogli passano da nome_foglio(); oltre max_righe (intestazione
+    inclusa) il foglio continua in "nome (2)", ...
+    avanzamento(nome foglio, righe scritte) viene chiamata ogni 100.000 righe.
+    Restituisce {nome foglio: righe di dati scritte}.
+    """
+    import xlsxwriter
+
+    conteggi = {}
+    usati = set()
+    libro = xlsxwriter.Workbook(percorso, {"constant_memory": True, "strings_to_numbers": False,
+                                           "strings_to_formulas": False, "strings_to_urls": False})
+    try:
+        grassetto = libro.add_format({"bold": True})
+        formati_libro = {}
+        for foglio in fogli:
+            parte = 1
+            nome = nome_foglio(foglio.nome, usati)
+            scheda = _prepara_foglio(libro, nome, foglio, formati_libro, grassetto)
+            riga_excel = 1
+            totale = 0
+            for riga in foglio.righe:
+                if riga_excel >= max_righe:
+                    parte += 1
+                    seguito = nome_foglio(f"{nome} ({parte})", usati, MAX_NOME_FOGLIO)
+                    scheda = _prepara_foglio(libro, seguito, foglio, formati_libro, grassetto)
+                    riga_excel = 1
+                scheda.write_row(riga_excel, 0, riga)
+                riga_excel += 1
+                totale += 1
+                if avanzamento and totale % 100_000 == 0:
+                    avanzamento(nome, totale)
+            conteggi[nome] = totale
+    finally:
+        libro.close()
+    return conteggi
+
+
+def tabelle_xlsx(tabelle):
+    """XLSX in memoria (byte) di piccole tabelle {nome foglio: {colonna: valori}}, es. per st.download_button."""
+    uscita = io.BytesIO()
+    esporta_xlsx(uscita, [
+        Foglio(nome, list(tabella), zip(*tabella.values()), {c: {"larghezza": 18} for c in tabella})
+        for nome, tabella in tabelle.items()
+    ])
+    return uscita.getvalue()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Esporta profili e analisi di coppia in Excel.")
+    parser.add_argument("file", nargs="+", help="CSV o Parquet di persone, o CSV di coppie: un foglio per file.")
+    parser.add_argument("--xlsx", required=True, help="File XLSX di output.")
+    parser.add_argument("--testi", action="store_true", help="Aggiunge i testi di compatibilità alle coppie.")
+    args = parser.parse_args(argv)
+
+    inizio = time.monotonic()
+
+    def stampa(nome, righe):
+        print(f"\r📊 {nome}: {righe} righe  {righe / (time.monotonic() - inizio):.0f} righe/s   ",
+              end="", file=sys.stderr, flush=True)
+
+    print(f"\n📤 Esportazione di {len(args.file)} file in {args.xlsx}...\n")
+    conteggi = esporta_xlsx(args.xlsx, [foglio_da_file(f, args.testi) for f in args.file], avanzamento=stampa)
+    print(file=sys.stderr)
+    for nome, righe in conteggi.items():
+        print(f"✅ {nome}: {righe} righe")
+    print(f"\n✅ Esportazione completata in {time.monotonic() - inizio:.1f} s.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,313 @@
+"""
+Metriche dei font condivise in memoria e cache dei sottoinsiemi di glifi per fpdf.
+
+fpdf salva le metriche di ogni TTF in un pickle (fonts/*.pkl, ~136 KB a
+variante) che ogni processo ricarica per intero. Qui le metriche vengono
+compilate una volta in un file binario a formato fisso (fonts/metriche_font.bin)
+e aperte con mmap: le larghezze dei caratteri restano nella page cache del
+sistema, condivise tra tutti i processi.
+
+Il sottoinsieme di glifi incorporato nel PDF (fpdf include solo i caratteri
+usati) viene calcolato rileggendo il TTF a ogni documento: TTFontFileInCache
+lo memorizza per file e insieme di caratteri, così i report con lo stesso
+alfabeto non rileggono il font. PDFNumerologia riusa allo stesso modo
+l'array delle larghezze (/W) scritto nel PDF.
+
+Esempio:
+    pdf = PDFNumerologia()
+    pdf.add_font("DejaVu", "", "DejaVuSans.ttf", uni=True)
+
+Uso:
+    python -m numerologia.font           # compila fonts/metriche_font.bin
+    python -m numerologia.font --verifica
+"""
+
+import argparse
+import errno
+import json
+import mmap
+import os
+import pickle
+import struct
+import sys
+import tempfile
+import zlib
+from array import array
+from functools import lru_cache
+
+import fpdf.fpdf
+from fpdf import FPDF
+from fpdf.ttfonts import TTFontFile
+
+from .cache import CacheLRU
+
+CARTELLA_FONT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "fonts")
+FILE_METRICHE = "metriche_font.bin"
+
+# Formato (little endian): intestazione, indice dei font, metadati JSON, larghezze uint16
+MAGIA = b"NUMFONT\0"
+VERSIONE = 1
+_INTESTAZIONE = struct.Struct("<8sII")  # magia, versione, numero di font
+_VOCE_INDICE = struct.Struct("<IIII")   # offset metadati, lunghezza metadati, offset larghezze, numero larghezze
+_CAMPI_METADATI = ("name", "type", "desc", "up", "ut", "originalsize")
+
+
+# --- COMPILAZIONE ---
+
+def _metriche_sorgente(percorso_ttf):
+    """Metriche di un TTF: dal pickle di fpdf se c'è, altrimenti leggendo il font."""
+    percorso_pkl = os.path.splitext(percorso_ttf)[0] + ".pkl"
+    if os.path.exists(percorso_pkl):
+        with open(percorso_pkl, "rb") as f:
+            metriche = pickle.load(f)
+        metadati = {campo: metriche[campo] for campo in _CAMPI_METADATI}
+        larghezze = metriche["cw"]
+    else:
+        ttf = TTFontFile()
+        ttf.getMetrics(percorso_ttf)
+        metadati = {
+            "name": "".join(c for c in ttf.fullName if c not in " ()"),
+            "type": "TTF",
+            "desc": {
+                "Ascent": int(round(ttf.ascent, 0)),
+                "Descent": int(round(ttf.descent, 0)),
+                "CapHeight": int(round(ttf.capHeight, 0)),
+                "Flags": ttf.flags,
+                "FontBBox": "[%s %s %s %s]" % tuple(int(round(v, 0)) for v in ttf.bbox),
+                "ItalicAngle": int(ttf.italicAngle),
+                "StemV": int(round(ttf.stemV, 0)),
+                "MissingWidth": int(round(ttf.defaultWidth, 0)),
+            },
+            "up": round(ttf.underlinePosition),
+            "ut": round(ttf.underlineThickness),
+        }
+        larghezze = ttf.charWidths
+    # Il percorso salvato da fpdf è assoluto (e della macchina che l'ha generato): si usa il nome del file
+    metadati["ttffile"] = os.path.basename(percorso_ttf)
+    metadati["originalsize"] = os.path.getsize(percorso_ttf)
+    return metadati, larghezze
+
+
+def _sorgenti(cartella):
+    return sorted(
+        os.path.join(cartella, file) for file in os.listdir(cartella) if file.lower().endswith(".ttf")
+    )
+
+
+def compila_metriche(cartella=CARTELLA_FONT, destinazione=None):
+    """Compila le metriche di tutti i TTF della cartella nel file binario e ne restituisce il percorso."""
+    destinazione = destinazione or os.path.join(cartella, FILE_METRICHE)
+    font = []
+    for percorso in _sorgenti(cartella):
+        metadati, larghezze = _metriche_sorgente(percorso)
+        if larghezze and max(larghezze) > 0xFFFF:
+            raise ValueError(f"{percorso}: larghezza oltre 65535, non rappresentabile.")
+        font.append((json.dumps(metadati, ensure_ascii=False).encode("utf-8"), array("H", larghezze)))
+
+    offset = _INTESTAZIONE.size + _VOCE_INDICE.size * len(font)
+    indice, blocchi = [], []
+    for metadati, larghezze in font:
+        offset_metadati = offset
+        offset += len(metadati) + (len(metadati) % 2)  # larghezze allineate a 2 byte
+        indice.append(_VOCE_INDICE.pack(offset_metadati, len(metadati), offset, len(larghezze)))
+        if sys.byteorder != "little":
+            larghezze.byteswap()
+        blocchi.append(metadati + b"\0" * (len(metadati) % 2) + larghezze.tobytes())
+        offset += len(larghezze) * 2
+
+    # Scrittura atomica: i processi che hanno già il file mappato continuano a leggere la versione precedente
+    temporaneo = f"{destinazione}.{os.getpid()}.tmp"
+    with open(temporaneo, "wb") as f:
+        f.write(_INTESTAZIONE.pack(MAGIA, VERSIONE, len(font)))
+        f.writelines(indice)
+        f.writelines(blocchi)
+    os.replace(temporaneo, destinazione)
+    return destinazione
+
+
+def _da_ricompilare(cartella, percorso):
+    if not os.path.exists(percorso):
+        return True
+    compilato = os.path.getmtime(percorso)
+    for ttf in _sorgenti(cartella):
+        pkl = os.path.splitext(ttf)[0] + ".pkl"
+        if os.path.getmtime(ttf) > compilato or (os.path.exists(pkl) and os.path.getmtime(pkl) > compilato):
+            return True
+    return False
+
+
+# --- ARCHIVIO MAPPATO IN MEMORIA ---
+
+class ArchivioMetriche:
+    """Metriche dei font lette dal file compilato tramite mmap (sola lettura)."""
+
+    def __init__(self, percorso, cartella=CARTELLA_FONT):
+        self.percorso = percorso
+        self.cartella = cartella
+        with open(percorso, "rb") as f:
+            self._mappa = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magia, versione, numero = _INTESTAZIONE.unpack_from(self._mappa, 0)
+        if magia != MAGIA or versione != VERSIONE:
+            raise ValueError(f"{percorso}: formato metriche non riconosciuto (versione {versione}).")
+        vista = memoryview(self._mappa)
+        self._font = {}
+        for i in range(numero):
+            offset_metadati, lunghezza, offset_larghezze, quante = _VOCE_INDICE.unpack_from(
+                self._mappa, _INTESTAZIONE.size + i * _VOCE_INDICE.size)
+            metadati = json.loads(bytes(vista[offset_metadati:offset_metadati + lunghezza]))
+            larghezze = vista[offset_larghezze:offset_larghezze + quante * 2]
+            if sys.byteorder == "little":
+                larghezze = larghezze.cast("H")  # nessuna copia: le pagine restano condivise
+            else:
+                larghezze = array("H", larghezze)
+                larghezze.byteswap()
+            self._font[metadati["ttffile"]] = (metadati, larghezze)
+
+    def __contains__(self, file_ttf):
+        return os.path.basename(file_ttf) in self._font
+
+    def nomi(self):
+        return sorted(self._font)
+
+    def metriche(self, file_ttf):
+        """Dizionario delle metriche nel formato dei pickle di fpdf ("cw" è una vista uint16)."""
+        metadati, larghezze = self._font[os.path.basename(file_ttf)]
+        return {**metadati, "ttffile": os.path.join(self.cartella, metadati["ttffile"]), "cw": larghezze}
+
+
+@lru_cache(maxsize=None)
+def archivio_metriche(cartella=CARTELLA_FONT):
+    """Archivio delle metriche della cartella (uno per processo), ricompilato se i font sono cambiati."""
+    percorso = os.path.join(cartella, FILE_METRICHE)
+    if _da_ricompilare(cartella, percorso):
+        try:
+            compila_metriche(cartella, percorso)
+        except OSError as e:
+            # Cartella dei font in sola lettura (es. immagine del container): si compila
+            # in /tmp, in un file distinto per cartella dei font
+            if e.errno not in (errno.EACCES, errno.EPERM, errno.EROFS):
+                raise
+            codice = zlib.crc32(os.path.abspath(cartella).encode("utf-8"))
+            percorso = os.path.join(tempfile.gettempdir(), f"numerologia-{codice:08x}-{FILE_METRICHE}")
+            if _da_ricompilare(cartella, percorso):
+                compila_metriche(cartella, percorso)
+    return ArchivioMetriche(percorso, cartella)
+
+
+# --- CACHE DEI SOTTOINSIEMI DI GLIFI ---
+
+_SUBSET = CacheLRU("numerologia.font.subset", max_voci=64, misura_byte=True)
+_LARGHEZZE_PDF = CacheLRU("numerologia.font.larghezze_pdf", max_voci=64, misura_byte=True)
+
+
+class TTFontFileInCache(TTFontFile):
+    """TTFontFile che memorizza i sottoinsiemi già generati per file e insieme di caratteri."""
+
+    def makeSubset(self, file, subset):
+        stato = os.stat(file)
+        chiave = (os.path.abspath(file), stato.st_mtime_ns, stato.st_size, frozenset(subset))
+        risultato = _SUBSET.get(chiave)
+        if risultato is None:
+            flusso = super().makeSubset(file, subset)
+            risultato = (flusso, self.codeToGlyph, self.maxUni)
+            _SUBSET.set(chiave, risultato)
+        flusso, codici, self.maxUni = risultato
+        self.codeToGlyph = dict(codici)
+        return flusso
+
+
+def attiva_cache_subset():
+    """Fa usare a fpdf TTFontFileInCache per incorporare i font (idempotente)."""
+    fpdf.fpdf.TTFontFile = TTFontFileInCache
+
+
+# --- FPDF ---
+
+def aggiungi_font(pdf, famiglia, stile="", file_ttf="DejaVuSans.ttf", archivio=None):
+    """Registra un font Unicode in un FPDF usando le metriche mappate invece del pickle."""
+    archivio = archivio or archivio_metriche()
+    famiglia = famiglia.lower()
+    if famiglia == "arial":
+        famiglia = "helvetica"
+    stile = stile.upper()
+    if stile == "IB":
+        stile = "BI"
+    chiave = famiglia + stile
+    if chiave in pdf.fonts:
+        return
+    metriche = archivio.metriche(file_ttf)
+    pdf.fonts[chiave] = {
+        "i": len(pdf.fonts) + 1, "type": metriche["type"], "name": metriche["name"],
+        "desc": metriche["desc"], "up": metriche["up"], "ut": metriche["ut"], "cw": metriche["cw"],
+        "ttffile": metriche["ttffile"], "fontkey": chiave,
+        # Come fpdf: le cifre servono per il numero di pagine
+        "subset": list(range(0, 57 if hasattr(pdf, "str_alias_nb_pages") else 32)),
+        "unifilename": None,
+    }
+    pdf.font_files[chiave] = {"length1": metriche["originalsize"], "type": "TTF", "ttffile": metriche["ttffile"]}
+    pdf.font_files[file_ttf] = {"type": "TTF"}
+
+
+class PDFNumerologia(FPDF):
+    """FPDF che prende le metriche dei font di fonts/ dall'archivio mappato e ne memorizza i sottoinsiemi."""
+
+    def __init__(self, *args, **kwargs):
+        attiva_cache_subset()
+        super().__init__(*args, **kwargs)
+
+    def add_font(self, family, style="", fname="", uni=False):
+        if uni and fname:
+            archivio = archivio_metriche()
+            if fname in archivio:
+                return aggiungi_font(self, family, style, fname, archivio)
+        return super().add_font(family, style, fname, uni)
+
+    def _putTTfontwidths(self, font, maxUni):
+        # L'array /W dipende solo dal font e dai caratteri usati: fpdf lo ricalcola
+        # scorrendo tutti i codici fino a maxUni, qui si riusano le righe già generate
+        chiave = (font["ttffile"], frozenset(font["subset"]), maxUni, font.get("dw"))
+        righe = _LARGHEZZE_PDF.get(chiave)
+        if righe is None:
+            righe = []
+            self._out = righe.append  # raccoglie le righe invece di scriverle
+            try:
+                super()._putTTfontwidths(font, maxUni)
+            finally:
+                del self._out
+            _LARGHEZZE_PDF.set(chiave, righe)
+        for riga in righe:
+            self._out(riga)
+
+
+# --- VERIFICA ---
+
+def verifica(cartella=CARTELLA_FONT):
+    """Le metriche mappate coincidono con quelle dei pickle di fpdf."""
+    archivio = archivio_metriche(cartella)
+    for percorso in _sorgenti(cartella):
+        metadati, larghezze = _metriche_sorgente(percorso)
+        mappate = archivio.metriche(percorso)
+        if list(mappate["cw"]) != list(larghezze):
+            raise AssertionError(f"{percorso}: larghezze diverse")
+        for campo in _CAMPI_METADATI:
+            if mappate[campo] != metadati[campo]:
+                raise AssertionError(f"{percorso}: campo '{campo}' diverso")
+    return archivio.nomi()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compila le metriche dei font per fpdf.")
+    parser.add_argument("--cartella", default=CARTELLA_FONT)
+    parser.add_argument("--verifica", action="store_true", help="Confronta le metriche compilate con i pickle.")
+    args = parser.parse_args(argv)
+    if args.verifica:
+        nomi = verifica(args.cartella)
+        print(f"✅ Metriche identiche ai pickle per {len(nomi)} font: {', '.join(nomi)}")
+        return 0
+    percorso = compila_metriche(args.cartella)
+    print(f"✅ Metriche compilate in {percorso} ({os.path.getsize(percorso) / 1024:.0f} KiB)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,246 @@
+"""
+Grafici dello schema energetico con cache dei PNG/SVG.
+
+Il grafico dipende solo da un piccolo vettore di numeri da 1 a 9 e dallo
+stile, quindi i byte renderizzati vengono memorizzati per
+(vettore, etichette, stile, formato, dpi): prima in una CacheLRU del
+processo, poi in una cartella su disco condivisa dai worker, con
+espulsione dei file meno usati. Il disegno usa l'API a oggetti di
+matplotlib (Figure + FigureCanvasAgg) senza pyplot, quindi niente stato
+globale e niente lock di pyplot fra le sessioni.
+
+preriscalda() carica in memoria i grafici usati più di recente su disco
+(o disegna i vettori indicati) in un thread in background.
+
+Esempio:
+    png = grafico_schema((4, 5, 8, 6, 3, 9))
+    st.image(png)
+"""
+
+import hashlib
+import io
+import math
+import os
+import tempfile
+import threading
+
+from .cache import CacheLRU
+from .metriche import tracciato
+
+VERSIONE = 1   # cambia quando cambia il disegno: invalida la cache su disco
+CARTELLA_CACHE = os.environ.get(
+    "NUMEROLOGIA_CACHE_GRAFICI", os.path.join(tempfile.gettempdir(), "numerologia-grafici")
+)
+MAX_VOCI_MEMORIA = 1024
+MAX_FILE_DISCO = 20_000
+FORMATI = {"png": "image/png", "svg": "image/svg+xml"}
+ETICHETTE_CORE = ("Sentiero di Vita", "Espressione", "Anima", "Personalità", "Forza", "Quintessenza")
+
+STILI = {
+    "chiaro": {"sfondo": "#ffffff", "griglia": "#d9d9d9", "testo": "#333333", "linea": "#7b2cbf", "area": "#c77dff"},
+    "scuro": {"sfondo": "#0e1117", "griglia": "#3a3f4b", "testo": "#fafafa", "linea": "#e0aaff", "area": "#9d4edd"},
+}
+
+_MEMORIA = CacheLRU("numerologia.grafici", max_voci=MAX_VOCI_MEMORIA, misura_byte=True)
+_LOCK_DISCO = threading.Lock()
+_IN_CORSO = {}  # chiave -> lock del disegno in corso, condiviso dalle richieste concorrenti
+_LOCK_IN_CORSO = threading.Lock()
+_scritture = 0
+_preriscaldamento = None
+
+
+def _chiave(vettore, etichette, stile, formato, dpi):
+    testo = repr((VERSIONE, tuple(vettore), tuple(etichette), stile, formato, dpi))
+    return hashlib.sha1(testo.encode("utf-8")).hexdigest()
+
+
+# --- DISEGNO ---
+
+@tracciato("grafici.disegna")
+def disegna_schema(vettore, etichette=None, stile="chiaro", formato="png", dpi=110):
+    """Disegna lo schema energetico (radar da 3 valori in su, barre altrimenti) e ne restituisce i byte."""
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    colori = STILI[stile]
+    etichette = list(etichette or (ETICHETTE_CORE if len(vettore) == len(ETICHETTE_CORE)
+                                   else [str(i + 1) for i in range(len(vettore))]))
+    figura = Figure(figsize=(5, 5), facecolor=colori["sfondo"])
+    FigureCanvasAgg(figura)
+    if len(vettore) >= 3:
+        angoli = [2 * math.pi * i / len(vettore) for i in range(len(vettore))]
+        assi = figura.add_subplot(polar=True, facecolor=colori["sfondo"])
+        assi.set_theta_offset(math.pi / 2)
+        assi.set_theta_direction(-1)
+        assi.plot(angoli + angoli[:1], list(vettore) + [vettore[0]], color=colori["linea"], linewidth=2)
+        assi.fill(angoli + angoli[:1], list(vettore) + [vettore[0]], color=colori["area"], alpha=0.35)
+        for angolo, valore in zip(angoli, vettore):
+            assi.annotate(str(valore), (angolo, valore), textcoords="offset points", xytext=(0, 6),
+                          ha="center", color=colori["testo"], fontsize=10, fontweight="bold")
+        assi.set_xticks(angoli, etichette, color=colori["testo"], fontsize=9)
+        assi.set_ylim(0, 9.5)
+        assi.set_yticks(range(1, 10), [], color=colori["testo"])
+        assi.grid(color=colori["griglia"])
+        assi.spines["polar"].set_color(colori["griglia"])
+    else:
+        assi = figura.add_subplot(facecolor=colori["sfondo"])
+        assi.bar(etichette, vettore, color=colori["area"], edgecolor=colori["linea"])
+        assi.set_ylim(0, 9.5)
+        assi.tick_params(colors=colori["testo"])
+    figura.tight_layout()
+    uscita = io.BytesIO()
+    figura.savefig(uscita, format=formato, dpi=dpi, facecolor=colori["sfondo"])
+    return uscita.getvalue()
+
+
+# --- CACHE SU DISCO ---
+
+def _percorso(chiave, formato):
+    return os.path.join(CARTELLA_CACHE, f"{chiave}.{formato}")
+
+
+def _leggi_disco(chiave, formato):
+    percorso = _percorso(chiave, formato)
+    try:
+        with open(percorso, "rb") as f:
+            contenuto = f.read()
+        os.utime(percorso)  # la data di modifica fa da "ultimo uso" per l'espulsione
+        return contenuto
+    except OSError:
+        return None
+
+
+def _voci_disco():
+    """[(mtime, percorso)] dei grafici su disco, dal meno recente; salta i file spariti nel frattempo."""
+    try:
+        nomi = [nome for nome in os.listdir(CARTELLA_CACHE) if not nome.endswith(".tmp")]
+    except OSError:
+        return []
+    voci = []
+    for nome in nomi:
+        percorso = os.path.join(CARTELLA_CACHE, nome)
+        try:
+            voci.append((os.stat(percorso).st_mtime, percorso))
+        except OSError:
+            continue  # rimosso da un altro worker dopo listdir
+    voci.sort()
+    return voci
+
+
+def _espelli_disco():
+    voci = _voci_disco()
+    if len(voci) <= MAX_FILE_DISCO:
+        return
+    # Scende al 90% del limite per non ripetere la scansione a ogni scrittura
+    for _, percorso in voci[:len(voci) - int(MAX_FILE_DISCO * 0.9)]:
+        try:
+            os.remove(percorso)
+        except OSError:
+            pass
+
+
+def _scrivi_disco(chiave, formato, contenuto):
+    global _scritture
+    try:
+        os.makedirs(CARTELLA_CACHE, exist_ok=True)
+        destinazione = _percorso(chiave, formato)
+        temporaneo = f"{destinazione}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporaneo, "wb") as f:
+            f.write(contenuto)
+        os.replace(temporaneo, destinazione)
+    except OSError:
+        return  # cartella in sola lettura: resta la cache in memoria
+    with _LOCK_DISCO:
+        _scritture += 1
+        controlla = _scritture % 256 == 0
+    if controlla:
+        _espelli_disco()
+
+
+# --- ACCESSO CON CACHE ---
+
+@tracciato("grafici.schema")
+def grafico_schema(vettore, etichette=None, stile="chiaro", formato="png", dpi=110):
+    """Byte del grafico del vettore: dalla memoria, dal disco o disegnato e memorizzato."""
+    if formato not in FORMATI:
+        raise ValueError(f"Formato non supportato: {formato!r} (usa {', '.join(FORMATI)})")
+    if stile not in STILI:
+        raise ValueError(f"Stile sconosciuto: {stile!r} (usa {', '.join(STILI)})")
+    vettore = tuple(int(v) for v in vettore)
+    etichette = tuple(etichette or ())
+    chiave = _chiave(vettore, etichette, stile, formato, dpi)
+
+    contenuto = _MEMORIA.get(chiave)
+    if contenuto is not None:
+        return contenuto
+    # Più sessioni che chiedono lo stesso grafico non ancora in memoria: lo
+    # disegna la prima, le altre aspettano il suo risultato
+    with _LOCK_IN_CORSO:
+        lock = _IN_CORSO.setdefault(chiave, threading.Lock())
+    try:
+        with lock:
+            contenuto = _MEMORIA.get(chiave, conta=False)
+            if contenuto is None:
+                contenuto = _leggi_disco(chiave, formato)
+                if contenuto is None:
+                    contenuto = disegna_schema(vettore, etichette, stile, formato, dpi)
+                    _scrivi_disco(chiave, formato, contenuto)
+                _MEMORIA.set(chiave, contenuto)
+    finally:
+        with _LOCK_IN_CORSO:
+            if _IN_CORSO.get(chiave) is lock:
+                del _IN_CORSO[chiave]
+    return contenuto
+
+
+def statistiche_grafici():
+    return _MEMORIA.statistiche.come_dict()
+
+
+# --- PRERISCALDAMENTO ---
+
+def _preriscalda(vettori, opzioni, quantita):
+    if vettori is None:
+        # Grafici usati più di recente su disco (anche da altri worker)
+        for _, percorso in _voci_disco()[::-1][:quantita]:
+            chiave, _, _ = os.path.basename(percorso).partition(".")
+            try:
+                with open(percorso, "rb") as f:
+                    _MEMORIA.set(chiave, f.read())
+            except OSError:
+                continue
+        return
+    for vettore in vettori:
+        try:
+            grafico_schema(vettore, **opzioni)
+        except Exception:
+            continue
+
+
+def preriscalda(vettori=None, quantita=MAX_VOCI_MEMORIA // 2, attendi=False, **opzioni):
+    """
+    Porta in memoria i grafici più usati (vettori=None: i più recenti su disco)
+    o disegna i vettori indicati con le opzioni di grafico_schema, in un thread
+    in background salvo attendi=True. La lettura dal disco avviene una volta per
+    processo (le chiamate successive restituiscono lo stesso thread); ogni
+    richiesta con vettori avvia un proprio thread.
+    """
+    global _preriscaldamento
+    if vettori is not None:
+        thread = threading.Thread(target=_preriscalda, args=(list(vettori), opzioni, quantita),
+                                  name="preriscaldamento-grafici-vettori", daemon=True)
+        thread.start()
+        if attendi:
+            thread.join()
+        return thread
+    with _LOCK_DISCO:
+        if _preriscaldamento is None:
+            _preriscaldamento = threading.Thread(
+                target=_preriscalda, args=(None, opzioni, quantita),
+                name="preriscaldamento-grafici", daemon=True,
+            )
+            _preriscaldamento.start()
+        thread = _preriscaldamento
+    if attendi:
+        thread.join()
+    return thread
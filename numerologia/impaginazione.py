@@ -0,0 +1,161 @@
+"""
+Impaginazione dei report PDF di una persona o di una coppia.
+
+Usa gli stessi calcoli e testi della pagina di compatibilità di coppia
+(numerologia.calcolo, numerologia.compatibilita) e PDFNumerologia per i
+font DejaVu condivisi. Restituisce i byte del PDF.
+
+Esempio:
+    persona = {"nome": "Maria", "cognome": "Rossi", "data_nascita": date(1990, 1, 1)}
+    contenuto = pdf_persona(persona)
+"""
+
+import re
+
+from .calcolo import calcola_numeri_compatibilita_persona
+from .compatibilita import MAPPE_COMPATIBILITA, get_compatibilita_analysis
+from .font import PDFNumerologia
+from .metriche import tracciato
+
+ETICHETTE_CORE = {
+    "sentiero_di_vita": "Sentiero di Vita",
+    "espressione": "Espressione",
+    "anima": "Anima",
+    "personalita": "Personalità",
+    "forza": "Forza",
+    "quintessenza": "Quintessenza",
+}
+TITOLI_CORE = {
+    "sentiero_di_vita": "Sentiero di Vita: La Mappa del Destino",
+    "espressione": "Numero di Espressione: Come Vi Manifestate",
+    "anima": "Numero dell'Anima: Desideri del Cuore",
+    "personalita": "Numero della Personalità: Come Vi Percepite Esternamente",
+    "forza": "Numero di Forza (Destino): Talenti e Sfide Innate",
+    "quintessenza": "Quintessenza: L'Essenza Unificante",
+}
+# (etichetta, gruppo in "dinamici", chiave, mappa di compatibilità)
+DINAMICI = [
+    ("Ciclo Esperienza", "cicli", "esperienza", "cicli"),
+    ("Ciclo Potere", "cicli", "potere", "cicli"),
+    ("Ciclo Saggezza", "cicli", "saggezza", "cicli"),
+    ("Pinnacolo 1", "pinnacoli", "p1", "pinnacoli"),
+    ("Pinnacolo 2", "pinnacoli", "p2", "pinnacoli"),
+    ("Pinnacolo 3", "pinnacoli", "p3", "pinnacoli"),
+    ("Pinnacolo 4", "pinnacoli", "p4", "pinnacoli"),
+    ("Sfida 1", "sfide", "s1", "sfide"),
+    ("Sfida 2", "sfide", "s2", "sfide"),
+    ("Sfida 3", "sfide", "s3", "sfide"),
+    ("Sfida 4", "sfide", "s4", "sfide"),
+]
+
+_GRASSETTO = re.compile(r"\*\*(.+?)\*\*")
+
+
+def calcola_profilo(persona):
+    """Profilo numerologico di un dict con nome, cognome e data_nascita (date)."""
+    data = persona["data_nascita"]
+    return calcola_numeri_compatibilita_persona(persona["nome"], persona["cognome"], data.day, data.month, data.year)
+
+
+def testo_semplice(testo):
+    """Toglie il markdown dei testi di compatibilità (es. **1 e 2:**)."""
+    return _GRASSETTO.sub(r"\1", testo).strip()
+
+
+# --- PDF ---
+
+def _nuovo_pdf(titolo):
+    pdf = PDFNumerologia()
+    pdf.set_auto_page_break(True, margin=15)
+    pdf.add_font("DejaVu", "", "DejaVuSans.ttf", uni=True)
+    pdf.add_font("DejaVu", "B", "DejaVuSans-Bold.ttf", uni=True)
+    pdf.add_page()
+    pdf.set_font("DejaVu", "B", 18)
+    pdf.cell(0, 12, titolo, ln=1, align="C")
+    return pdf
+
+
+def _sezione(pdf, titolo):
+    pdf.ln(3)
+    pdf.set_font("DejaVu", "B", 13)
+    pdf.multi_cell(0, 8, titolo)
+    pdf.set_font("DejaVu", "", 10)
+
+
+def _tabella(pdf, intestazioni, righe):
+    larghezza = (pdf.w - pdf.l_margin - pdf.r_margin) / len(intestazioni)
+    pdf.set_font("DejaVu", "B", 10)
+    for intestazione in intestazioni:
+        pdf.cell(larghezza, 7, intestazione, border=1, align="C")
+    pdf.ln()
+    pdf.set_font("DejaVu", "", 10)
+    for riga in righe:
+        for valore in riga:
+            pdf.cell(larghezza, 7, str(valore), border=1, align="C")
+        pdf.ln()
+
+
+def _dati_persona(persona):
+    return f"{persona['nome']} {persona['cognome']} - nato/a il {persona['data_nascita'].strftime('%d/%m/%Y')}"
+
+
+def _contenuto(pdf):
+    contenuto = pdf.output(dest="S")
+    # fpdf 1.7 restituisce una str latin-1
+    return contenuto.encode("latin-1") if isinstance(contenuto, str) else bytes(contenuto)
+
+
+@tracciato("pdf.persona")
+def pdf_persona(persona, profilo=None):
+    """Report PDF dei numeri di una persona."""
+    profilo = profilo or calcola_profilo(persona)
+    pdf = _nuovo_pdf("Report Numerologico")
+    pdf.set_font("DejaVu", "", 11)
+    pdf.multi_cell(0, 7, _dati_persona(persona))
+
+    _sezione(pdf, "Numeri Chiave (Statici)")
+    _tabella(pdf, ["Numero", "Valore"], [(ETICHETTE_CORE[k], v) for k, v in profilo["core"].items()])
+
+    _sezione(pdf, "Numeri Chiave (Dinamici)")
+    dinamici = profilo["dinamici"]
+    _tabella(pdf, ["Tipo", "Valore"], [(etichetta, dinamici[gruppo][chiave]) for etichetta, gruppo, chiave, _ in DINAMICI])
+    eta = dinamici["eta_pinnacoli"]
+    pdf.ln(2)
+    pdf.multi_cell(0, 6, f"Età di fine dei pinnacoli: {eta['fine_p1']}, {eta['fine_p2']}, {eta['fine_p3']} anni.")
+    return _contenuto(pdf)
+
+
+@tracciato("pdf.coppia")
+def pdf_coppia(persona1, persona2, profilo1=None, profilo2=None):
+    """Report PDF di compatibilità di una coppia, con i testi della pagina di coppia."""
+    profilo1 = profilo1 or calcola_profilo(persona1)
+    profilo2 = profilo2 or calcola_profilo(persona2)
+    pdf = _nuovo_pdf("Compatibilità di Coppia Numerologica")
+    pdf.set_font("DejaVu", "", 11)
+    pdf.multi_cell(0, 7, _dati_persona(persona1))
+    pdf.multi_cell(0, 7, _dati_persona(persona2))
+
+    nome1, nome2 = persona1["nome"].capitalize(), persona2["nome"].capitalize()
+    _sezione(pdf, "Numeri Chiave di Coppia (Statici)")
+    _tabella(pdf, ["Numero", nome1, nome2],
+             [(ETICHETTE_CORE[k], profilo1["core"][k], profilo2["core"][k]) for k in ETICHETTE_CORE])
+    _sezione(pdf, "Numeri Chiave di Coppia (Dinamici)")
+    _tabella(pdf, ["Tipo", nome1, nome2], [
+        (etichetta, profilo1["dinamici"][gruppo][chiave], profilo2["dinamici"][gruppo][chiave])
+        for etichetta, gruppo, chiave, _ in DINAMICI
+    ])
+
+    for chiave, titolo in TITOLI_CORE.items():
+        _sezione(pdf, titolo)
+        testo = get_compatibilita_analysis(profilo1["core"][chiave], profilo2["core"][chiave], MAPPE_COMPATIBILITA[chiave])
+        pdf.multi_cell(0, 5, testo_semplice(testo))
+
+    _sezione(pdf, "Cicli, Pinnacoli e Sfide")
+    for etichetta, gruppo, chiave, mappa in DINAMICI:
+        testo = get_compatibilita_analysis(profilo1["dinamici"][gruppo][chiave], profilo2["dinamici"][gruppo][chiave],
+                                           MAPPE_COMPATIBILITA[mappa])
+        pdf.set_font("DejaVu", "B", 10)
+        pdf.multi_cell(0, 5, etichetta)
+        pdf.set_font("DejaVu", "", 10)
+        pdf.multi_cell(0, 5, testo_semplice(testo))
+    return _contenuto(pdf)
@@ -0,0 +1,262 @@
+"""
+Archivio compilato dei testi di compatibilità, con ricarica a caldo.
+
+I testi si modificano in numerologia/dati/interpretazioni.json:
+
+    {"anima": {"default": "...", "coppie": {"1-2": "...", ...}}, ...}
+
+e vengono compilati in interpretazioni.bin: per ogni categoria una tabella
+piatta di 100 posizioni (indice min*10 + max, numeri da 0 a 9) più il testo
+"default", con i testi UTF-8 in coda. Il file è mappato con mmap al primo
+uso e ogni testo viene decodificato solo quando viene letto la prima volta:
+un processo tiene in memoria i testi che usa, non l'intero archivio.
+
+Il file compilato registra data e dimensione del JSON da cui proviene:
+quando il JSON cambia viene ricompilato e rimappato senza riavviare il
+processo (controllo ogni INTERVALLO_CONTROLLO secondi).
+
+Esempio:
+    testo_coppia("anima", 2, 1)   # stesso testo di (1, 2)
+"""
+
+import errno
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import threading
+import time
+import zlib
+
+CARTELLA_DATI = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dati")
+FILE_SORGENTE = os.path.join(CARTELLA_DATI, "interpretazioni.json")
+FILE_COMPILATO = "interpretazioni.bin"
+INTERVALLO_CONTROLLO = 2.0  # secondi tra due controlli della data del JSON
+
+_log = logging.getLogger(__name__)
+
+CATEGORIE = (
+    "sentiero_di_vita", "espressione", "anima", "personalita", "forza",
+    "quintessenza", "cicli", "pinnacoli", "sfide",
+)
+POSIZIONI = 100        # coppie (min, max) con numeri 0..9
+POSIZIONE_DEFAULT = POSIZIONI
+TESTO_MANCANTE = "Analisi non disponibile per questa combinazione specifica. Controlla la tua KB."
+
+# Formato (little endian): intestazione, nomi delle categorie, tabelle (offset, lunghezza), testi
+MAGIA = b"NUMINTP\0"
+VERSIONE = 1
+_INTESTAZIONE = struct.Struct("<8sIIqQ")  # magia, versione, numero di categorie, mtime_ns e dimensione del JSON
+_NOME = struct.Struct("<32s")
+_POSIZIONE = struct.Struct("<II")       # offset del testo, lunghezza in byte (0 = mancante)
+
+
+def indice_coppia(a, b):
+    """Posizione della coppia nella tabella: simmetrica, min*10 + max."""
+    return a * 10 + b if a <= b else b * 10 + a
+
+
+def _chiave(testo):
+    """"1-2" -> (1, 2)."""
+    a, _, b = testo.partition("-")
+    a, b = int(a), int(b)
+    if not (0 <= a <= 9 and 0 <= b <= 9):
+        raise ValueError(f"Coppia fuori intervallo: {testo!r}")
+    return a, b
+
+
+# --- COMPILAZIONE ---
+
+def compila(sorgente=FILE_SORGENTE, destinazione=None):
+    """Compila il JSON dei testi nel file binario e ne restituisce il percorso."""
+    destinazione = destinazione or os.path.join(os.path.dirname(sorgente), FILE_COMPILATO)
+    with open(sorgente, encoding="utf-8") as f:
+        stato = os.fstat(f.fileno())
+        dati = json.load(f)
+    sconosciute = set(dati) - set(CATEGORIE)
+    if sconosciute:
+        raise ValueError(f"Categorie non valide in {sorgente}: {', '.join(sorted(sconosciute))}")
+
+    testi = bytearray()
+    tabelle = []
+    inizio_testi = (_INTESTAZIONE.size + (_NOME.size + _POSIZIONE.size * (POSIZIONI + 1)) * len(CATEGORIE))
+    for categoria in CATEGORIE:
+        voci = dati.get(categoria, {})
+        posizioni = [(0, 0)] * (POSIZIONI + 1)
+        elementi = [(indice_coppia(*_chiave(k)), v) for k, v in voci.get("coppie", {}).items()]
+        if voci.get("default") is not None:
+            elementi.append((POSIZIONE_DEFAULT, voci["default"]))
+        for posizione, testo in elementi:
+            codificato = testo.encode("utf-8")
+            posizioni[posizione] = (inizio_testi + len(testi), len(codificato))
+            testi += codificato
+        tabelle.append(posizioni)
+
+    temporaneo = f"{destinazione}.{os.getpid()}.tmp"
+    with open(temporaneo, "wb") as f:
+        f.write(_INTESTAZIONE.pack(MAGIA, VERSIONE, len(CATEGORIE), stato.st_mtime_ns, stato.st_size))
+        for categoria, posizioni in zip(CATEGORIE, tabelle):
+            f.write(_NOME.pack(categoria.encode("ascii")))
+            f.writelines(_POSIZIONE.pack(*p) for p in posizioni)
+        f.write(testi)
+    os.replace(temporaneo, destinazione)
+    return destinazione
+
+
+# --- ARCHIVIO ---
+
+class ArchivioInterpretazioni:
+    """Testi compilati mappati in memoria, decodificati al primo accesso."""
+
+    def __init__(self, sorgente=FILE_SORGENTE):
+        self.sorgente = sorgente
+        self.versione = 0
+        self._lock = threading.Lock()
+        self._tabelle = None
+        self._impronta = None
+        self._prossimo_controllo = 0.0
+
+    def _mappa_valida(self, percorso, impronta):
+        """Mappa il file compilato se corrisponde alla versione attuale del JSON, altrimenti None."""
+        try:
+            with open(percorso, "rb") as f:
+                mappa = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+        try:
+            magia, versione, _, mtime_ns, dimensione = _INTESTAZIONE.unpack_from(mappa, 0)
+        except struct.error:
+            mappa.close()
+            return None
+        if magia != MAGIA or versione != VERSIONE or (mtime_ns, dimensione) != impronta:
+            mappa.close()
+            return None
+        return mappa
+
+    def _carica(self, impronta):
+        # Copia in /tmp per cartelle in sola lettura, distinta per file sorgente
+        codice = zlib.crc32(os.path.abspath(self.sorgente).encode("utf-8"))
+        candidati = (
+            os.path.join(os.path.dirname(self.sorgente), FILE_COMPILATO),
+            os.path.join(tempfile.gettempdir(), f"numerologia-{codice:08x}-{FILE_COMPILATO}"),
+        )
+        mappa = self._mappa_valida(candidati[0], impronta) or self._mappa_valida(candidati[1], impronta)
+        if mappa is None:
+            try:
+                percorso = compila(self.sorgente, candidati[0])
+            except OSError as e:
+                # Cartella in sola lettura (permessi o filesystem montato read-only)
+                if e.errno not in (errno.EACCES, errno.EPERM, errno.EROFS):
+                    raise
+                percorso = compila(self.sorgente, candidati[1])
+            with open(percorso, "rb") as f:
+                mappa = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        numero = _INTESTAZIONE.unpack_from(mappa, 0)[2]
+        tabelle = {}
+        offset = _INTESTAZIONE.size
+        for _ in range(numero):
+            categoria = _NOME.unpack_from(mappa, offset)[0].rstrip(b"\0").decode("ascii")
+            offset += _NOME.size
+            posizioni = [_POSIZIONE.unpack_from(mappa, offset + i * _POSIZIONE.size) for i in range(POSIZIONI + 1)]
+            offset += _POSIZIONE.size * (POSIZIONI + 1)
+            tabelle[categoria] = _Tabella(mappa, posizioni)
+        self._tabelle = tabelle
+        self._impronta = impronta
+        self.versione += 1
+
+    def _aggiorna(self):
+        """Carica al primo uso e ricarica se il JSON è cambiato (al più ogni INTERVALLO_CONTROLLO s)."""
+        adesso = time.monotonic()
+        if self._tabelle is not None and adesso < self._prossimo_controllo:
+            return self._tabelle
+        with self._lock:
+            if self._tabelle is None or adesso >= self._prossimo_controllo:
+                try:
+                    stato = os.stat(self.sorgente)
+                    impronta = (stato.st_mtime_ns, stato.st_size)
+                    if impronta != self._impronta:
+                        self._carica(impronta)
+                except (OSError, ValueError, TypeError, AttributeError):
+                    # JSON mancante o malformato: senza un caricamento riuscito non
+                    # c'è nulla da servire, altrimenti restano i testi precedenti
+                    if self._tabelle is None:
+                        raise
+                    _log.exception("Interpretazioni non ricaricate da %s: restano i testi precedenti", self.sorgente)
+                self._prossimo_controllo = adesso + INTERVALLO_CONTROLLO
+        return self._tabelle
+
+    def ricarica(self):
+        """Forza la rilettura del JSON al prossimo accesso."""
+        with self._lock:
+            self._impronta = None
+            self._prossimo_controllo = 0.0
+
+    def tabella(self, categoria):
+        return self._aggiorna()[categoria]
+
+    def testo(self, categoria, a, b, predefinito=TESTO_MANCANTE):
+        """Testo della coppia (a, b), o il "default" della categoria se manca."""
+        tabelle = self._tabelle
+        if tabelle is None or time.monotonic() >= self._prossimo_controllo:
+            tabelle = self._aggiorna()
+        posizione = (a * 10 + b if a <= b else b * 10 + a) if 0 <= a <= 9 and 0 <= b <= 9 else POSIZIONE_DEFAULT
+        tabella = tabelle[categoria]
+        testo = tabella._testi[posizione]  # percorso caldo: senza chiamata se già decodificato
+        if testo is None:
+            testo = tabella._decodifica(posizione)
+        return predefinito if testo is None else testo
+
+
+class _Tabella:
+    """
+    Tabella di una categoria sul file mappato. Un testo viene decodificato dalla
+    mappa solo al primo accesso e poi tenuto: in memoria restano i testi usati,
+    non l'intero archivio. Le coppie mancanti ricadono sul "default".
+    """
+
+    def __init__(self, mappa, posizioni):
+        self._mappa = mappa
+        self._posizioni = posizioni
+        self._testi = [None] * len(posizioni)
+
+    def _decodifica(self, posizione):
+        offset, lunghezza = self._posizioni[posizione]
+        if not lunghezza:
+            offset, lunghezza = self._posizioni[POSIZIONE_DEFAULT]
+            if not lunghezza:
+                return None
+        testo = self._testi[posizione] = self._mappa[offset:offset + lunghezza].decode("utf-8")
+        return testo
+
+    def testo_o_default(self, posizione):
+        """Testo della posizione o, se manca, il "default" (None se mancano entrambi)."""
+        testo = self._testi[posizione]
+        return self._decodifica(posizione) if testo is None else testo
+
+    def testo(self, posizione):
+        """Testo della posizione, None se manca (senza ripiego sul "default")."""
+        return self.testo_o_default(posizione) if self.presente(posizione) else None
+
+    def presente(self, posizione):
+        return self._posizioni[posizione][1] > 0
+
+
+ARCHIVIO = ArchivioInterpretazioni()
+
+
+def testo_coppia(categoria, a, b):
+    """Testo di compatibilità per la coppia di numeri nella categoria."""
+    return ARCHIVIO.testo(categoria, a, b)
+
+
+def main():
+    percorso = compila()
+    print(f"✅ Interpretazioni compilate in {percorso} ({os.path.getsize(percorso) / 1024:.0f} KiB)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
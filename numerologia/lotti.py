@@ -0,0 +1,316 @@
+"""
+Generazione in blocco dei report PDF su un pool di processi.
+
+Legge un CSV di persone (nome, cognome, data_nascita) o di coppie
+(nome1, cognome1, data_nascita1, nome2, cognome2, data_nascita2), con una
+colonna "id" facoltativa (altrimenti il numero di riga). I PDF vengono
+generati in parallelo e scritti man mano in volumi ZIP o in una cartella:
+il numero di lavori in corso è limitato, quindi la memoria resta costante
+qualunque sia la dimensione del lotto.
+
+Ogni volume ZIP chiuso (o PDF scritto in cartella) viene annotato in un
+giornale accanto all'output: rilanciando lo stesso comando dopo un crash
+si riprende dalle righe non ancora completate.
+
+Uso:
+    python -m numerologia.lotti persone.csv --zip report.zip --per-volume 5000
+    python -m numerologia.lotti coppie.csv --cartella report/ --processi 8
+"""
+
+import argparse
+import csv
+import json
+import os
+import re
+import sys
+import time
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime
+
+COLONNE_PERSONA = ("nome", "cognome", "data_nascita")
+COLONNE_COPPIA = ("nome1", "cognome1", "data_nascita1", "nome2", "cognome2", "data_nascita2")
+
+
+# --- LETTURA DEL CSV ---
+
+def tipo_lotto(intestazioni):
+    """"coppia" o "persona" in base alle colonne del CSV."""
+    intestazioni = set(intestazioni or ())
+    if set(COLONNE_COPPIA) <= intestazioni:
+        return "coppia"
+    if set(COLONNE_PERSONA) <= intestazioni:
+        return "persona"
+    raise ValueError(
+        f"Colonne mancanti: servono {', '.join(COLONNE_PERSONA)} oppure {', '.join(COLONNE_COPPIA)}."
+    )
+
+
+def leggi_righe(percorso):
+    """Restituisce (tipo, iteratore di (id, riga)) leggendo il CSV una riga alla volta."""
+    with open(percorso, newline="", encoding="utf-8-sig") as f:
+        tipo = tipo_lotto(csv.DictReader(f).fieldnames)
+
+    # Il file delle righe si apre solo alla prima lettura e si chiude con il generatore
+    def righe():
+        with open(percorso, newline="", encoding="utf-8-sig") as f:
+            for numero, riga in enumerate(csv.DictReader(f), start=1):
+                yield (riga.get("id") or "").strip() or str(numero), riga
+    return tipo, righe()
+
+
+def conta_righe(percorso):
+    with open(percorso, newline="", encoding="utf-8-sig") as f:
+        return max(sum(1 for _ in csv.reader(f)) - 1, 0)
+
+
+# --- LAVORO NEI PROCESSI ---
+
+def _inizializza_processo():
+    # Mappa una volta le metriche dei font e attiva la cache dei sottoinsiemi di glifi
+    from .font import archivio_metriche, attiva_cache_subset
+
+    archivio_metriche()
+    attiva_cache_subset()
+
+
+def _persona(riga, suffisso=""):
+    nome = (riga[f"nome{suffisso}"] or "").strip()
+    cognome = (riga[f"cognome{suffisso}"] or "").strip()
+    data = (riga[f"data_nascita{suffisso}"] or "").strip()
+    if not nome or not cognome:
+        raise ValueError(f"nome e cognome{suffisso and ' ' + suffisso} obbligatori")
+    try:
+        data_nascita = datetime.strptime(data, "%d/%m/%Y").date()
+    except ValueError:
+        raise ValueError(f"data di nascita non valida: {data!r} (usa GG/MM/AAAA)") from None
+    return {"nome": nome, "cognome": cognome, "data_nascita": data_nascita}
+
+
+def nome_file(identificativo, riga, tipo):
+    """Nome del PDF: id e cognomi, solo caratteri sicuri per file e ZIP."""
+    parti = [identificativo]
+    if tipo == "coppia":
+        parti += [riga.get("cognome1", ""), riga.get("cognome2", "")]
+    else:
+        parti += [riga.get("cognome", ""), riga.get("nome", "")]
+    base = "_".join(p.strip() for p in parti if p and p.strip())
+    return re.sub(r"[^\w.-]+", "-", base)[:120] + ".pdf"
+
+
+def genera_blocco(tipo, righe):
+    """Genera i PDF di un blocco di righe: [(id, nome file, byte del PDF o None, errore o None)]."""
+    from .impaginazione import pdf_coppia, pdf_persona
+
+    risultati = []
+    for identificativo, riga in righe:
+        try:
+            if tipo == "coppia":
+                contenuto = pdf_coppia(_persona(riga, "1"), _persona(riga, "2"))
+            else:
+                contenuto = pdf_persona(_persona(riga))
+            risultati.append((identificativo, nome_file(identificativo, riga, tipo), contenuto, None))
+        except Exception as e:
+            risultati.append((identificativo, None, None, str(e)))
+    return risultati
+
+
+# --- DESTINAZIONI ---
+
+class _Giornale:
+    """Giornale JSON-lines delle righe completate, per riprendere dopo un crash."""
+
+    def __init__(self, percorso):
+        self.percorso = percorso
+        self.completati = set()
+        self.volumi = 0
+        if os.path.exists(percorso):
+            with open(percorso, encoding="utf-8") as f:
+                for linea in f:
+                    try:
+                        voce = json.loads(linea)
+                    except ValueError:
+                        continue  # ultima riga troncata da un crash
+                    self.completati.update(voce.get("id", []))
+                    self.volumi = max(self.volumi, voce.get("volume_numero", 0))
+        self._file = open(percorso, "a", encoding="utf-8")
+
+    def annota(self, **voce):
+        self._file.write(json.dumps(voce, ensure_ascii=False) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def chiudi(self):
+        self._file.close()
+
+
+class DestinazioneZip:
+    """Volumi ZIP numerati (report-0001.zip, ...): un volume entra nel giornale quando è chiuso."""
+
+    def __init__(self, percorso, per_volume=5000):
+        self.base, estensione = os.path.splitext(percorso)
+        os.makedirs(os.path.dirname(os.path.abspath(percorso)), exist_ok=True)
+        self.estensione = estensione or ".zip"
+        self.per_volume = per_volume
+        self.giornale = _Giornale(self.base + ".giornale")
+        self.numero = self.giornale.volumi
+        self._zip = None
+        self._nomi = set()
+        self._id = []
+
+    @property
+    def completati(self):
+        return self.giornale.completati
+
+    def _apri(self):
+        self.numero += 1
+        # Un volume lasciato a metà da un crash viene riscritto da capo
+        self._percorso = f"{self.base}-{self.numero:04d}{self.estensione}"
+        # I PDF sono già compressi internamente: ZIP_STORED evita di ricomprimerli
+        self._zip = zipfile.ZipFile(self._percorso, "w", zipfile.ZIP_STORED)
+        self._nomi, self._id = set(), []
+
+    def scrivi(self, identificativo, nome, contenuto):
+        if self._zip is None:
+            self._apri()
+        if nome in self._nomi:
+            nome = f"{os.path.splitext(nome)[0]}-{len(self._id)}.pdf"
+        self._nomi.add(nome)
+        self._zip.writestr(nome, contenuto)
+        self._id.append(identificativo)
+        if self.per_volume and len(self._id) >= self.per_volume:
+            self._chiudi_volume()
+
+    def _chiudi_volume(self):
+        if self._zip is None:
+            return
+        self._zip.close()
+        self.giornale.annota(volume=os.path.basename(self._percorso), volume_numero=self.numero, id=self._id)
+        self.completati.update(self._id)
+        self._zip = None
+
+    def chiudi(self):
+        self._chiudi_volume()
+        self.giornale.chiudi()
+
+
+class DestinazioneCartella:
+    """Un PDF per file, scritto in modo atomico e annotato nel giornale."""
+
+    def __init__(self, percorso):
+        os.makedirs(percorso, exist_ok=True)
+        self.percorso = percorso
+        self.giornale = _Giornale(os.path.join(percorso, ".giornale"))
+
+    @property
+    def completati(self):
+        return self.giornale.completati
+
+    def scrivi(self, identificativo, nome, contenuto):
+        destinazione = os.path.join(self.percorso, nome)
+        temporaneo = destinazione + ".tmp"
+        with open(temporaneo, "wb") as f:
+            f.write(contenuto)
+        os.replace(temporaneo, destinazione)
+        self.giornale.annota(id=[identificativo], file=nome)
+        self.completati.add(identificativo)
+
+    def chiudi(self):
+        self.giornale.chiudi()
+
+
+# --- ESECUZIONE ---
+
+def _blocchi(righe, completati, dimensione):
+    blocco = []
+    for identificativo, riga in righe:
+        if identificativo in completati:
+            continue
+        blocco.append((identificativo, riga))
+        if len(blocco) == dimensione:
+            yield blocco
+            blocco = []
+    if blocco:
+        yield blocco
+
+
+def genera_lotto(percorso_csv, destinazione, processi=None, dimensione_blocco=16, in_volo=None, avanzamento=None):
+    """
+    Genera i PDF del CSV nella destinazione (DestinazioneZip o DestinazioneCartella).
+    Al più 'in_volo' blocchi sono in lavorazione o in attesa di scrittura.
+    avanzamento(fatti, errori, saltati) viene chiamata dopo ogni blocco.
+    Restituisce {"fatti", "errori", "saltati", "dettaglio_errori"}.
+    """
+    processi = processi or os.cpu_count() or 1
+    in_volo = in_volo or processi * 2
+    tipo, righe = leggi_righe(percorso_csv)
+    saltati = len(destinazione.completati)
+    stato = {"fatti": 0, "errori": 0, "saltati": saltati, "dettaglio_errori": []}
+
+    def raccogli(completati):
+        for futuro in completati:
+            for identificativo, nome, contenuto, errore in futuro.result():
+                if errore is None:
+                    destinazione.scrivi(identificativo, nome, contenuto)
+                    stato["fatti"] += 1
+                else:
+                    stato["errori"] += 1
+                    stato["dettaglio_errori"].append({"id": identificativo, "errore": errore})
+            if avanzamento:
+                avanzamento(stato["fatti"], stato["errori"], saltati)
+
+    try:
+        with ProcessPoolExecutor(max_workers=processi, initializer=_inizializza_processo) as pool:
+            in_corso = set()
+            for blocco in _blocchi(righe, destinazione.completati, dimensione_blocco):
+                if len(in_corso) >= in_volo:
+                    # Contropressione: non si legge altro CSV finché un blocco non è stato scritto
+                    completati, in_corso = wait(in_corso, return_when=FIRST_COMPLETED)
+                    raccogli(completati)
+                in_corso.add(pool.submit(genera_blocco, tipo, blocco))
+            while in_corso:
+                completati, in_corso = wait(in_corso, return_when=FIRST_COMPLETED)
+                raccogli(completati)
+    finally:
+        destinazione.chiudi()
+    return stato
+
+
+def _stampa_avanzamento(totale, inizio):
+    def stampa(fatti, errori, saltati):
+        trascorso = time.monotonic() - inizio
+        velocita = fatti / trascorso if trascorso else 0.0
+        rimanenti = max(totale - saltati - fatti - errori, 0)
+        eta = f"{rimanenti / velocita:.0f} s" if velocita else "?"
+        print(f"\r📄 {fatti + saltati}/{totale} PDF  errori {errori}  {velocita:.1f} PDF/s  fine tra {eta}   ",
+              end="", file=sys.stderr, flush=True)
+    return stampa
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Genera in blocco i report PDF da un CSV di persone o coppie.")
+    parser.add_argument("csv", help="CSV con nome,cognome,data_nascita oppure nome1,...,data_nascita2.")
+    uscita = parser.add_mutually_exclusive_group(required=True)
+    uscita.add_argument("--zip", help="Volumi ZIP di output (report.zip -> report-0001.zip, ...).")
+    uscita.add_argument("--cartella", help="Cartella di output, un PDF per riga.")
+    parser.add_argument("--per-volume", type=int, default=5000, help="PDF per volume ZIP (0 = un solo volume).")
+    parser.add_argument("--processi", type=int, default=None, help="Processi del pool (predefinito: CPU).")
+    parser.add_argument("--blocco", type=int, default=16, help="Righe per lavoro inviato a un processo.")
+    args = parser.parse_args(argv)
+
+    destinazione = DestinazioneZip(args.zip, args.per_volume) if args.zip else DestinazioneCartella(args.cartella)
+    totale = conta_righe(args.csv)
+    print(f"\n🖨️  Generazione di {totale} report ({len(destinazione.completati)} già completati)...\n")
+    inizio = time.monotonic()
+    stato = genera_lotto(args.csv, destinazione, args.processi, args.blocco,
+                         avanzamento=_stampa_avanzamento(totale, inizio))
+    print(file=sys.stderr)
+    for errore in stato["dettaglio_errori"][:20]:
+        print(f"⚠️  riga {errore['id']}: {errore['errore']}")
+    print(f"\n✅ {stato['fatti']} PDF generati in {time.monotonic() - inizio:.1f} s, "
+          f"{stato['errori']} errori, {stato['saltati']} già presenti.")
+    return 1 if stato["errori"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,402 @@
+"""
+Metriche e tracciamento di pagine, motore, report e chatbot.
+
+Con NUMEROLOGIA_METRICHE=1 ogni operazione strumentata registra in un
+istogramma per nome (es. "calcolo.profilo", "report.schema_energetico",
+"chatbot.modello") durata, chiamate ed errori, e le ultime operazioni
+finiscono in un registro circolare con l'operazione che le contiene.
+Senza la variabile d'ambiente tracciato() restituisce la funzione così
+com'è e misura() un contesto vuoto condiviso: nessun costo misurabile.
+
+Le metriche sono esportate in formato testo Prometheus, insieme alle
+statistiche di numerologia/cache.py:
+  - da un piccolo server HTTP in un thread (NUMEROLOGIA_METRICHE_PORTA,
+    avviato da avvia_esportatore() o da pagina());
+  - da GET /metrics dell'API (numerologia/api.py).
+
+pagina() strumenta il rerun di una pagina Streamlit e, per gli
+amministratori (?admin=<NUMEROLOGIA_ADMIN_TOKEN>), mostra in fondo il
+pannello di debug; con ?profilo=1 il rerun viene profilato con cProfile.
+
+Esempio:
+    @tracciato("calcolo.profilo")
+    def calcola(...):
+        ...
+
+    with misura("pdf.coppia"):
+        ...
+
+    with pagina("compatibilita_coppia"):
+        ...  # corpo della pagina
+"""
+
+import bisect
+import contextvars
+import cProfile
+import functools
+import hmac
+import io
+import os
+import pstats
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Limiti superiori (secondi) dei bucket degli istogrammi: dai calcoli da pochi
+# microsecondi del motore alle chiamate al modello linguistico
+LIMITI = (
+    0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+MAX_TRACCE = 500
+RIGHE_PROFILO = 40
+# Eccezioni con cui Streamlit interrompe uno script (st.stop, st.rerun): non sono errori
+_CONTROLLO_STREAMLIT = {"StopException", "RerunException"}
+
+_REGISTRO = {}
+_LOCK_REGISTRO = threading.Lock()
+_TRACCE = deque(maxlen=MAX_TRACCE)
+_CORRENTE = contextvars.ContextVar("numerologia_operazione", default=None)
+_LOCK_PROFILO = threading.Lock()
+
+
+def metriche_attive():
+    """True se la strumentazione è attiva (NUMEROLOGIA_METRICHE)."""
+    return os.environ.get("NUMEROLOGIA_METRICHE", "") not in ("", "0")
+
+
+ATTIVE = metriche_attive()
+
+
+# --- ISTOGRAMMI ---
+
+class Istogramma:
+    """Durate di un'operazione in bucket fissi, con chiamate, errori, somma e massimo."""
+
+    def __init__(self, nome):
+        self.nome = nome
+        self._lock = threading.Lock()
+        self.azzera()
+
+    def azzera(self):
+        with self._lock:
+            self.bucket = [0] * (len(LIMITI) + 1)  # l'ultimo è +Inf
+            self.chiamate = 0
+            self.errori = 0
+            self.somma = 0.0
+            self.massimo = 0.0
+
+    def registra(self, durata, errore=False):
+        indice = bisect.bisect_left(LIMITI, durata)
+        with self._lock:
+            self.bucket[indice] += 1
+            self.chiamate += 1
+            self.somma += durata
+            if durata > self.massimo:
+                self.massimo = durata
+            if errore:
+                self.errori += 1
+
+    def quantile(self, q):
+        """Stima del quantile q (0-1) per interpolazione lineare nel bucket, come histogram_quantile."""
+        if not self.chiamate:
+            return 0.0
+        obiettivo = q * self.chiamate
+        cumulato = 0
+        for indice, conteggio in enumerate(self.bucket):
+            if conteggio and cumulato + conteggio >= obiettivo:
+                inizio = LIMITI[indice - 1] if indice else 0.0
+                fine = LIMITI[indice] if indice < len(LIMITI) else self.massimo
+                return min(inizio + (fine - inizio) * (obiettivo - cumulato) / conteggio, self.massimo)
+            cumulato += conteggio
+        return self.massimo
+
+    def come_dict(self):
+        return {
+            "nome": self.nome,
+            "chiamate": self.chiamate,
+            "errori": self.errori,
+            "ms_medi": round(1000 * self.somma / self.chiamate, 3) if self.chiamate else 0.0,
+            "ms_p50": round(1000 * self.quantile(0.5), 3),
+            "ms_p95": round(1000 * self.quantile(0.95), 3),
+            "ms_p99": round(1000 * self.quantile(0.99), 3),
+            "ms_max": round(1000 * self.massimo, 3),
+            "s_totali": round(self.somma, 3),
+        }
+
+
+def istogramma(nome):
+    """Istogramma registrato con questo nome, creato se serve."""
+    risultato = _REGISTRO.get(nome)
+    if risultato is None:
+        with _LOCK_REGISTRO:
+            risultato = _REGISTRO.setdefault(nome, Istogramma(nome))
+    return risultato
+
+
+def registra(nome, durata, errore=False):
+    """Registra una durata (secondi) misurata altrove, es. da un processo figlio."""
+    istogramma(nome).registra(durata, errore)
+
+
+def report_metriche():
+    """Statistiche di tutte le operazioni, dalla più costosa in tempo totale."""
+    with _LOCK_REGISTRO:
+        voci = [istogramma.come_dict() for istogramma in _REGISTRO.values()]
+    return sorted(voci, key=lambda voce: voce["s_totali"], reverse=True)
+
+
+def tracce_recenti(n=100):
+    """Ultime n operazioni concluse, dalla più recente: [{"nome", "genitore", "inizio", "ms", "errore", "thread"}]."""
+    return [
+        {"nome": nome, "genitore": genitore, "inizio": time.strftime("%H:%M:%S", time.localtime(fine - durata)),
+         "ms": round(1000 * durata, 3), "errore": errore, "thread": thread}
+        for nome, genitore, fine, durata, errore, thread in list(_TRACCE)[-n:][::-1]
+    ]
+
+
+def azzera_metriche():
+    with _LOCK_REGISTRO:
+        for voce in _REGISTRO.values():
+            voce.azzera()
+    _TRACCE.clear()
+
+
+# --- STRUMENTAZIONE ---
+
+class _Operazione:
+    """Contesto che misura un'operazione e la registra, con l'operazione che la contiene."""
+
+    __slots__ = ("nome", "_istogramma", "_inizio", "_token")
+
+    def __init__(self, nome, istogramma_operazione=None):
+        self.nome = nome
+        self._istogramma = istogramma_operazione or istogramma(nome)
+
+    def __enter__(self):
+        self._token = _CORRENTE.set(self.nome)
+        self._inizio = time.perf_counter()
+        return self
+
+    def __exit__(self, tipo, valore, traccia):
+        durata = time.perf_counter() - self._inizio
+        _CORRENTE.reset(self._token)
+        errore = tipo is not None and tipo.__name__ not in _CONTROLLO_STREAMLIT
+        self._istogramma.registra(durata, errore)
+        # Tupla e non dict: il costo resta nell'ordine del microsecondo
+        _TRACCE.append((self.nome, _CORRENTE.get(), time.time(), durata,
+                        repr(valore) if errore else "", threading.current_thread().name))
+        return False
+
+
+class _Nullo:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, valore, traccia):
+        return False
+
+
+_NULLO = _Nullo()
+
+
+def misura(nome):
+    """Contesto che misura il blocco come operazione 'nome' (vuoto se le metriche sono spente)."""
+    return _Operazione(nome) if ATTIVE else _NULLO
+
+
+def tracciato(nome=None):
+    """
+    Decoratore: misura ogni chiamata come operazione 'nome' (predefinito
+    modulo.funzione). A metriche spente restituisce la funzione invariata.
+    """
+    def decoratore(funzione):
+        if not ATTIVE:
+            return funzione
+        operazione = nome or f"{funzione.__module__.rpartition('.')[2]}.{funzione.__qualname__}"
+        istogramma_operazione = istogramma(operazione)
+
+        @functools.wraps(funzione)
+        def avvolta(*args, **kwargs):
+            with _Operazione(operazione, istogramma_operazione):
+                return funzione(*args, **kwargs)
+        return avvolta
+    return decoratore
+
+
+# --- PROFILO DI UN RERUN ---
+
+class CatturaProfilo:
+    """
+    Contesto che profila il blocco con cProfile (solo il thread corrente).
+    Dopo l'uscita .testo contiene le RIGHE_PROFILO funzioni più costose
+    per tempo cumulato. Una cattura per volta: le altre restano vuote.
+    """
+
+    def __init__(self, righe=RIGHE_PROFILO):
+        self.righe = righe
+        self.testo = None
+        self._profilo = None
+
+    def __enter__(self):
+        if _LOCK_PROFILO.acquire(blocking=False):
+            self._profilo = cProfile.Profile()
+            self._profilo.enable()
+        else:
+            self.testo = "Un'altra cattura del profilo è in corso: riprova."
+        return self
+
+    def __exit__(self, tipo, valore, traccia):
+        if self._profilo is None:
+            return False
+        try:
+            self._profilo.disable()
+            uscita = io.StringIO()
+            pstats.Stats(self._profilo, stream=uscita).sort_stats("cumulative").print_stats(self.righe)
+            self.testo = uscita.getvalue()
+        finally:
+            self._profilo = None
+            _LOCK_PROFILO.release()
+        return False
+
+
+# --- ESPORTAZIONE PROMETHEUS ---
+
+def _etichetta(valore):
+    return str(valore).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _numero(valore):
+    return repr(float(valore)) if isinstance(valore, float) else str(valore)
+
+
+def testo_prometheus():
+    """Metriche e statistiche delle cache nel formato testo di Prometheus (0.0.4)."""
+    from .cache import report_cache
+
+    with _LOCK_REGISTRO:
+        istogrammi = sorted(_REGISTRO.values(), key=lambda voce: voce.nome)
+    righe = [
+        "# HELP numerologia_operazione_durata_secondi Durata delle operazioni strumentate.",
+        "# TYPE numerologia_operazione_durata_secondi histogram",
+    ]
+    errori = [
+        "# HELP numerologia_operazione_errori_totale Operazioni concluse con un'eccezione.",
+        "# TYPE numerologia_operazione_errori_totale counter",
+    ]
+    for voce in istogrammi:
+        with voce._lock:
+            bucket, chiamate, somma, errori_voce = list(voce.bucket), voce.chiamate, voce.somma, voce.errori
+        nome = _etichetta(voce.nome)
+        cumulato = 0
+        for limite, conteggio in zip((*LIMITI, "+Inf"), bucket):
+            cumulato += conteggio
+            righe.append(f'numerologia_operazione_durata_secondi_bucket{{operazione="{nome}",le="{limite}"}} {cumulato}')
+        righe.append(f'numerologia_operazione_durata_secondi_sum{{operazione="{nome}"}} {_numero(somma)}')
+        righe.append(f'numerologia_operazione_durata_secondi_count{{operazione="{nome}"}} {chiamate}')
+        errori.append(f'numerologia_operazione_errori_totale{{operazione="{nome}"}} {errori_voce}')
+    righe += errori
+
+    cache = report_cache()
+    for campo, tipo, descrizione in (
+        ("hit", "counter", "Letture trovate in cache."),
+        ("miss", "counter", "Letture non trovate in cache."),
+        ("espulsioni", "counter", "Voci espulse per far posto."),
+        ("scadenze", "counter", "Voci scadute per TTL."),
+        ("voci", "gauge", "Voci presenti."),
+        ("byte", "gauge", "Byte stimati delle voci presenti."),
+    ):
+        metrica = f"numerologia_cache_{campo}" + ("_totale" if tipo == "counter" else "")
+        righe += [f"# HELP {metrica} {descrizione}", f"# TYPE {metrica} {tipo}"]
+        righe += [f'{metrica}{{cache="{_etichetta(voce["nome"])}"}} {voce[campo]}' for voce in cache]
+    return "\n".join(righe) + "\n"
+
+
+class _GestoreMetriche(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?", 1)[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        corpo = testo_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def log_message(self, formato, *args):
+        pass  # niente log per ogni raccolta di Prometheus
+
+
+@functools.lru_cache(maxsize=None)
+def _esportatore(host, porta):
+    server = ThreadingHTTPServer((host, porta), _GestoreMetriche)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="esportatore-metriche", daemon=True).start()
+    return server
+
+
+def avvia_esportatore(porta=None, host=None):
+    """
+    Serve /metrics su host:porta (predefiniti NUMEROLOGIA_METRICHE_HOST,
+    127.0.0.1 e NUMEROLOGIA_METRICHE_PORTA) in un thread, una volta per
+    processo. None se la porta non è impostata o è già occupata.
+    """
+    porta = porta or os.environ.get("NUMEROLOGIA_METRICHE_PORTA")
+    if not porta:
+        return None
+    try:
+        return _esportatore(host or os.environ.get("NUMEROLOGIA_METRICHE_HOST", "127.0.0.1"), int(porta))
+    except OSError:
+        return None  # es. un'altra replica sullo stesso host ha già la porta
+
+
+# --- STREAMLIT ---
+
+def amministratore(parametri):
+    """True se i parametri della query contengono admin=<NUMEROLOGIA_ADMIN_TOKEN>."""
+    atteso = os.environ.get("NUMEROLOGIA_ADMIN_TOKEN", "")
+    return bool(atteso) and hmac.compare_digest(str(parametri.get("admin", "")), atteso)
+
+
+def pannello_debug(profilo=None):
+    """Pannello Streamlit con operazioni, cache, ultime tracce e l'eventuale profilo del rerun."""
+    import streamlit as st
+
+    from .cache import report_cache
+
+    with st.expander("🛠️ Debug: metriche del processo"):
+        if not ATTIVE:
+            st.warning("Strumentazione spenta: avvia con NUMEROLOGIA_METRICHE=1.")
+        st.write("**Operazioni**")
+        st.dataframe(report_metriche(), hide_index=True, width="stretch")
+        st.write("**Cache**")
+        st.dataframe(report_cache(), hide_index=True, width="stretch")
+        st.write("**Ultime operazioni**")
+        st.dataframe(tracce_recenti(), hide_index=True, width="stretch")
+        if profilo is not None and profilo.testo:
+            st.write("**Profilo di questo rerun (cProfile)**")
+            st.code(profilo.testo, language="text")
+        else:
+            st.caption("Aggiungi &profilo=1 all'indirizzo per profilare un rerun con cProfile.")
+
+
+@contextmanager
+def pagina(nome):
+    """
+    Strumenta il rerun di una pagina come operazione "pagina.<nome>". Per gli
+    amministratori profila il rerun con ?profilo=1 e mostra il pannello di debug.
+    """
+    import streamlit as st
+
+    avvia_esportatore()
+    admin = amministratore(st.query_params)
+    cattura = CatturaProfilo() if admin and st.query_params.get("profilo") == "1" else None
+    with misura(f"pagina.{nome}"), (cattura or _NULLO):
+        yield
+    if admin:
+        pannello_debug(cattura)
@@ -0,0 +1,298 @@
+"""
+Motore numerologico batch.
+
+Calcola i numeri core e dinamici di intere colonne di persone con una sola
+chiamata vettoriale (NumPy). Riga per riga i risultati coincidono con
+calcola_numeri_compatibilita_persona di numerologia/calcolo.py.
+
+Esempio:
+    colonne = calcola_profili(["Mario"], ["Rossi"], ["01/02/1990"])
+    colonne["sentiero_di_vita"]  # -> array([4], dtype=uint8)
+"""
+
+import csv
+import os
+from datetime import datetime
+from functools import lru_cache
+
+import numpy as np
+
+from .calcolo import valori_carattere
+from .metriche import tracciato
+
+# --- COLONNE PRODOTTE DAL MOTORE ---
+
+COLONNE_CORE = (
+    "sentiero_di_vita", "espressione", "anima", "personalita", "forza", "quintessenza"
+)
+COLONNE_CICLI = ("ciclo_esperienza", "ciclo_potere", "ciclo_saggezza")
+COLONNE_PINNACOLI = ("p1", "p2", "p3", "p4")
+COLONNE_SFIDE = ("s1", "s2", "s3", "s4")
+COLONNE_ETA = ("fine_p1", "fine_p2", "fine_p3")
+COLONNE = COLONNE_CORE + COLONNE_CICLI + COLONNE_PINNACOLI + COLONNE_SFIDE + COLONNE_ETA
+
+# Righe elaborate insieme: limita la memoria dei blocchi di codepoint
+# (righe x lunghezza massima del nome x 4 byte) e delle letture da file.
+DIMENSIONE_BLOCCO = 65536
+
+# Tutti i caratteri che .upper() o la piegatura degli accenti trasformano in
+# lettere della tabella Pitagorica stanno nel piano multilingue di base:
+# oltre questo limite il valore è 0.
+_LIMITE_CODEPOINT = 0x10000
+
+
+# --- TABELLE DI LOOKUP PER CODEPOINT ---
+
+@lru_cache(maxsize=None)
+def _tabelle_codepoint():
+    """Restituisce (totale, vocali) per ogni codepoint, con le stesse regole di analizza_nome_base."""
+    valori = np.array([valori_carattere(chr(cp)) for cp in range(_LIMITE_CODEPOINT)], dtype=np.uint8)
+    return np.ascontiguousarray(valori[:, 0]), np.ascontiguousarray(valori[:, 1])
+
+
+# --- KERNEL VETTORIALI ---
+
+def riduci(n):
+    """Versione vettoriale di riduci_fino_1_singolo (0 resta 0)."""
+    n = np.asarray(n, dtype=np.int64)
+    return np.where(n > 0, 1 + (n - 1) % 9, n)
+
+
+def somma_cifre(n):
+    """Somma delle cifre decimali di ogni elemento (interi non negativi)."""
+    n = np.array(n, dtype=np.int64)
+    somma = np.zeros_like(n)
+    while np.any(n):
+        somma += n % 10
+        n //= 10
+    return somma
+
+
+def analizza_nomi(nomi):
+    """Versione vettoriale di analizza_nome_base: restituisce (totale, vocali, consonanti)."""
+    arr = np.asarray(nomi, dtype=str).reshape(-1)
+    totale = np.zeros(arr.shape[0], dtype=np.int64)
+    vocali = np.zeros(arr.shape[0], dtype=np.int64)
+    if arr.size and arr.dtype.itemsize:
+        tab_totale, tab_vocali = _tabelle_codepoint()
+        # Ogni stringa diventa una riga di codepoint (padding con 0, che vale 0)
+        codepoint = np.ascontiguousarray(arr).view(np.uint32).reshape(arr.shape[0], -1)
+        indici = np.minimum(codepoint, _LIMITE_CODEPOINT - 1)
+        tab_totale[indici].sum(axis=1, dtype=np.int64, out=totale)
+        tab_vocali[indici].sum(axis=1, dtype=np.int64, out=vocali)
+    return totale, vocali, totale - vocali
+
+
+# --- DATE DI NASCITA ---
+
+def _componi_datetime64(giorni, mesi, anni):
+    """Ricostruisce le date dai componenti (per verificarne la validità)."""
+    inizio_mese = (anni - 1970).astype("datetime64[Y]") + (mesi - 1).astype("timedelta64[M]")
+    return inizio_mese.astype("datetime64[D]") + (giorni - 1).astype("timedelta64[D]")
+
+
+def _scomponi_datetime64(date_d):
+    """Restituisce (giorni, mesi, anni) da un array datetime64[D]."""
+    if np.isnat(date_d).any():
+        raise ValueError("Date di nascita mancanti o non valide.")
+    inizio_mese = date_d.astype("datetime64[M]")
+    anni = date_d.astype("datetime64[Y]").astype(np.int64) + 1970
+    mesi = inizio_mese.astype(np.int64) % 12 + 1
+    giorni = (date_d - inizio_mese.astype("datetime64[D]")).astype(np.int64) + 1
+    return giorni, mesi, anni
+
+
+def _scomponi_stringhe(arr):
+    """Scompone stringhe GG/MM/AAAA (formato delle pagine) o ISO AAAA-MM-GG."""
+    arr = np.char.strip(arr)
+    if arr.size and arr.dtype.itemsize == 40:
+        # Percorso veloce: tutte le stringhe sono esattamente "GG/MM/AAAA"
+        cifre = np.ascontiguousarray(arr).view(np.uint32).reshape(-1, 10).astype(np.int64) - ord("0")
+        numeriche = cifre[:, [0, 1, 3, 4, 6, 7, 8, 9]]
+        if (cifre[:, [2, 5]] == ord("/") - ord("0")).all() and ((numeriche >= 0) & (numeriche <= 9)).all():
+            giorni = cifre[:, 0] * 10 + cifre[:, 1]
+            mesi = cifre[:, 3] * 10 + cifre[:, 4]
+            anni = cifre[:, 6] * 1000 + cifre[:, 7] * 100 + cifre[:, 8] * 10 + cifre[:, 9]
+            valide = (mesi >= 1) & (mesi <= 12) & (giorni >= 1)
+            if valide.all():
+                valide = _scomponi_datetime64(_componi_datetime64(giorni, mesi, anni))[0] == giorni
+            if not valide.all():
+                riga = int(np.flatnonzero(~valide)[0])
+                raise ValueError(f"Data non valida alla riga {riga}: {str(arr[riga])!r}")
+            return giorni, mesi, anni
+    if arr.size and (np.char.count(arr, "/") == 2).all():
+        date_obj = [datetime.strptime(s, "%d/%m/%Y").date() for s in arr.tolist()]
+        return _scomponi_datetime64(np.array(date_obj, dtype="datetime64[D]"))
+    return _scomponi_datetime64(arr.astype("datetime64[D]"))
+
+
+def scomponi_date(date_nascita):
+    """
+    Restituisce (giorni, mesi, anni) come array int64.
+    Accetta datetime64, oggetti date/datetime o stringhe GG/MM/AAAA o AAAA-MM-GG.
+    """
+    arr = np.asarray(date_nascita).reshape(-1)
+    if arr.size == 0:
+        vuoto = np.zeros(0, dtype=np.int64)
+        return vuoto, vuoto.copy(), vuoto.copy()
+    if arr.dtype.kind == "S":
+        arr = np.char.decode(arr, "utf-8")
+    elif arr.dtype.kind == "O" and isinstance(arr[0], str):
+        arr = arr.astype(str)
+    if arr.dtype.kind == "U":
+        return _scomponi_stringhe(arr)
+    return _scomponi_datetime64(arr.astype("datetime64[D]"))
+
+
+# --- CALCOLO DEI PROFILI ---
+
+def calcola_profili_componenti(nomi, cognomi, giorni, mesi, anni, dimensione_blocco=DIMENSIONE_BLOCCO):
+    """
+    Calcola tutte le colonne di COLONNE partendo da giorno, mese e anno già separati.
+    Stesse formule di calcola_numeri_compatibilita_persona, su array.
+    """
+    giorni = np.asarray(giorni, dtype=np.int64).reshape(-1)
+    mesi = np.asarray(mesi, dtype=np.int64).reshape(-1)
+    anni = np.asarray(anni, dtype=np.int64).reshape(-1)
+    n = giorni.shape[0]
+    if len(nomi) != n or len(cognomi) != n or mesi.shape[0] != n or anni.shape[0] != n:
+        raise ValueError("Le colonne di input devono avere tutte la stessa lunghezza.")
+
+    # Analisi Nome e Cognome, a blocchi per contenere la memoria
+    totale = np.empty(n, dtype=np.int64)
+    vocali = np.empty(n, dtype=np.int64)
+    for inizio in range(0, n, dimensione_blocco):
+        fine = min(inizio + dimensione_blocco, n)
+        tot_n, voc_n, _ = analizza_nomi(nomi[inizio:fine])
+        tot_c, voc_c, _ = analizza_nomi(cognomi[inizio:fine])
+        totale[inizio:fine] = tot_n + tot_c
+        vocali[inizio:fine] = voc_n + voc_c
+    consonanti = totale - vocali
+
+    # Sentiero di Vita
+    giorno_ridotto = riduci(giorni)
+    mese_ridotto = riduci(mesi)
+    anno_somma_cifre = somma_cifre(anni)
+    anno_ridotto_sv = riduci(anno_somma_cifre)
+    sentiero_di_vita_base = giorno_ridotto + mese_ridotto + anno_somma_cifre
+    sentiero_di_vita = riduci(sentiero_di_vita_base)
+
+    # Pinnacoli e Sfide
+    p1 = riduci(giorno_ridotto + mese_ridotto)
+    p2 = riduci(giorno_ridotto + anno_ridotto_sv)
+    s1 = riduci(np.abs(giorno_ridotto - mese_ridotto))
+    s2 = riduci(np.abs(anno_ridotto_sv - giorno_ridotto))
+    fine_exp = 36 - sentiero_di_vita
+
+    numeri = {
+        "sentiero_di_vita": sentiero_di_vita,
+        "espressione": riduci(totale),
+        "anima": riduci(vocali),
+        "personalita": riduci(consonanti),
+        "forza": riduci(giorni + mesi),
+        "quintessenza": riduci(totale + sentiero_di_vita_base),
+        "ciclo_esperienza": mese_ridotto,
+        "ciclo_potere": giorno_ridotto,
+        "ciclo_saggezza": anno_ridotto_sv,
+        "p1": p1,
+        "p2": p2,
+        "p3": riduci(p1 + p2),
+        "p4": riduci(mese_ridotto + anno_ridotto_sv),
+        "s1": s1,
+        "s2": s2,
+        "s3": riduci(np.abs(s1 - s2)),
+        "s4": riduci(np.abs(anno_ridotto_sv - mese_ridotto)),
+    }
+    colonne = {nome: valori.astype(np.uint8) for nome, valori in numeri.items()}
+    colonne["fine_p1"] = fine_exp.astype(np.int16)
+    colonne["fine_p2"] = (fine_exp + 9).astype(np.int16)
+    colonne["fine_p3"] = (fine_exp + 18).astype(np.int16)
+    return colonne
+
+
+@tracciato("motore.calcola_profili")
+def calcola_profili(nomi, cognomi, date_nascita, dimensione_blocco=DIMENSIONE_BLOCCO):
+    """
+    Calcola i profili numerologici di intere colonne di persone.
+    Restituisce un dict colonna -> array NumPy (uint8 per i numeri, int16 per le età).
+    """
+    giorni, mesi, anni = scomponi_date(date_nascita)
+    return calcola_profili_componenti(nomi, cognomi, giorni, mesi, anni, dimensione_blocco)
+
+
+def _profilo_da_riga(valori):
+    """Dict di calcola_numeri_compatibilita_persona da un dict colonna -> int."""
+    return {
+        "core": {nome: valori[nome] for nome in COLONNE_CORE},
+        "dinamici": {
+            "cicli": {
+                "esperienza": valori["ciclo_esperienza"],
+                "potere": valori["ciclo_potere"],
+                "saggezza": valori["ciclo_saggezza"]
+            },
+            "pinnacoli": {nome: valori[nome] for nome in COLONNE_PINNACOLI},
+            "sfide": {nome: valori[nome] for nome in COLONNE_SFIDE},
+            "eta_pinnacoli": {nome: valori[nome] for nome in COLONNE_ETA}
+        }
+    }
+
+
+def profilo_da_colonne(colonne, i):
+    """Ricostruisce, per la riga i, il dict di calcola_numeri_compatibilita_persona."""
+    return _profilo_da_riga({nome: int(colonne[nome][i]) for nome in COLONNE})
+
+
+def profili_da_colonne(colonne):
+    """Come profilo_da_colonne per tutte le righe: converte ogni colonna in lista una sola volta."""
+    liste = [colonne[nome].tolist() for nome in COLONNE]
+    return [_profilo_da_riga(dict(zip(COLONNE, riga))) for riga in zip(*liste)]
+
+
+# --- INPUT DA FILE (CSV / PARQUET) ---
+
+def itera_blocchi_file(percorso, colonna_nome="nome", colonna_cognome="cognome",
+                       colonna_data="data_nascita", dimensione_blocco=DIMENSIONE_BLOCCO):
+    """
+    Legge un file CSV o Parquet a blocchi, senza caricarlo tutto in memoria.
+    Produce tuple (nomi, cognomi, date_nascita) di array NumPy.
+    """
+    estensione = os.path.splitext(percorso)[1].lower()
+    if estensione == ".parquet":
+        try:
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("Per leggere file Parquet installa 'pyarrow'.") from e
+        colonne = [colonna_nome, colonna_cognome, colonna_data]
+        for batch in pq.ParquetFile(percorso).iter_batches(batch_size=dimensione_blocco, columns=colonne):
+            yield tuple(batch.column(c).to_numpy(zero_copy_only=False) for c in colonne)
+        return
+
+    with open(percorso, newline="", encoding="utf-8-sig") as f:
+        reader = csv.DictReader(f)
+        mancanti = {colonna_nome, colonna_cognome, colonna_data} - set(reader.fieldnames or ())
+        if mancanti:
+            raise ValueError(f"Colonne mancanti nel file {percorso}: {', '.join(sorted(mancanti))}")
+        nomi, cognomi, date = [], [], []
+        for riga in reader:
+            nomi.append(riga[colonna_nome].strip())
+            cognomi.append(riga[colonna_cognome].strip())
+            date.append(riga[colonna_data].strip())
+            if len(nomi) == dimensione_blocco:
+                yield np.array(nomi), np.array(cognomi), np.array(date)
+                nomi, cognomi, date = [], [], []
+        if nomi:
+            yield np.array(nomi), np.array(cognomi), np.array(date)
+
+
+def calcola_profili_da_file(percorso, colonna_nome="nome", colonna_cognome="cognome",
+                            colonna_data="data_nascita", dimensione_blocco=DIMENSIONE_BLOCCO):
+    """Come calcola_profili, leggendo le colonne da un file CSV o Parquet."""
+    blocchi = [
+        calcola_profili(nomi, cognomi, date, dimensione_blocco)
+        for nomi, cognomi, date in itera_blocchi_file(
+            percorso, colonna_nome, colonna_cognome, colonna_data, dimensione_blocco
+        )
+    ]
+    if not blocchi:
+        return calcola_profili([], [], [])
+    return {nome: np.concatenate([b[nome] for b in blocchi]) for nome in COLONNE}
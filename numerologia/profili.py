@@ -0,0 +1,127 @@
+"""
+Archivio dei profili numerologici condiviso fra le pagine.
+
+Un profilo (il dict di calcola_numeri_compatibilita_persona) viene
+calcolato una volta per (nome, cognome, data di nascita) normalizzati e
+cercato in due livelli:
+
+    1. la sessione (st.session_state), per chi passa da una pagina all'altra;
+    2. una CacheLRU del processo con scadenza, condivisa da tutte le sessioni.
+
+La sessione ricorda anche l'ultima persona inserita, così le altre pagine
+possono precompilare i campi invece di chiederli di nuovo. Hit e miss dei
+due livelli compaiono in report_cache() di numerologia/cache.py.
+
+I profili restituiti sono condivisi: vanno letti, non modificati.
+
+Esempio:
+    numeri = profilo("Maria", "Rossi", date(1990, 2, 1))
+    persona_corrente()  # -> {"nome": "Maria", "cognome": "Rossi", "data_nascita": date(1990, 2, 1)}
+"""
+
+import threading
+import unicodedata
+from collections import OrderedDict
+from datetime import date, datetime
+
+from .cache import CacheLRU, statistiche_cache
+from .calcolo import calcola_numeri_compatibilita_persona
+
+MAX_PROFILI_PROCESSO = 50_000
+TTL_PROCESSO = 6 * 3600          # secondi
+MAX_PROFILI_SESSIONE = 32
+CHIAVE_SESSIONE = "_numerologia_profili"
+CHIAVE_PERSONA = "_numerologia_persona"
+
+_PROCESSO = CacheLRU("numerologia.profili.processo", max_voci=MAX_PROFILI_PROCESSO, ttl=TTL_PROCESSO)
+_SESSIONE = statistiche_cache("numerologia.profili.sessione")
+_LOCK_SESSIONE = threading.Lock()
+
+
+def _stato_sessione(stato):
+    if stato is not None:
+        return stato
+    try:
+        import streamlit as st
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+    except ImportError:
+        return None
+    return st.session_state if get_script_run_ctx(suppress_warning=True) is not None else None
+
+
+def _testo(valore):
+    return " ".join(unicodedata.normalize("NFC", valore).split()).casefold()
+
+
+def _data(valore):
+    if isinstance(valore, datetime):
+        return valore.date()
+    if isinstance(valore, date):
+        return valore
+    return datetime.strptime(valore.strip(), "%d/%m/%Y").date()
+
+
+def chiave_profilo(nome, cognome, data_nascita):
+    """(nome, cognome, data ISO) normalizzati: maiuscole, spazi e composizione Unicode non contano."""
+    return _testo(nome), _testo(cognome), _data(data_nascita).isoformat()
+
+
+def profilo(nome, cognome, data_nascita, stato=None):
+    """
+    Profilo di una persona (data_nascita: date o "GG/MM/AAAA"), dalla sessione,
+    dalla cache del processo o calcolato. 'stato' sostituisce st.session_state.
+    """
+    data_nascita = _data(data_nascita)
+    chiave = chiave_profilo(nome, cognome, data_nascita)
+    stato = _stato_sessione(stato)
+
+    if stato is not None:
+        with _LOCK_SESSIONE:
+            profili = stato.get(CHIAVE_SESSIONE)
+            if profili is None:
+                profili = stato[CHIAVE_SESSIONE] = OrderedDict()
+            risultato = profili.get(chiave)
+            if risultato is not None:
+                profili.move_to_end(chiave)
+                _SESSIONE.hit += 1
+            else:
+                _SESSIONE.miss += 1
+        if risultato is not None:
+            return risultato
+
+    risultato = _PROCESSO.ottieni_o_calcola(chiave, lambda: calcola_numeri_compatibilita_persona(
+        nome.strip(), cognome.strip(), data_nascita.day, data_nascita.month, data_nascita.year))
+
+    if stato is not None:
+        with _LOCK_SESSIONE:
+            profili[chiave] = risultato
+            if len(profili) > MAX_PROFILI_SESSIONE:
+                profili.popitem(last=False)
+                _SESSIONE.espulsioni += 1
+    return risultato
+
+
+# --- PERSONA CORRENTE DELLA SESSIONE ---
+
+def imposta_persona_corrente(nome, cognome, data_nascita, stato=None):
+    """Ricorda l'ultima persona inserita nella sessione."""
+    stato = _stato_sessione(stato)
+    if stato is not None:
+        stato[CHIAVE_PERSONA] = {"nome": nome.strip(), "cognome": cognome.strip(), "data_nascita": _data(data_nascita)}
+
+
+def persona_corrente(stato=None):
+    """L'ultima persona inserita nella sessione, o None."""
+    stato = _stato_sessione(stato)
+    return None if stato is None else stato.get(CHIAVE_PERSONA)
+
+
+def profilo_persona_corrente(stato=None):
+    """Profilo dell'ultima persona inserita nella sessione, o None."""
+    persona = persona_corrente(stato)
+    return None if persona is None else profilo(persona["nome"], persona["cognome"], persona["data_nascita"], stato)
+
+
+def statistiche_profili():
+    """Hit e miss dei due livelli: {"sessione": {...}, "processo": {...}}."""
+    return {"sessione": _SESSIONE.come_dict(), "processo": _PROCESSO.statistiche.come_dict()}
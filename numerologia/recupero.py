@@ -0,0 +1,351 @@
+"""
+Recupero dei testi per il chatbot: cache degli embedding e indice vettoriale.
+
+Indicizza in una collezione chromadb persistente i frammenti della base di
+conoscenza (numerologia/conoscenza.py) e i testi di compatibilità
+dell'archivio delle interpretazioni. Gli embedding vengono salvati in una
+cache SQLite per (modello, hash del testo): un testo già visto non viene
+mai ricalcolato, neppure se cambia id o dopo aver cancellato la collezione.
+
+La sincronizzazione è incrementale: aggiunge i documenti nuovi, aggiorna
+quelli con hash diverso e cancella quelli spariti, senza ricostruire
+l'indice. Modello e collezione vengono caricati una volta per processo e
+condivisi da tutte le sessioni di Streamlit.
+
+Esempio:
+    sincronizza(documenti_predefiniti())   # al deploy o al primo avvio
+    cerca("significato del numero 7", n=5)
+
+Uso da riga di comando (prima del deploy):
+    python -m numerologia.recupero --archivio archivio_kb
+"""
+
+import argparse
+import functools
+import hashlib
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+import numpy as np
+
+from .cache import CacheLRU
+from .metriche import tracciato
+
+NOME_MODELLO = os.environ.get("NUMEROLOGIA_MODELLO_EMBEDDING", "paraphrase-multilingual-MiniLM-L12-v2")
+CARTELLA_INDICE = os.environ.get("NUMEROLOGIA_INDICE_KB", "indice_kb")
+NOME_COLLEZIONE = "numerologia"
+FILE_CACHE = "embedding.sqlite"
+DIMENSIONE_LOTTO = 512       # documenti per passo di sincronizzazione
+LOTTO_MODELLO = 64           # batch_size passato a SentenceTransformer.encode
+_VARIABILI_SQL = 500         # segnaposto per query IN (...)
+
+_LOCK = threading.Lock()
+_DOMANDE = CacheLRU("numerologia.recupero.domande", max_voci=1024)
+
+
+class RecuperoNonDisponibile(Exception):
+    """chromadb o sentence-transformers non sono installati."""
+
+
+def hash_testo(testo):
+    return hashlib.sha256(testo.encode("utf-8")).hexdigest()
+
+
+# --- RISORSE PER PROCESSO ---
+
+@functools.lru_cache(maxsize=None)
+def _modello(nome):
+    try:
+        from sentence_transformers import SentenceTransformer
+    except ImportError as e:
+        raise RecuperoNonDisponibile("Installa sentence-transformers per il recupero dei testi.") from e
+    return SentenceTransformer(nome)
+
+
+def modello(nome=NOME_MODELLO):
+    """Modello di embedding, caricato una volta per processo."""
+    with _LOCK:
+        return _modello(nome)
+
+
+@functools.lru_cache(maxsize=None)
+def _collezione(cartella, nome):
+    try:
+        # Streamlit Cloud ha un sqlite3 troppo vecchio per chromadb
+        import pysqlite3
+        sys.modules["sqlite3"] = pysqlite3
+    except ImportError:
+        pass
+    try:
+        import chromadb
+    except ImportError as e:
+        raise RecuperoNonDisponibile("Installa chromadb per l'indice vettoriale.") from e
+    client = chromadb.PersistentClient(path=cartella)
+    return client.get_or_create_collection(nome, metadata={"hnsw:space": "cosine"})
+
+
+def collezione(cartella=CARTELLA_INDICE, nome=NOME_COLLEZIONE):
+    """Collezione chromadb persistente, aperta una volta per processo."""
+    with _LOCK:
+        return _collezione(os.path.abspath(cartella), nome)
+
+
+@functools.lru_cache(maxsize=None)
+def _cache_embedding(percorso, nome_modello):
+    return CacheEmbedding(percorso, nome_modello)
+
+
+def cache_embedding(cartella=CARTELLA_INDICE, nome_modello=NOME_MODELLO):
+    with _LOCK:
+        return _cache_embedding(os.path.abspath(os.path.join(cartella, FILE_CACHE)), nome_modello)
+
+
+# --- CACHE DEGLI EMBEDDING ---
+
+class CacheEmbedding:
+    """Embedding float32 normalizzati in SQLite, per (modello, hash del testo)."""
+
+    def __init__(self, percorso, nome_modello=NOME_MODELLO):
+        os.makedirs(os.path.dirname(percorso) or ".", exist_ok=True)
+        self.nome_modello = nome_modello
+        self.calcolati = 0
+        self.riusati = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(percorso, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS embedding ("
+            " modello TEXT NOT NULL, hash TEXT NOT NULL, vettore BLOB NOT NULL,"
+            " PRIMARY KEY (modello, hash)) WITHOUT ROWID"
+        )
+
+    def _leggi(self, hash_testi):
+        trovati = {}
+        with self._lock:
+            for i in range(0, len(hash_testi), _VARIABILI_SQL):
+                parte = hash_testi[i:i + _VARIABILI_SQL]
+                righe = self._db.execute(
+                    f"SELECT hash, vettore FROM embedding WHERE modello = ? AND hash IN ({','.join('?' * len(parte))})",
+                    (self.nome_modello, *parte),
+                )
+                for hash_, vettore in righe:
+                    trovati[hash_] = np.frombuffer(vettore, dtype=np.float32)
+        return trovati
+
+    def _scrivi(self, hash_testi, vettori):
+        with self._lock, self._db:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO embedding (modello, hash, vettore) VALUES (?, ?, ?)",
+                [(self.nome_modello, h, v.astype(np.float32).tobytes()) for h, v in zip(hash_testi, vettori)],
+            )
+
+    def vettori(self, testi, hash_testi=None):
+        """
+        Matrice (len(testi), dimensione) degli embedding: quelli mancanti vengono
+        calcolati in un unico encode a lotti e salvati.
+        """
+        hash_testi = hash_testi or [hash_testo(t) for t in testi]
+        trovati = self._leggi(list(dict.fromkeys(hash_testi)))
+        mancanti = {}
+        for testo, h in zip(testi, hash_testi):
+            if h not in trovati:
+                mancanti.setdefault(h, testo)
+        if mancanti:
+            calcolati = modello(self.nome_modello).encode(
+                list(mancanti.values()), batch_size=LOTTO_MODELLO,
+                normalize_embeddings=True, convert_to_numpy=True, show_progress_bar=False,
+            )
+            self._scrivi(list(mancanti), calcolati)
+            trovati.update(zip(mancanti, calcolati))
+        self.calcolati += len(mancanti)
+        self.riusati += len(hash_testi) - len(mancanti)
+        return np.vstack([trovati[h] for h in hash_testi]) if hash_testi else np.empty((0, 0), np.float32)
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM embedding WHERE modello = ?",
+                                    (self.nome_modello,)).fetchone()[0]
+
+
+# --- DOCUMENTI ---
+
+def documenti_conoscenza(percorso_archivio):
+    """Frammenti della base di conoscenza come (id, testo, metadati con hash)."""
+    from .conoscenza import ArchivioConoscenza
+
+    for frammento in ArchivioConoscenza(percorso_archivio).frammenti():
+        inizio, fine = frammento["pagine"]
+        yield frammento["id"], frammento["testo"], {
+            "hash": frammento["hash"], "fonte": "libro", "file": frammento["file"],
+            "pagina_inizio": inizio, "pagina_fine": fine,
+        }
+
+
+def documenti_interpretazioni():
+    """Testi delle mappe di compatibilità (coppie e "default") come (id, testo, metadati con hash)."""
+    from .compatibilita import MAPPE_COMPATIBILITA
+
+    for categoria, mappa in MAPPE_COMPATIBILITA.items():
+        for chiave, testo in mappa.items():
+            coppia = "default" if chiave == "default" else f"{chiave[0]}-{chiave[1]}"
+            yield f"interpretazione-{categoria}-{coppia}", testo, {
+                "hash": hash_testo(testo), "fonte": "interpretazione", "categoria": categoria, "coppia": coppia,
+            }
+
+
+def fonti_predefinite(percorso_archivio=None):
+    """Fonti elencate da documenti_predefiniti: "libro" solo se l'archivio esiste."""
+    if percorso_archivio and os.path.isdir(percorso_archivio):
+        return {"interpretazione", "libro"}
+    return {"interpretazione"}
+
+
+def documenti_predefiniti(percorso_archivio=None):
+    """Interpretazioni più, se l'archivio esiste, i frammenti della base di conoscenza."""
+    yield from documenti_interpretazioni()
+    if "libro" in fonti_predefinite(percorso_archivio):
+        yield from documenti_conoscenza(percorso_archivio)
+
+
+# --- SINCRONIZZAZIONE ---
+
+def _hash_indicizzati(raccolta, lotto=5000):
+    """id -> (hash, fonte) dei documenti già nella collezione, letti a pagine."""
+    esistenti = {}
+    inizio = 0
+    while True:
+        pagina = raccolta.get(include=["metadatas"], limit=lotto, offset=inizio)
+        for id_, metadati in zip(pagina["ids"], pagina["metadatas"]):
+            metadati = metadati or {}
+            esistenti[id_] = (metadati.get("hash"), metadati.get("fonte"))
+        if len(pagina["ids"]) < lotto:
+            return esistenti
+        inizio += lotto
+
+
+def _lotti(iterabile, dimensione):
+    lotto = []
+    for elemento in iterabile:
+        lotto.append(elemento)
+        if len(lotto) == dimensione:
+            yield lotto
+            lotto = []
+    if lotto:
+        yield lotto
+
+
+def sincronizza(documenti, raccolta=None, cache=None, dimensione_lotto=DIMENSIONE_LOTTO, fonti=None):
+    """
+    Porta la collezione allo stato dei documenti (id, testo, metadati con "hash"):
+    aggiunge i nuovi, aggiorna quelli con hash cambiato, cancella quelli assenti.
+    Si cancellano solo documenti delle 'fonti' elencate (predefinito: le fonti
+    dei documenti ricevuti), così una fonte non disponibile, es. un archivio
+    mancante, non svuota la sua parte di indice.
+    Restituisce {"aggiunti", "aggiornati", "cancellati", "invariati", "calcolati", "riusati"}.
+    """
+    raccolta = raccolta if raccolta is not None else collezione()
+    cache = cache if cache is not None else cache_embedding()
+    calcolati, riusati = cache.calcolati, cache.riusati
+    esistenti = _hash_indicizzati(raccolta)
+    stato = {"aggiunti": 0, "aggiornati": 0, "cancellati": 0, "invariati": 0}
+    visti = set()
+    fonti_viste = set()
+
+    for lotto in _lotti(documenti, dimensione_lotto):
+        da_scrivere = []
+        for id_, testo, metadati in lotto:
+            if id_ in visti:
+                raise ValueError(f"id duplicato: {id_}")
+            visti.add(id_)
+            fonti_viste.add(metadati.get("fonte"))
+            if esistenti.get(id_, (None,))[0] == metadati["hash"]:
+                stato["invariati"] += 1
+                continue
+            stato["aggiornati" if id_ in esistenti else "aggiunti"] += 1
+            da_scrivere.append((id_, testo, metadati))
+        if da_scrivere:
+            vettori = cache.vettori([d[1] for d in da_scrivere], [d[2]["hash"] for d in da_scrivere])
+            raccolta.upsert(
+                ids=[d[0] for d in da_scrivere],
+                documents=[d[1] for d in da_scrivere],
+                metadatas=[d[2] for d in da_scrivere],
+                embeddings=vettori.tolist(),
+            )
+
+    fonti = fonti_viste if fonti is None else set(fonti)
+    spariti = [id_ for id_, (_, fonte) in esistenti.items() if id_ not in visti and fonte in fonti]
+    for lotto in _lotti(spariti, dimensione_lotto):
+        raccolta.delete(ids=lotto)
+    stato["cancellati"] = len(spariti)
+    stato["calcolati"] = cache.calcolati - calcolati
+    stato["riusati"] = cache.riusati - riusati
+    return stato
+
+
+_LOCK_SINCRONIZZAZIONE = threading.Lock()
+_sincronizzato = False
+
+
+def prepara_indice(percorso_archivio="archivio_kb"):
+    """Sincronizza la collezione una sola volta per processo (le chiamate successive non fanno nulla)."""
+    global _sincronizzato
+    with _LOCK_SINCRONIZZAZIONE:
+        if not _sincronizzato:
+            sincronizza(documenti_predefiniti(percorso_archivio), fonti=fonti_predefinite(percorso_archivio))
+            _sincronizzato = True
+    return collezione()
+
+
+# --- RICERCA ---
+
+def vettore_domanda(domanda):
+    """Embedding di una domanda, in una LRU di processo."""
+    return _DOMANDE.ottieni_o_calcola(
+        (NOME_MODELLO, domanda),
+        lambda: modello().encode([domanda], normalize_embeddings=True, convert_to_numpy=True)[0],
+    )
+
+
+@tracciato("chatbot.recupero")
+def cerca(domanda, n=5, filtro=None):
+    """I testi più vicini alla domanda: [{"id", "testo", "metadati", "distanza"}]."""
+    risultato = collezione().query(
+        query_embeddings=[vettore_domanda(domanda).tolist()], n_results=n, where=filtro,
+        include=["documents", "metadatas", "distances"],
+    )
+    return [
+        {"id": id_, "testo": testo, "metadati": metadati, "distanza": distanza}
+        for id_, testo, metadati, distanza in zip(
+            risultato["ids"][0], risultato["documents"][0], risultato["metadatas"][0], risultato["distances"][0]
+        )
+    ]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sincronizza l'indice vettoriale del chatbot.")
+    parser.add_argument("--archivio", default="archivio_kb", help="Archivio dei frammenti (numerologia.conoscenza).")
+    parser.add_argument("--indice", default=CARTELLA_INDICE, help="Cartella della collezione chromadb e della cache.")
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.archivio):
+        print(f"❌ Archivio non trovato: {args.archivio}")
+        return 1
+
+    inizio = time.monotonic()
+    try:
+        stato = sincronizza(documenti_predefiniti(args.archivio), collezione(args.indice), cache_embedding(args.indice),
+                            fonti=fonti_predefinite(args.archivio))
+    except RecuperoNonDisponibile as e:
+        print(f"❌ {e}")
+        return 1
+    print(f"\n✅ Indice sincronizzato in {time.monotonic() - inizio:.1f} s: {stato['aggiunti']} aggiunti, "
+          f"{stato['aggiornati']} aggiornati, {stato['cancellati']} cancellati, {stato['invariati']} invariati.")
+    print(f"🧠 Embedding calcolati: {stato['calcolati']}, ripresi dalla cache: {stato['riusati']}.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,118 @@
+"""
+Registro dei report con caricamento pigro dei moduli.
+
+Ogni report dichiara un entry point "modulo:funzione" e le dipendenze
+pesanti che usa (matplotlib, fpdf, ...). Il modulo viene importato solo
+quando il report viene scelto; le dipendenze possono essere preriscaldate
+in un thread in background dopo il primo disegno della pagina. Ogni import
+fatto dal registro viene cronometrato per la vista di debug.
+
+Esempio:
+    report = REPORT["Mappa Numerologica"]
+    carica_report(report)()   # importa report.report_numerologico e chiama run()
+    avvia_preriscaldamento()  # a fine pagina
+"""
+
+import importlib
+import sys
+import threading
+import time
+from collections import namedtuple
+
+from .metriche import tracciato
+
+Report = namedtuple("Report", ["titolo", "entry_point", "dipendenze"])
+
+REPORT = {
+    report.titolo: report
+    for report in (
+        Report("Mappa Numerologica", "report.report_numerologico:run", ("fpdf", "matplotlib.pyplot")),
+        Report("Schema Energetico", "report.schema_energetico:run", ("matplotlib.figure", "matplotlib.backends.backend_agg")),
+        Report("Report Chat", "report.report_chat_pdf:run", ("fpdf",)),
+    )
+}
+
+_TEMPI_IMPORT = {}  # modulo -> (millisecondi, moduli caricati, origine)
+_LOCK = threading.Lock()
+_preriscaldamento = None
+
+
+class ReportNonDisponibile(Exception):
+    """Il modulo di un report non esiste o non espone la funzione dichiarata."""
+
+
+# --- IMPORT CRONOMETRATI ---
+
+def importa(nome, origine="pagina"):
+    """Importa un modulo registrandone il tempo (solo al primo import del processo)."""
+    modulo = sys.modules.get(nome)
+    if modulo is not None:
+        return modulo
+    moduli_prima = len(sys.modules)
+    inizio = time.perf_counter()
+    modulo = importlib.import_module(nome)
+    millisecondi = (time.perf_counter() - inizio) * 1000
+    with _LOCK:
+        # Se un altro thread lo stava già importando il primo tempo registrato resta valido
+        _TEMPI_IMPORT.setdefault(nome, (millisecondi, len(sys.modules) - moduli_prima, origine))
+    return modulo
+
+
+def profilo_import():
+    """Tempi di import registrati, dal più lento: [{"modulo", "ms", "moduli_caricati", "origine"}]."""
+    with _LOCK:
+        voci = [
+            {"modulo": nome, "ms": round(ms, 1), "moduli_caricati": caricati, "origine": origine}
+            for nome, (ms, caricati, origine) in _TEMPI_IMPORT.items()
+        ]
+    return sorted(voci, key=lambda voce: voce["ms"], reverse=True)
+
+
+# --- REPORT ---
+
+def carica_report(report):
+    """Importa il modulo del report e restituisce la funzione del suo entry point, misurata come "report.<modulo>"."""
+    nome_modulo, _, funzione = report.entry_point.partition(":")
+    try:
+        modulo = importa(nome_modulo, origine=report.titolo)
+    except ModuleNotFoundError as e:
+        raise ReportNonDisponibile(f"modulo '{nome_modulo}' non trovato: {e}") from e
+    eseguibile = getattr(modulo, funzione or "run", None)
+    if eseguibile is None:
+        raise ReportNonDisponibile(f"il modulo '{nome_modulo}' non definisce '{funzione or 'run'}()'")
+    return tracciato(f"report.{nome_modulo.rpartition('.')[2]}")(eseguibile)
+
+
+def dipendenze_pesanti():
+    """Dipendenze dichiarate dai report registrati, senza duplicati e nell'ordine di dichiarazione."""
+    return list(dict.fromkeys(d for report in REPORT.values() for d in report.dipendenze))
+
+
+def _preriscalda(moduli):
+    for nome in moduli:
+        try:
+            if nome == "matplotlib.pyplot":
+                # Backend senza interfaccia grafica: pyplot non deve cercare un display
+                importa("matplotlib", origine="preriscaldamento").use("Agg")
+            importa(nome, origine="preriscaldamento")
+        except Exception:
+            # Una dipendenza mancante non deve bloccare le altre: l'errore emergerà nel report
+            continue
+
+
+def avvia_preriscaldamento(moduli=None):
+    """
+    Importa in un thread in background le dipendenze pesanti dei report (una sola
+    volta per processo). Va chiamata dopo aver disegnato la pagina.
+    """
+    global _preriscaldamento
+    with _LOCK:
+        if _preriscaldamento is None:
+            _preriscaldamento = threading.Thread(
+                target=_preriscalda,
+                args=(dipendenze_pesanti() if moduli is None else list(moduli),),
+                name="preriscaldamento-report",
+                daemon=True,
+            )
+            _preriscaldamento.start()
+        return _preriscaldamento
@@ -0,0 +1,302 @@
+"""
+Cache delle risposte del chatbot (Gemini) a due livelli.
+
+Molti utenti con gli stessi numeri core fanno in pratica la stessa domanda:
+la risposta viene quindi memorizzata per chiave
+
+    (numeri core del profilo, domanda normalizzata, hash del contesto recuperato, modello)
+
+prima in una CacheLRU del processo, poi in un archivio SQLite condiviso tra
+i worker, con scadenza (TTL) ed espulsione delle voci meno usate oltre una
+dimensione massima. Con una soglia semantica, una domanda formulata in modo
+diverso ma con embedding abbastanza simile (stessi numeri e stesso contesto)
+riusa la risposta già data.
+
+Le richieste identiche contemporanee nello stesso processo aspettano
+un'unica chiamata al modello. Il backend è intercambiabile: BackendFinto
+risponde senza rete, per le prove offline (NUMEROLOGIA_LLM=finto).
+
+Esempio:
+    cache = CacheRisposte(backend_predefinito())
+    risposta, origine = cache.rispondi("Che lavoro fa per me?", profilo, contesto=frammenti)
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from concurrent.futures import Future
+
+import numpy as np
+
+from .cache import CacheLRU
+from .metriche import misura, tracciato
+
+NOME_MODELLO = os.environ.get("NUMEROLOGIA_MODELLO_LLM", "gemini-1.5-flash")
+FILE_ARCHIVIO = os.environ.get("NUMEROLOGIA_CACHE_RISPOSTE", os.path.join("indice_kb", "risposte.sqlite"))
+TTL = 7 * 24 * 3600              # secondi di validità di una risposta
+MAX_BYTE_ARCHIVIO = 64 * 1024 * 1024
+MAX_VOCI_MEMORIA = 2048
+CHIAVI_PROFILO = ("sentiero_di_vita", "espressione", "anima", "personalita", "forza", "quintessenza")
+
+_PUNTEGGIATURA = re.compile(r"[^\w\s]")
+_SPAZI = re.compile(r"\s+")
+
+
+# --- BACKEND ---
+
+class BackendGemini:
+    """Risposte da Google Gemini (google-generativeai)."""
+
+    def __init__(self, modello=NOME_MODELLO, chiave=None):
+        import google.generativeai as genai
+
+        genai.configure(api_key=chiave or os.environ.get("GOOGLE_API_KEY") or os.environ.get("GEMINI_API_KEY"))
+        self.nome = modello
+        self._modello = genai.GenerativeModel(modello)
+
+    def genera(self, prompt):
+        return self._modello.generate_content(prompt).text
+
+
+class BackendFinto:
+    """Backend senza rete: risposta deterministica, con ritardo opzionale e conteggio delle chiamate."""
+
+    def __init__(self, ritardo=0.0, nome="finto"):
+        self.nome = nome
+        self.ritardo = ritardo
+        self.chiamate = 0
+        self._lock = threading.Lock()
+
+    def genera(self, prompt):
+        with self._lock:
+            self.chiamate += 1
+        if self.ritardo:
+            time.sleep(self.ritardo)
+        impronta = hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:12]
+        return f"Risposta di prova {impronta} ({len(prompt)} caratteri di prompt)."
+
+
+def backend_predefinito():
+    """BackendFinto se NUMEROLOGIA_LLM=finto, altrimenti Gemini."""
+    if os.environ.get("NUMEROLOGIA_LLM", "").lower() == "finto":
+        return BackendFinto()
+    return BackendGemini()
+
+
+# --- CHIAVI ---
+
+def normalizza_domanda(domanda):
+    """Minuscole, senza accenti, punteggiatura e spazi ripetuti."""
+    testo = unicodedata.normalize("NFKD", domanda.lower())
+    testo = "".join(c for c in testo if not unicodedata.combining(c))
+    return _SPAZI.sub(" ", _PUNTEGGIATURA.sub(" ", testo)).strip()
+
+
+def vettore_profilo(profilo):
+    """Numeri core di un profilo di calcola_numeri_compatibilita_persona, in ordine fisso."""
+    if profilo is None:
+        return ()
+    core = profilo.get("core", profilo)
+    return tuple(int(core[chiave]) for chiave in CHIAVI_PROFILO)
+
+
+def hash_contesto(contesto):
+    """Hash dei testi recuperati (stringhe o dict con "testo"), nell'ordine dato."""
+    h = hashlib.sha256()
+    for elemento in contesto or ():
+        testo = elemento["testo"] if isinstance(elemento, dict) else elemento
+        h.update(testo.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def prompt_predefinito(domanda, profilo, contesto):
+    righe = ["Sei un esperto di numerologia. Rispondi in italiano, in modo chiaro e concreto."]
+    if profilo:
+        numeri = ", ".join(f"{k.replace('_', ' ')} {v}" for k, v in zip(CHIAVI_PROFILO, vettore_profilo(profilo)))
+        righe.append(f"Numeri dell'utente: {numeri}.")
+    if contesto:
+        righe.append("Testi di riferimento:")
+        righe += [f"- {e['testo'] if isinstance(e, dict) else e}" for e in contesto]
+    righe.append(f"Domanda: {domanda}")
+    return "\n".join(righe)
+
+
+# --- ARCHIVIO SU DISCO ---
+
+class ArchivioRisposte:
+    """Risposte in SQLite condiviso tra processi, con TTL ed espulsione LRU oltre max_byte."""
+
+    def __init__(self, percorso=FILE_ARCHIVIO, ttl=TTL, max_byte=MAX_BYTE_ARCHIVIO):
+        os.makedirs(os.path.dirname(os.path.abspath(percorso)), exist_ok=True)
+        self.ttl = ttl
+        self.max_byte = max_byte
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(percorso, timeout=30, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS risposta ("
+            " chiave TEXT PRIMARY KEY, gruppo TEXT NOT NULL, embedding BLOB,"
+            " risposta TEXT NOT NULL, creata REAL NOT NULL, usata REAL NOT NULL, byte INTEGER NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS risposta_gruppo ON risposta (gruppo)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS risposta_usata ON risposta (usata)")
+
+    def leggi(self, chiave):
+        adesso = time.time()
+        with self._lock:
+            riga = self._db.execute("SELECT risposta, creata FROM risposta WHERE chiave = ?", (chiave,)).fetchone()
+            if riga is None:
+                return None
+            if adesso - riga[1] > self.ttl:
+                self._db.execute("DELETE FROM risposta WHERE chiave = ?", (chiave,))
+                return None
+            self._db.execute("UPDATE risposta SET usata = ? WHERE chiave = ?", (adesso, chiave))
+        return riga[0]
+
+    def simile(self, gruppo, embedding, soglia):
+        """La risposta del gruppo con similarità coseno più alta, se almeno 'soglia'."""
+        limite = time.time() - self.ttl
+        with self._lock:
+            righe = self._db.execute(
+                "SELECT chiave, embedding, risposta FROM risposta"
+                " WHERE gruppo = ? AND embedding IS NOT NULL AND creata >= ?", (gruppo, limite),
+            ).fetchall()
+        vettore = np.asarray(embedding, dtype=np.float32)
+        # Scarta gli embedding di un altro modello (dimensione diversa)
+        righe = [r for r in righe if len(r[1]) == vettore.nbytes]
+        if not righe:
+            return None
+        matrice = np.vstack([np.frombuffer(r[1], dtype=np.float32) for r in righe])
+        similarita = matrice @ vettore / (np.linalg.norm(matrice, axis=1) * np.linalg.norm(vettore) + 1e-12)
+        migliore = int(np.argmax(similarita))
+        if similarita[migliore] < soglia:
+            return None
+        with self._lock:
+            self._db.execute("UPDATE risposta SET usata = ? WHERE chiave = ?", (time.time(), righe[migliore][0]))
+        return righe[migliore][2]
+
+    def scrivi(self, chiave, gruppo, risposta, embedding=None):
+        adesso = time.time()
+        blob = None if embedding is None else np.asarray(embedding, dtype=np.float32).tobytes()
+        byte = len(risposta.encode("utf-8")) + len(chiave) + len(gruppo) + len(blob or b"")
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO risposta VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (chiave, gruppo, blob, risposta, adesso, adesso, byte),
+                )
+                self._db.execute("DELETE FROM risposta WHERE creata < ?", (adesso - self.ttl,))
+                self._espelli()
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def _espelli(self):
+        totale = self._db.execute("SELECT COALESCE(SUM(byte), 0) FROM risposta").fetchone()[0]
+        if totale <= self.max_byte:
+            return
+        # Toglie le meno usate fino a scendere al 90% del limite
+        da_liberare = totale - int(self.max_byte * 0.9)
+        chiavi = []
+        for chiave, byte in self._db.execute("SELECT chiave, byte FROM risposta ORDER BY usata"):
+            chiavi.append((chiave,))
+            da_liberare -= byte
+            if da_liberare <= 0:
+                break
+        self._db.executemany("DELETE FROM risposta WHERE chiave = ?", chiavi)
+
+    def statistiche(self):
+        with self._lock:
+            voci, byte = self._db.execute("SELECT COUNT(*), COALESCE(SUM(byte), 0) FROM risposta").fetchone()
+        return {"voci": voci, "byte": byte}
+
+
+# --- CACHE A DUE LIVELLI ---
+
+class CacheRisposte:
+    """
+    Risposte del modello con cache in memoria e su disco.
+    Con soglia_semantica (es. 0.92) serve anche la funzione 'embedding(testo)'
+    (predefinita: numerologia.recupero.vettore_domanda).
+    """
+
+    def __init__(self, backend, archivio=None, max_voci=MAX_VOCI_MEMORIA, ttl=TTL,
+                 soglia_semantica=None, embedding=None, costruisci_prompt=prompt_predefinito):
+        self.backend = backend
+        self.archivio = archivio if archivio is not None else ArchivioRisposte(ttl=ttl)
+        self.memoria = CacheLRU("numerologia.risposte", max_voci=max_voci, ttl=ttl)
+        self.soglia_semantica = soglia_semantica
+        self.embedding = embedding
+        self.costruisci_prompt = costruisci_prompt
+        self.conteggi = {"memoria": 0, "disco": 0, "semantica": 0, "modello": 0, "attesa": 0}
+        self._in_volo = {}
+        self._lock = threading.Lock()
+
+    def _embedding(self, testo):
+        if self.embedding is None:
+            from .recupero import vettore_domanda
+            self.embedding = vettore_domanda
+        return self.embedding(testo)
+
+    def chiavi(self, domanda, profilo=None, contesto=()):
+        """(chiave esatta, gruppo): il gruppo riunisce le domande con stessi numeri, contesto e modello."""
+        gruppo = json.dumps([vettore_profilo(profilo), hash_contesto(contesto), self.backend.nome])
+        chiave = hashlib.sha256(f"{gruppo}\n{normalizza_domanda(domanda)}".encode("utf-8")).hexdigest()
+        return chiave, hashlib.sha256(gruppo.encode("utf-8")).hexdigest()
+
+    @tracciato("chatbot.rispondi")
+    def rispondi(self, domanda, profilo=None, contesto=()):
+        """Restituisce (risposta, origine) con origine fra memoria, disco, semantica, modello, attesa."""
+        chiave, gruppo = self.chiavi(domanda, profilo, contesto)
+        risposta = self.memoria.get(chiave)
+        if risposta is not None:
+            return self._conta(risposta, "memoria")
+
+        with self._lock:
+            futuro = self._in_volo.get(chiave)
+            proprietario = futuro is None
+            if proprietario:
+                futuro = self._in_volo[chiave] = Future()
+        if not proprietario:
+            # Stessa domanda già in corso in un'altra sessione: aspetta quella chiamata
+            return self._conta(futuro.result(), "attesa")
+
+        try:
+            risposta, origine = self._cerca_o_genera(chiave, gruppo, domanda, profilo, contesto)
+            self.memoria.set(chiave, risposta)
+            futuro.set_result(risposta)
+        except BaseException as e:
+            futuro.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._in_volo[chiave]
+        return self._conta(risposta, origine)
+
+    def _cerca_o_genera(self, chiave, gruppo, domanda, profilo, contesto):
+        risposta = self.archivio.leggi(chiave)
+        if risposta is not None:
+            return risposta, "disco"
+        embedding = None
+        if self.soglia_semantica is not None:
+            embedding = self._embedding(normalizza_domanda(domanda))
+            risposta = self.archivio.simile(gruppo, embedding, self.soglia_semantica)
+            if risposta is not None:
+                return risposta, "semantica"
+        with misura("chatbot.modello"):
+            risposta = self.backend.genera(self.costruisci_prompt(domanda, profilo, contesto))
+        self.archivio.scrivi(chiave, gruppo, risposta, embedding)
+        return risposta, "modello"
+
+    def _conta(self, risposta, origine):
+        with self._lock:
+            self.conteggi[origine] += 1
+        return risposta, origine
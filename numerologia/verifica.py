@@ -0,0 +1,261 @@
+"""
+Verifica di equivalenza dei kernel di numerologia/calcolo.py.
+
+Confronta le funzioni attuali con le implementazioni originali (cicli su
+stringhe e tabella ricostruita a ogni carattere) su tutte le date dal 1900
+al 2100 e su un ampio corpus di nomi. L'unica differenza ammessa è la
+piegatura degli accenti: un carattere può cambiare valore solo se la sua
+forma maiuscola si decompone in NFD (es. "à" -> "a" + accento).
+Controlla anche che un CSV esportato da Excel (con BOM UTF-8) venga letto
+come gli altri dal motore batch e dall'esportazione.
+
+Uso:
+    python -m numerologia.verifica
+"""
+
+import csv
+import os
+import random
+import sys
+import tempfile
+import unicodedata
+from datetime import date, timedelta
+
+from . import calcolo
+
+# --- IMPLEMENTAZIONI ORIGINALI (RIFERIMENTO) ---
+
+def _valore_lettera_originale(c):
+    tabella = {
+        "A": 1, "J": 1, "S": 1,
+        "B": 2, "K": 2, "T": 2,
+        "C": 3, "L": 3, "U": 3,
+        "D": 4, "M": 4, "V": 4,
+        "E": 5, "N": 5, "W": 5,
+        "F": 6, "O": 6, "X": 6,
+        "G": 7, "P": 7, "Y": 7,
+        "H": 8, "Q": 8, "Z": 8,
+        "I": 9, "R": 9
+    }
+    return tabella.get(c.upper(), 0)
+
+def _riduci_originale(n):
+    if n is None:
+        return 0
+    while n > 9:
+        n = sum(int(d) for d in str(n))
+    return n
+
+def _analizza_nome_originale(nome_input):
+    vocali = "AEIOU"
+    nome_input = nome_input.upper().replace(" ", "")
+    total_val = 0
+    vowels_sum = 0
+    consonants_sum = 0
+    for char in nome_input:
+        val = _valore_lettera_originale(char)
+        if val != 0:
+            total_val += val
+            if char in vocali:
+                vowels_sum += val
+            else:
+                consonants_sum += val
+    return {"total": total_val, "vowels_sum": vowels_sum, "consonants_sum": consonants_sum}
+
+
+# --- CORPUS ---
+
+NOMI_ITALIANI = [
+    "Maria", "Giuseppe", "Anna", "Giovanni", "Francesca", "Antonio", "Giulia", "Marco",
+    "Chiara", "Luca", "Sara", "Alessandro", "Elena", "Andrea", "Valentina", "Francesco",
+    "Federica", "Matteo", "Martina", "Lorenzo", "Graziella", "Salvatore", "Rosa", "Vincenzo",
+    "Paola", "Davide", "Silvia", "Stefano", "Laura", "Roberto", "Maria Grazia", "Gian Luca",
+    "Pier Paolo", "Anna Maria", "D'Angelo", "Rossi", "Russo", "Ferrari", "Esposito", "Bianchi",
+    "Romano", "Colombo", "Ricci", "Marino", "Greco", "Bruno", "Gallo", "Conti", "De Luca",
+    "Mancini", "Costa", "Giordano", "Rizzo", "Lombardi", "Moretti", "Barbieri", "Fontana",
+    "Santoro", "Mariani", "Rinaldi", "Caruso", "Ferrara", "Galli", "Martini", "Leone",
+    "Longo", "Gentile", "Martinelli", "Vitale", "Lombardo", "Serra", "Coppola", "De Santis",
+    "D'Amico", "Marchetti", "Parisi", "Villa", "Conte", "Ferraro", "Ferri", "Fabbri",
+]
+
+# Caratteri senza decomposizione NFD, inclusi casi particolari di .upper()
+_ALFABETO = (
+    "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ"
+    " '-.0123456789ßıſﬁﬂﬀŉæøÆØđłÞþµ"
+)
+
+def corpus_nomi(quantita=200000, seme=20250714):
+    """Corpus deterministico: combinazioni di nomi italiani e stringhe casuali."""
+    rnd = random.Random(seme)
+    nomi = [f"{a} {b}" for a in NOMI_ITALIANI for b in NOMI_ITALIANI]
+    while len(nomi) < quantita:
+        nomi.append("".join(rnd.choice(_ALFABETO) for _ in range(rnd.randint(0, 24))))
+    return nomi
+
+def date_di_verifica():
+    """Tutte le date dal 01/01/1900 al 31/12/2100."""
+    giorno = date(1900, 1, 1)
+    while giorno <= date(2100, 12, 31):
+        yield giorno
+        giorno += timedelta(days=1)
+
+
+# --- VERIFICHE ---
+
+def verifica_riduzione(limite=1_000_000):
+    """riduci_fino_1_singolo coincide con l'originale su 0..limite e su None."""
+    assert calcolo.riduci_fino_1_singolo(None) == _riduci_originale(None)
+    for n in range(limite + 1):
+        if calcolo.riduci_fino_1_singolo(n) != _riduci_originale(n):
+            raise AssertionError(f"riduci_fino_1_singolo({n}) diverso dall'originale")
+
+def verifica_codepoint():
+    """Ogni carattere del piano di base vale come prima, salvo le lettere accentate piegate."""
+    piegati = 0
+    for cp in range(0x10000):
+        char = chr(cp)
+        nuovo = calcolo.analizza_nome_base(char)
+        originale = _analizza_nome_originale(char)
+        if nuovo != originale:
+            maiuscolo = char.upper()
+            if unicodedata.normalize("NFD", maiuscolo) == maiuscolo:
+                raise AssertionError(f"U+{cp:04X} {char!r}: {nuovo} invece di {originale}")
+            piegati += 1
+        nuovo_val = calcolo.valore_lettera(char)
+        originale_val = _valore_lettera_originale(char)
+        if nuovo_val != originale_val and originale_val != 0:
+            raise AssertionError(f"valore_lettera(U+{cp:04X}) = {nuovo_val} invece di {originale_val}")
+    return piegati
+
+def verifica_accenti():
+    """Le vocali accentate italiane valgono come la lettera base."""
+    for accentata, base in zip("àèéìòóùÀÈÉÌÒÓÙ", "aeeioouAEEIOOU"):
+        if calcolo.analizza_nome_base(accentata) != calcolo.analizza_nome_base(base):
+            raise AssertionError(f"{accentata!r} non vale come {base!r}")
+    assert calcolo.analizza_nome_base("Niccolò") == calcolo.analizza_nome_base("Niccolo")
+
+def verifica_nomi(nomi):
+    """analizza_nome_base coincide con l'originale su tutto il corpus."""
+    for nome in nomi:
+        if calcolo.analizza_nome_base(nome) != _analizza_nome_originale(nome):
+            raise AssertionError(f"analizza_nome_base({nome!r}) diverso dall'originale")
+
+def verifica_profili(nomi):
+    """calcola_numeri_compatibilita_persona e il motore batch coincidono con le formule originali."""
+    persone = []
+    for i, giorno in enumerate(date_di_verifica()):
+        nome, cognome = nomi[i % len(nomi)], nomi[(i * 7 + 3) % len(nomi)]
+        persone.append((nome, cognome, giorno))
+    attesi = []
+    # Stesso corpo di calcola_numeri_compatibilita_persona con i kernel originali
+    riduci, analizza = calcolo.riduci_fino_1_singolo, calcolo.analizza_nome_base
+    calcolo.riduci_fino_1_singolo = _riduci_originale
+    calcolo.analizza_nome_base = _analizza_nome_originale
+    try:
+        for nome, cognome, giorno in persone:
+            attesi.append(calcolo.calcola_numeri_compatibilita_persona(
+                nome, cognome, giorno.day, giorno.month, giorno.year))
+    finally:
+        calcolo.riduci_fino_1_singolo = riduci
+        calcolo.analizza_nome_base = analizza
+
+    for (nome, cognome, giorno), atteso in zip(persone, attesi):
+        if calcolo.calcola_numeri_compatibilita_persona(nome, cognome, giorno.day, giorno.month, giorno.year) != atteso:
+            raise AssertionError(f"Profilo diverso per {nome!r} {cognome!r} {giorno}")
+
+    try:
+        from .motore import calcola_profili, profilo_da_colonne
+    except ImportError:
+        return False
+    colonne = calcola_profili([p[0] for p in persone], [p[1] for p in persone], [p[2] for p in persone])
+    for i, atteso in enumerate(attesi):
+        if profilo_da_colonne(colonne, i) != atteso:
+            raise AssertionError(f"Motore batch diverso alla riga {i}: {persone[i]}")
+    return True
+
+
+def verifica_calendario():
+    """Il calendario vettoriale coincide con il calcolo data per data con la riduzione originale."""
+    try:
+        from .calendario import calendario
+    except ImportError:
+        return False
+    nascite = [date(2000, 1, 1) + timedelta(days=i) for i in range(366)]
+    inizio, fine = date(2023, 12, 1), date(2025, 1, 31)
+    risultato = calendario(nascite, inizio, fine)
+    for i, nascita in enumerate(nascite):
+        base = _riduci_originale(nascita.day) + _riduci_originale(nascita.month)
+        for j, giorno in enumerate(risultato["date"].tolist()):
+            anno = _riduci_originale(base + _riduci_originale(sum(int(d) for d in str(giorno.year))))
+            mese = _riduci_originale(anno + _riduci_originale(giorno.month))
+            atteso = (anno, mese, _riduci_originale(mese + _riduci_originale(giorno.day)))
+            trovato = (risultato["anno"][i, j], risultato["mese"][i, j], risultato["giorno"][i, j])
+            if trovato != atteso:
+                raise AssertionError(f"Calendario diverso per la nascita {nascita} il {giorno}")
+    return True
+
+
+def verifica_file_bom(nomi, righe=500):
+    """
+    Un CSV con BOM UTF-8 (export di Excel) dà gli stessi profili del calcolo in
+    memoria, sia nel motore (calcola_profili_da_file) sia nell'esportazione.
+    """
+    try:
+        from .esportazione import righe_profili
+        from .motore import COLONNE, calcola_profili, calcola_profili_da_file
+    except ImportError:
+        return False
+    giorni = list(date_di_verifica())
+    # Il lettore del CSV toglie gli spazi ai bordi: il riferimento parte dagli stessi valori
+    persone = [
+        (nomi[i % len(nomi)].strip(), nomi[(i * 7 + 3) % len(nomi)].strip(), giorni[(i * 97) % len(giorni)].strftime("%d/%m/%Y"))
+        for i in range(righe)
+    ]
+    attesi = calcola_profili(*(list(colonna) for colonna in zip(*persone)))
+    cartella = tempfile.mkdtemp(prefix="numerologia-verifica-")
+    percorso = os.path.join(cartella, "persone.csv")
+    try:
+        with open(percorso, "w", newline="", encoding="utf-8-sig") as f:
+            scrittore = csv.writer(f)
+            scrittore.writerow(["nome", "cognome", "data_nascita"])
+            scrittore.writerows(persone)
+        dal_file = calcola_profili_da_file(percorso)
+        for colonna in COLONNE:
+            if dal_file[colonna].tolist() != attesi[colonna].tolist():
+                raise AssertionError(f"CSV con BOM: colonna {colonna!r} diversa dal calcolo in memoria")
+        for i, riga in enumerate(righe_profili(percorso)):
+            if riga[3:-1] != [int(attesi[c][i]) for c in COLONNE] or riga[-1]:
+                raise AssertionError(f"CSV con BOM: riga esportata {i} diversa: {persone[i]}")
+    finally:
+        os.remove(percorso)
+        os.rmdir(cartella)
+    return True
+
+
+def main():
+    print("\n🔍 Verifica di equivalenza dei kernel numerologici...\n")
+    nomi = corpus_nomi()
+    verifica_riduzione()
+    print("✅ riduci_fino_1_singolo: identica su 0..1.000.000")
+    piegati = verifica_codepoint()
+    print(f"✅ Caratteri del piano di base: identici, {piegati} lettere accentate ora piegate")
+    verifica_accenti()
+    print("✅ Vocali accentate italiane piegate sulla lettera base")
+    verifica_nomi(nomi)
+    print(f"✅ analizza_nome_base: identica su {len(nomi)} nomi")
+    motore = verifica_profili(nomi)
+    print("✅ calcola_numeri_compatibilita_persona: identica su tutte le date 1900-2100")
+    if motore:
+        print("✅ Motore batch: identico riga per riga")
+    else:
+        print("⚠️  NumPy non installato: motore batch non verificato")
+    if verifica_file_bom(nomi):
+        print("✅ CSV con BOM UTF-8: motore ed esportazione identici al calcolo in memoria")
+    if verifica_calendario():
+        print("✅ Calendario personale: identico data per data (dic 2023 - gen 2025, tutte le nascite)")
+    print("\n✅ Verifica completata.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,44 +1,37 @@
 import streamlit as st
-import os
-import sys
 
-# Aggiunge la cartella 'report' al path per poter importare i moduli
-report_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'report'))
-if report_dir not in sys.path:
-    sys.path.append(report_dir)
+from numerologia.metriche import pagina
+from numerologia.registro import REPORT, avvia_preriscaldamento, carica_report, profilo_import
 
 # Configurazione della pagina
 st.set_page_config(page_title="Report Numerologici", layout="centered")
 
-st.title("📊 Report Numerologici")
-st.write("Scegli quale report desideri visualizzare:")
+# Durata ed errori del rerun; pannello di debug per gli amministratori
+with pagina("report"):
+    st.title("📊 Report Numerologici")
+    st.write("Scegli quale report desideri visualizzare:")
 
-# Menu a tendina
-opzione = st.selectbox("Seleziona un report:", [
-    "—",
-    "Mappa Numerologica",
-    "Schema Energetico",
-    "Report Chat"
-])
+    # Menu a tendina
+    opzione = st.selectbox("Seleziona un report:", ["—", *REPORT])
 
-# Logica di selezione dei report
-if opzione == "Mappa Numerologica":
-    try:
-        import report_numerologico as modulo
-        modulo.run()
-    except Exception as e:
-        st.error(f"Errore nel caricamento del modulo 'report_numerologico': {e}")
+    # Logica di selezione dei report: il modulo viene importato solo quando serve
+    if opzione in REPORT:
+        report = REPORT[opzione]
+        try:
+            with st.spinner("Caricamento del report..."):
+                esegui = carica_report(report)
+            esegui()
+        except Exception as e:
+            st.error(f"Errore nel caricamento del modulo '{report.entry_point}': {e}")
 
-elif opzione == "Schema Energetico":
-    try:
-        import schema_energetico as modulo
-        modulo.run()
-    except Exception as e:
-        st.error(f"Errore nel caricamento del modulo 'schema_energetico': {e}")
+    # Vista di debug (?debug=1): tempi di import dei moduli in questo processo
+    if st.query_params.get("debug") == "1":
+        with st.expander("⏱️ Profilo di import (ms per modulo)"):
+            voci = profilo_import()
+            if voci:
+                st.dataframe(voci, hide_index=True, width="stretch")
+            else:
+                st.write("Nessun modulo importato dal registro finora.")
 
-elif opzione == "Report Chat":
-    try:
-        import report_chat_pdf as modulo_chat
-        modulo_chat.run()
-    except Exception as e:
-        st.error(f"Errore nel caricamento del modulo 'report_chat_pdf': {e}")
+# Dopo il primo disegno: le dipendenze pesanti dei report si caricano in background
+avvia_preriscaldamento()
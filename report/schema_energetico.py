@@ -1 +1,46 @@
+"""
+Report "Schema Energetico": radar dei sei numeri core di una persona.
 
+Il grafico passa dalla cache di numerologia/grafici.py, quindi una persona
+con gli stessi numeri di una già vista non ridisegna nulla.
+"""
+
+from datetime import date, datetime
+
+import streamlit as st
+
+from numerologia.grafici import STILI, grafico_schema, preriscalda
+from numerologia.profili import imposta_persona_corrente, persona_corrente, profilo
+
+
+def run():
+    st.subheader("🔮 Schema Energetico")
+    preriscalda()
+
+    persona = persona_corrente() or {}
+    with st.form("schema_energetico"):
+        nome = st.text_input("Nome", value=persona.get("nome", "")).strip()
+        cognome = st.text_input("Cognome", value=persona.get("cognome", "")).strip()
+        data = persona.get("data_nascita")
+        data_str = st.text_input("Data di nascita (GG/MM/AAAA)", value=data.strftime("%d/%m/%Y") if data else "").strip()
+        stile = st.radio("Stile", list(STILI), horizontal=True)
+        conferma = st.form_submit_button("Mostra lo schema")
+
+    if not conferma and not persona:
+        return
+    if not nome or not cognome:
+        st.error("Inserisci nome e cognome.")
+        return
+    try:
+        data_nascita = datetime.strptime(data_str, "%d/%m/%Y").date()
+    except ValueError:
+        st.error("Formato data non valido. Usa GG/MM/AAAA (es. 01/01/1990).")
+        return
+    if data_nascita > date.today():
+        st.error("La data di nascita non può essere nel futuro.")
+        return
+
+    numeri = profilo(nome, cognome, data_nascita)
+    imposta_persona_corrente(nome, cognome, data_nascita)
+    vettore = tuple(numeri["core"].values())  # stesso ordine di ETICHETTE_CORE
+    st.image(grafico_schema(vettore, stile=stile), caption=f"Schema energetico di {nome} {cognome}")